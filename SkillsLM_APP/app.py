@@ -2,6 +2,8 @@
 import streamlit as st
 import os
 import SkillsLM_APP.core.utils as utils
+from SkillsLM_APP.core import prefetch
+from SkillsLM_APP.core import skill_tree
 from SkillsLM_APP.components.ui import render_css
 
 # --- Page Config ---
@@ -15,6 +17,10 @@ st.set_page_config(
 # --- CSS Styling ---
 render_css()
 
+# --- Marketplace Prefetch ---
+# Warm every curated repo listing in the background (no-op on reruns)
+prefetch.warm_curated()
+
 # --- Sidebar ---
 with st.sidebar:
     st.image("https://assets.vercel.com/image/upload/v1588805858/repositories/vercel/logo.png", width=50) # Placeholder logo
@@ -39,6 +45,14 @@ with st.sidebar:
             else:
                 st.success("已是最新")
     
+    progress = prefetch.get_progress()
+    if progress['loading']:
+        st.progress(progress['done'] / progress['total'], text=f"技能市场预加载 {progress['done']}/{progress['total']}")
+    elif progress['failed']:
+        st.caption(f"技能市场已缓存 ({progress['failed']} 个仓库加载失败)")
+    elif progress['done']:
+        st.caption("技能市场已缓存 ✅")
+
     st.caption("v1.0.3 | By da.zuo")
 
 # --- Focus View Logic (Modal) ---
@@ -65,10 +79,7 @@ if 'view_skill' in st.session_state and st.session_state['view_skill']:
         if not os.path.exists(readme_path):
             readme_path = os.path.join(skill['path'], "README.md")
         
-        content = ""
-        if os.path.exists(readme_path):
-            with open(readme_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+        content = skill_tree.read_text(readme_path) if os.path.exists(readme_path) else ""
 
         with tab_doc:
             c_tree, c_content = st.columns([1, 3])
@@ -76,14 +87,13 @@ if 'view_skill' in st.session_state and st.session_state['view_skill']:
             with c_tree:
                 st.markdown("### 文件目录")
                 try:
-                    tree_str = ""
-                    for root, dirs, files in os.walk(skill['path']):
-                        level = root.replace(skill['path'], '').count(os.sep)
-                        indent = '&nbsp;' * 4 * level
-                        tree_str += f"{indent}📁 {os.path.basename(root)}/<br>"
-                        subindent = '&nbsp;' * 4 * (level + 1)
-                        for f in files:
-                            tree_str += f"{subindent}📄 {f}<br>"
+                    # Subfolders stay collapsed until picked; listings are cached per directory mtime
+                    expand_key = f"tree_expand_{skill['path']}"
+                    expanded = st.session_state.get(expand_key, [])
+                    tree_str, collapsed = skill_tree.build_tree(skill['path'], expanded)
+                    expandable = sorted(set(collapsed) | set(expanded))
+                    if expandable:
+                        st.multiselect("展开文件夹", expandable, key=expand_key, placeholder="选择要展开的文件夹")
                     
                     st.markdown(f"<div style='background:#0d1117; padding:10px; border-radius:4px; font-family:monospace; font-size:0.8em; overflow-x:auto;'>{tree_str}</div>", unsafe_allow_html=True)
                 except Exception as e:
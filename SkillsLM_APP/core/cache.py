@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+
+# Cache files live outside the repo so they survive restarts and are shared
+# between Streamlit sessions. Override with SKILLSLM_CACHE_DIR if needed.
+CACHE_DIR = os.environ.get("SKILLSLM_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".skillslm", "cache")
+
+
+class TTLCache:
+    """Memory + disk cache whose entries are validated by a fingerprint and a TTL.
+
+    - fingerprint mismatch: the entry is treated as missing (data is known to be wrong)
+    - older than ttl: the entry is returned but flagged stale, so callers can
+      serve it immediately and refresh in the background
+    """
+
+    def __init__(self, name, ttl=300):
+        self.name = name
+        self.ttl = ttl
+        self.path = os.path.join(CACHE_DIR, f"{name}.json")
+        self._lock = threading.Lock()
+        self._entries = None
+        self._refreshing = set()
+
+    def _load(self):
+        """Load entries from disk once (caller holds the lock)."""
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._entries = data
+        except (OSError, ValueError):
+            pass
+
+    def _persist(self):
+        """Write entries to disk atomically (caller holds the lock)."""
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # Disk cache is best effort, the memory layer still works
+            pass
+
+    def get(self, key, fingerprint):
+        """Return (value, is_stale). value is None on a miss."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return None, True
+        is_stale = time.time() - entry.get("stored_at", 0) > self.ttl
+        return entry.get("value"), is_stale
+
+    def set(self, key, fingerprint, value):
+        with self._lock:
+            self._load()
+            self._entries[key] = {
+                "fingerprint": fingerprint,
+                "stored_at": time.time(),
+                "value": value
+            }
+            self._persist()
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything when key is None."""
+        with self._lock:
+            self._load()
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._persist()
+
+    def refresh_async(self, key, loader):
+        """Recompute an entry in a daemon thread.
+
+        loader() returns (fingerprint, value), or None to keep the current entry.
+        Only one refresh per key runs at a time.
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+
+        def worker():
+            try:
+                result = loader()
+                if result is not None:
+                    fingerprint, value = result
+                    self.set(key, fingerprint, value)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=worker, name=f"{self.name}-refresh", daemon=True).start()
+        return True
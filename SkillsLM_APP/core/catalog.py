@@ -0,0 +1,315 @@
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import threading
+import time
+
+from SkillsLM_APP.core.cache import CACHE_DIR
+
+# Marketplace listings change rarely; after the TTL an entry is revalidated
+# against the repo's HEAD commit before paying for a full `--list` clone.
+CATALOG_TTL = 6 * 3600
+CATALOG_PATH = os.path.join(CACHE_DIR, "catalog.db")
+REVALIDATE_TIMEOUT = 15
+
+_GITHUB_REPO = re.compile(r'^[\w.-]+/[\w.-]+$')
+
+# Search index: FTS5's unicode61 tokenizer keeps a run of CJK characters as a
+# single token, so CJK text is indexed as space-separated unigrams and CJK
+# query runs become phrases of those unigrams.
+_CJK_CHAR = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]')
+_QUERY_TERM = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+|[^\W_]+')
+# bm25 column weights: name, description, repo
+SEARCH_WEIGHTS = (10.0, 1.0, 2.0)
+SEARCH_LIMIT = 200
+
+
+def _segment(text):
+    """Split CJK characters into standalone tokens for indexing."""
+    return _CJK_CHAR.sub(lambda m: f" {m.group(0)} ", text or "")
+
+
+def build_match_query(query):
+    """Turn user input into an FTS5 MATCH expression, or None if it has no terms.
+
+    Latin terms become prefix queries (`"pdf"*`); CJK runs become unigram
+    phrases (`"测 试"`). Terms are ANDed.
+    """
+    terms = []
+    for term in _QUERY_TERM.findall((query or "").lower()):
+        if _CJK_CHAR.match(term):
+            terms.append('"' + " ".join(term) + '"')
+        else:
+            terms.append(f'"{term}"*')
+    return " ".join(terms) if terms else None
+
+
+def remote_head(repo):
+    """Default revalidation hook: the HEAD commit sha of a GitHub repo, or None.
+
+    `git ls-remote` only exchanges refs, so it is far cheaper than the clone
+    behind `npx skills add <repo> --list`.
+    """
+    if not _GITHUB_REPO.match(repo or ""):
+        return None
+    url = f"https://github.com/{repo}"
+    try:
+        result = subprocess.run(
+            ["git", "ls-remote", url, "HEAD"],
+            capture_output=True, text=True, timeout=REVALIDATE_TIMEOUT,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0 or not result.stdout:
+        return None
+    return result.stdout.split()[0]
+
+
+class Catalog:
+    """SQLite store of marketplace listings keyed by repo.
+
+    Each row keeps the parsed skills, when they were fetched and an etag
+    (commit sha by default) used to revalidate stale rows cheaply.
+    """
+
+    def __init__(self, path=CATALOG_PATH, ttl=CATALOG_TTL, revalidate=remote_head):
+        self.path = path
+        self.ttl = ttl
+        self.revalidate = revalidate
+        self._init_lock = threading.Lock()
+        self._ready = False
+        self.fts = False
+
+    def _connect(self):
+        # One short-lived connection per call: callers include worker threads
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS repo_catalog (
+                            repo TEXT PRIMARY KEY,
+                            fetched_at REAL NOT NULL,
+                            etag TEXT,
+                            skills TEXT NOT NULL
+                        )
+                    """)
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS skill_entries (
+                            id INTEGER PRIMARY KEY,
+                            repo TEXT NOT NULL,
+                            name TEXT NOT NULL,
+                            description TEXT
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_skill_entries_repo ON skill_entries(repo)")
+                    self.fts = self._init_fts(conn)
+                    # Catalogs written before the search index existed
+                    if conn.execute("SELECT 1 FROM skill_entries LIMIT 1").fetchone() is None:
+                        for repo, skills in conn.execute("SELECT repo, skills FROM repo_catalog").fetchall():
+                            self._index_repo(conn, repo, json.loads(skills))
+                    conn.commit()
+                    self._ready = True
+        return conn
+
+    def _init_fts(self, conn):
+        """Create the FTS5 index (rowid = skill_entries.id). Returns False when FTS5 is unavailable."""
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS skill_fts USING fts5(name, description, repo)"
+            )
+        except sqlite3.OperationalError:
+            return False
+        # Rebuild if entries were written while the index was missing
+        indexed = conn.execute("SELECT count(*) FROM skill_fts").fetchone()[0]
+        total = conn.execute("SELECT count(*) FROM skill_entries").fetchone()[0]
+        if indexed != total:
+            conn.execute("DELETE FROM skill_fts")
+            rows = conn.execute("SELECT id, name, description, repo FROM skill_entries").fetchall()
+            conn.executemany(
+                "INSERT INTO skill_fts (rowid, name, description, repo) VALUES (?, ?, ?, ?)",
+                [(i, _segment(n), _segment(d), r) for i, n, d, r in rows]
+            )
+        return True
+
+    def _index_repo(self, conn, repo, skills):
+        """Replace the search entries of one repo (caller commits)."""
+        self._unindex_repo(conn, repo)
+        for skill in skills:
+            name = skill.get("name", "")
+            description = (skill.get("description") or "").strip()
+            cur = conn.execute(
+                "INSERT INTO skill_entries (repo, name, description) VALUES (?, ?, ?)",
+                (repo, name, description)
+            )
+            if self.fts:
+                conn.execute(
+                    "INSERT INTO skill_fts (rowid, name, description, repo) VALUES (?, ?, ?, ?)",
+                    (cur.lastrowid, _segment(name), _segment(description), repo)
+                )
+
+    def _unindex_repo(self, conn, repo=None):
+        if repo is None:
+            conn.execute("DELETE FROM skill_entries")
+            if self.fts:
+                conn.execute("DELETE FROM skill_fts")
+            return
+        if self.fts:
+            conn.execute(
+                "DELETE FROM skill_fts WHERE rowid IN (SELECT id FROM skill_entries WHERE repo = ?)", (repo,)
+            )
+        conn.execute("DELETE FROM skill_entries WHERE repo = ?", (repo,))
+
+    def _open(self):
+        """Connect, or return None when the cache dir is unusable (cache is best effort)."""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            return self._connect()
+        except (OSError, sqlite3.Error):
+            return None
+
+    def get(self, repo):
+        """Return {"skills", "fetched_at", "etag", "stale"} or None."""
+        conn = self._open()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT fetched_at, etag, skills FROM repo_catalog WHERE repo = ?", (repo,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        finally:
+            conn.close()
+        if not row:
+            return None
+        fetched_at, etag, skills = row
+        return {
+            "skills": json.loads(skills),
+            "fetched_at": fetched_at,
+            "etag": etag,
+            "stale": time.time() - fetched_at > self.ttl
+        }
+
+    def put(self, repo, skills, etag=None):
+        conn = self._open()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO repo_catalog (repo, fetched_at, etag, skills) VALUES (?, ?, ?, ?)",
+                    (repo, time.time(), etag, json.dumps(skills, ensure_ascii=False))
+                )
+                self._index_repo(conn, repo, skills)
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+
+    def touch(self, repo):
+        """Mark a revalidated entry as fresh again."""
+        conn = self._open()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute("UPDATE repo_catalog SET fetched_at = ? WHERE repo = ?", (time.time(), repo))
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+
+    def invalidate(self, repo=None):
+        """Drop one repo, or the whole catalog when repo is None."""
+        conn = self._open()
+        if conn is None:
+            return
+        try:
+            with conn:
+                if repo is None:
+                    conn.execute("DELETE FROM repo_catalog")
+                else:
+                    conn.execute("DELETE FROM repo_catalog WHERE repo = ?", (repo,))
+                self._unindex_repo(conn, repo)
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+
+    def lookup(self, repo):
+        """Return cached skills if they are still valid, else (None, etag_or_None).
+
+        Fresh rows are returned as is. Stale rows are revalidated with the hook;
+        an unchanged etag renews the row without refetching. The etag computed
+        here is handed back so the caller can store it with the new listing.
+        """
+        entry = self.get(repo)
+        if entry is None:
+            return None, None
+        if not entry["stale"]:
+            return entry["skills"], entry["etag"]
+        etag = self.revalidate(repo) if self.revalidate else None
+        if etag and etag == entry["etag"]:
+            self.touch(repo)
+            return entry["skills"], etag
+        return None, etag
+
+    def search(self, query, repo=None, limit=SEARCH_LIMIT):
+        """Ranked search over every cached repo (or one repo).
+
+        Returns a list of {"name", "description", "repo"}, best match first, or
+        None when the query has no searchable terms. Uses FTS5 with bm25
+        ranking (name weighted highest); FTS only matches word prefixes, so the
+        results are topped up with LIKE substring matches, which are also the
+        whole result without FTS5.
+        """
+        match = build_match_query(query)
+        if match is None:
+            return None
+        conn = self._open()
+        if conn is None:
+            return []
+        try:
+            rows = []
+            if self.fts:
+                sql = """
+                    SELECT e.id, e.name, e.description, e.repo
+                    FROM skill_fts JOIN skill_entries e ON e.id = skill_fts.rowid
+                    WHERE skill_fts MATCH ?{}
+                    ORDER BY bm25(skill_fts, ?, ?, ?)
+                    LIMIT ?
+                """.format(" AND e.repo = ?" if repo else "")
+                params = [match] + ([repo] if repo else []) + list(SEARCH_WEIGHTS) + [limit]
+                rows = conn.execute(sql, params).fetchall()
+            if len(rows) < limit:
+                rows += self._substring_matches(conn, query, repo, [row[0] for row in rows], limit - len(rows))
+        except sqlite3.Error:
+            return []
+        finally:
+            conn.close()
+        return [{"name": n, "description": d or "", "repo": r} for _, n, d, r in rows]
+
+    def _substring_matches(self, conn, query, repo, found, limit):
+        """LIKE matches for every query term (skipping ids in `found`), name hits first."""
+        terms = [f"%{term}%" for term in dict.fromkeys(_QUERY_TERM.findall(query.lower()))]
+        in_name = " AND ".join("lower(name) LIKE ?" for _ in terms)
+        sql = "SELECT id, name, description, repo FROM skill_entries WHERE {}".format(
+            " AND ".join("(lower(name) LIKE ? OR lower(description) LIKE ?)" for _ in terms)
+        )
+        params = [pattern for term in terms for pattern in (term, term)]
+        if repo:
+            sql += " AND repo = ?"
+            params.append(repo)
+        if found:
+            sql += " AND id NOT IN ({})".format(", ".join("?" for _ in found))
+            params.extend(found)
+        sql += f" ORDER BY ({in_name}) DESC, name LIMIT ?"
+        params.extend(terms + [limit])
+        return conn.execute(sql, params).fetchall()
+
+        return [{"name": n, "description": d or "", "repo": r} for n, d, r in rows]
@@ -0,0 +1,89 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import SkillsLM_APP.core.utils as utils
+from SkillsLM_APP.core.catalog import CATALOG_TTL
+
+# Featured marketplace repos: (button label, repo, tooltip)
+CURATED_REPOS = [
+    ("Vercel Labs", "vercel-labs/agent-skills", None),
+    ("ComposioHQ", "ComposioHQ/awesome-claude-skills", None),
+    ("Anthropic Skills", "anthropics/skills", "Official Anthropic Skills"),
+    ("OpenAI Skills", "openai/skills", "Official OpenAI Codex Skills"),
+    ("Claude Plugins", "anthropics/claude-plugins-official", "Official Claude Code Plugins"),
+    ("Agent Toolkit", "softaworks/agent-toolkit", "Testing / software engineering skills"),
+]
+
+PREFETCH_WORKERS = 4
+
+# Process-wide state: Streamlit re-executes the script on every interaction,
+# so the pool and progress must live at module level, not in session_state.
+_lock = threading.Lock()
+_executor = None
+_status = {}        # repo -> "loading" | "ok" | "error"
+_warmed_at = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="market-prefetch")
+    return _executor
+
+
+def _fetch(repo):
+    try:
+        skills, _ = utils.get_repo_skills(repo)
+        status = "ok" if skills else "error"
+    except Exception:
+        status = "error"
+    with _lock:
+        _status[repo] = status
+
+
+def prefetch(repos):
+    """Warm the catalog for repos in the background. Repos already in flight are skipped.
+
+    Returns the number of newly scheduled fetches.
+    """
+    scheduled = 0
+    with _lock:
+        executor = _get_executor()
+        for repo in repos:
+            if _status.get(repo) == "loading":
+                continue
+            _status[repo] = "loading"
+            executor.submit(_fetch, repo)
+            scheduled += 1
+    return scheduled
+
+
+def warm_curated():
+    """Prefetch every curated repo once per catalog TTL (safe to call on each rerun)."""
+    global _warmed_at
+    with _lock:
+        if _warmed_at is not None and time.time() - _warmed_at < CATALOG_TTL:
+            return False
+        _warmed_at = time.time()
+    prefetch([repo for _, repo, _ in CURATED_REPOS])
+    return True
+
+
+def is_loading(repo):
+    with _lock:
+        return _status.get(repo) == "loading"
+
+
+def get_progress(repos=None):
+    """Return {"total", "done", "failed", "loading": [repos]} for the given (default: curated) repos."""
+    if repos is None:
+        repos = [repo for _, repo, _ in CURATED_REPOS]
+    with _lock:
+        states = [_status.get(repo) for repo in repos]
+    return {
+        "total": len(repos),
+        "done": sum(1 for s in states if s in ("ok", "error")),
+        "failed": sum(1 for s in states if s == "error"),
+        "loading": [repo for repo, s in zip(repos, states) if s == "loading"],
+    }
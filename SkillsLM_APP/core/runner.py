@@ -0,0 +1,154 @@
+import asyncio
+import os
+import platform
+import signal
+import shutil
+import subprocess
+
+# How many `npx skills` processes may run at once (each one may clone a repo)
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 300
+CANCEL_POLL_INTERVAL = 0.2
+
+NPX_MISSING = "未找到 npx 命令，请先安装 Node.js。"
+TIMEOUT_MESSAGE = "命令执行超时"
+CANCELLED_MESSAGE = "命令已取消"
+
+
+async def _read_stream(stream, on_line=None):
+    """Read a subprocess pipe line by line, forwarding each line as it arrives."""
+    chunks = []
+    while True:
+        line = await stream.readline()
+        if not line:
+            break
+        text = line.decode('utf-8', errors='replace')
+        chunks.append(text)
+        if on_line:
+            on_line(text)
+    return "".join(chunks)
+
+
+async def _spawn(cmd):
+    if platform.system() == "Windows":
+        # npx is a .cmd shim on Windows and needs the shell, same as run_command
+        return await asyncio.create_subprocess_shell(
+            subprocess.list2cmdline(cmd),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    # Own process group so timeouts/cancellation also stop the git/node children
+    return await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True
+    )
+
+
+def _kill(proc):
+    if proc.returncode is not None:
+        return
+    try:
+        if platform.system() == "Windows":
+            proc.kill()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def run_command_async(args, semaphore=None, timeout=DEFAULT_TIMEOUT, on_output=None):
+    """Run `npx skills <args>` on the event loop. Returns (stdout, stderr, returncode).
+
+    stdout and returncode are None when the process could not be started; a
+    timed-out process is killed, so its returncode is non-zero.
+
+    - semaphore: optional asyncio semaphore bounding concurrent processes
+    - timeout: seconds before the process is killed
+    - on_output: called with each stdout line as it is produced
+    """
+    if shutil.which("npx") is None:
+        return None, NPX_MISSING, None
+
+    cmd = ["npx", "skills"] + list(args)
+
+    if semaphore is not None:
+        await semaphore.acquire()
+    try:
+        try:
+            proc = await _spawn(cmd)
+        except Exception as e:
+            return None, str(e), None
+
+        stdout_task = asyncio.ensure_future(_read_stream(proc.stdout, on_output))
+        stderr_task = asyncio.ensure_future(_read_stream(proc.stderr))
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=timeout)
+            return await stdout_task, await stderr_task, proc.returncode
+        except asyncio.TimeoutError:
+            _kill(proc)
+            await proc.wait()
+            return await stdout_task, (await stderr_task) + TIMEOUT_MESSAGE, proc.returncode
+        except asyncio.CancelledError:
+            # Reap the process before propagating so no transport outlives the loop
+            _kill(proc)
+            await proc.wait()
+            await asyncio.gather(stdout_task, stderr_task, return_exceptions=True)
+            raise
+    finally:
+        if semaphore is not None:
+            semaphore.release()
+
+
+async def run_commands_async(commands, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                             on_output=None, cancel_event=None):
+    """Run several commands concurrently, at most `concurrency` at a time.
+
+    Results keep the order of `commands`. on_output(index, line) streams stdout.
+    Setting cancel_event (a threading.Event) kills everything still running.
+    """
+    semaphore = asyncio.BoundedSemaphore(concurrency)
+
+    def forward(index):
+        if on_output is None:
+            return None
+        return lambda line: on_output(index, line)
+
+    tasks = [
+        asyncio.ensure_future(run_command_async(args, semaphore, timeout, forward(i)))
+        for i, args in enumerate(commands)
+    ]
+
+    watcher = None
+    if cancel_event is not None:
+        async def watch():
+            while not all(t.done() for t in tasks):
+                if cancel_event.is_set():
+                    for t in tasks:
+                        t.cancel()
+                    return
+                await asyncio.sleep(CANCEL_POLL_INTERVAL)
+        watcher = asyncio.ensure_future(watch())
+
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    if watcher is not None:
+        watcher.cancel()
+
+    results = []
+    for outcome in outcomes:
+        if isinstance(outcome, asyncio.CancelledError):
+            results.append((None, CANCELLED_MESSAGE, None))
+        elif isinstance(outcome, BaseException):
+            results.append((None, str(outcome), None))
+        else:
+            results.append(outcome)
+    return results
+
+
+def run_commands(commands, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                 on_output=None, cancel_event=None):
+    """Blocking wrapper around run_commands_async for Streamlit callbacks and threads."""
+    if not commands:
+        return []
+    return asyncio.run(run_commands_async(commands, concurrency, timeout, on_output, cancel_event))
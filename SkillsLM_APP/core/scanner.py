@@ -0,0 +1,109 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Canonical install location used by `npx skills` (skills are symlinked into agent dirs)
+CANONICAL_DIR = os.path.join(".agents", "skills")
+
+# Agent name -> (global dir relative to ~, project dir relative to cwd)
+AGENT_DIRS = {
+    "Claude Code": (os.path.join(".claude", "skills"), os.path.join(".claude", "skills")),
+    "Cursor": (os.path.join(".cursor", "skills"), os.path.join(".cursor", "skills")),
+    "Cline": (os.path.join(".cline", "skills"), os.path.join(".cline", "skills")),
+    "Trae": (os.path.join(".trae", "skills"), os.path.join(".trae", "skills")),
+    "OpenCode": (os.path.join(".config", "opencode", "skill"), os.path.join(".opencode", "skill")),
+    "Codex": (os.path.join(".codex", "skills"), os.path.join(".codex", "skills")),
+}
+
+SKILL_FILE = "SKILL.md"
+MAX_FRONTMATTER_LINES = 200
+MAX_WORKERS = 8
+
+
+def skill_roots(global_scope=True):
+    """Return [(agent_name or None, root_dir)] for a scope; None marks the canonical root."""
+    base = os.path.expanduser("~") if global_scope else os.getcwd()
+    roots = [(None, os.path.join(base, CANONICAL_DIR))]
+    for agent, (global_dir, project_dir) in AGENT_DIRS.items():
+        roots.append((agent, os.path.join(base, global_dir if global_scope else project_dir)))
+    return roots
+
+
+def read_frontmatter(path):
+    """Parse the `key: value` pairs of a SKILL.md YAML frontmatter block."""
+    meta = {}
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            if f.readline().strip() != "---":
+                return meta
+            for i, line in enumerate(f):
+                if line.strip() == "---" or i >= MAX_FRONTMATTER_LINES:
+                    break
+                key, sep, value = line.partition(":")
+                # Only top-level scalar keys; nested blocks are indented
+                if sep and key and not key[0].isspace():
+                    meta[key.strip()] = value.strip().strip('"\'')
+    except OSError:
+        pass
+    return meta
+
+
+def _list_skill_dirs(root):
+    """Return [(dir_path, real_path)] for entries of root that contain a SKILL.md."""
+    found = []
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if not entry.is_dir():
+                        continue
+                except OSError:
+                    continue  # broken symlink
+                if os.path.isfile(os.path.join(entry.path, SKILL_FILE)):
+                    found.append((entry.path, os.path.realpath(entry.path)))
+    except OSError:
+        pass
+    return found
+
+
+def scan_skills(global_scope=True):
+    """List installed skills straight from the filesystem.
+
+    Returns the same dicts as utils.list_skills, or None when no skills root
+    exists for the scope (callers then fall back to the CLI).
+    """
+    roots = [(agent, root) for agent, root in skill_roots(global_scope) if os.path.isdir(root)]
+    if not roots:
+        return None
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        listings = list(pool.map(lambda item: _list_skill_dirs(item[1]), roots))
+
+        # Group by real path so a canonical skill and its agent symlinks merge
+        by_real = {}
+        for (agent, _), entries in zip(roots, listings):
+            for dir_path, real_path in entries:
+                skill = by_real.setdefault(real_path, {"path": None, "agents": []})
+                if agent is None:
+                    skill["path"] = dir_path
+                else:
+                    skill["agents"].append(agent)
+                    if skill["path"] is None:
+                        skill["path"] = dir_path
+
+        real_paths = list(by_real)
+        metas = list(pool.map(lambda p: read_frontmatter(os.path.join(p, SKILL_FILE)), real_paths))
+
+    skills = []
+    for real_path, meta in zip(real_paths, metas):
+        info = by_real[real_path]
+        skills.append({
+            "name": meta.get("name") or os.path.basename(info["path"]),
+            "path": info["path"],
+            "agents": ", ".join(info["agents"]) if info["agents"] else "None",
+            "scope": "global" if global_scope else "project"
+        })
+
+    skills.sort(key=lambda s: s["name"].lower())
+    return skills
@@ -0,0 +1,124 @@
+import fnmatch
+import html
+import os
+import threading
+from collections import OrderedDict
+
+# Never descend into these (vendored deps, VCS data, bytecode)
+EXCLUDE_PATTERNS = (".git", "node_modules", "__pycache__", "*.pyc", ".DS_Store")
+
+# Levels below the skill root shown without explicit expansion
+DEFAULT_DEPTH = 1
+# Entries listed per directory before the rest is summarised
+MAX_ENTRIES = 200
+MAX_CACHED_DIRS = 1024
+MAX_CACHED_FILES = 64
+
+_lock = threading.Lock()
+_dir_cache = OrderedDict()   # path -> (mtime_ns, dirs, files)
+_file_cache = OrderedDict()  # path -> ((mtime_ns, size), text)
+
+
+def is_excluded(name, patterns=EXCLUDE_PATTERNS):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def _remember(cache, key, value, limit):
+    with _lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+
+def list_dir(path):
+    """Return (dirs, files) of one directory, sorted and filtered.
+
+    Cached per directory and keyed by its mtime, which changes whenever an
+    entry is added, removed or renamed directly inside it.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return [], []
+    with _lock:
+        cached = _dir_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+
+    dirs, files = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if is_excluded(entry.name):
+                    continue
+                try:
+                    (dirs if entry.is_dir() else files).append(entry.name)
+                except OSError:
+                    files.append(entry.name)
+    except OSError:
+        return [], []
+    dirs.sort(key=str.lower)
+    files.sort(key=str.lower)
+    _remember(_dir_cache, path, (mtime, dirs, files), MAX_CACHED_DIRS)
+    return dirs, files
+
+
+def read_text(path):
+    """Read a text file, cached by (mtime, size). Returns "" if unreadable."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ""
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        cached = _file_cache.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            text = f.read()
+    except OSError:
+        return ""
+    _remember(_file_cache, path, (stamp, text), MAX_CACHED_FILES)
+    return text
+
+
+def build_tree(root, expanded=(), max_depth=DEFAULT_DEPTH, max_entries=MAX_ENTRIES):
+    """Render a skill directory as HTML lines, expanding folders lazily.
+
+    A folder's children are listed when it is within max_depth of the root
+    or its relative path is in `expanded`. Returns (html, collapsed) where
+    collapsed lists the relative paths of folders that could be expanded.
+    """
+    expanded = set(expanded)
+    lines = []
+    collapsed = []
+
+    def walk(path, rel, level):
+        dirs, files = list_dir(path)
+        indent = '&nbsp;' * 4 * level
+        shown = 0
+        for name in dirs:
+            if shown >= max_entries:
+                break
+            child_rel = f"{rel}/{name}" if rel else name
+            child_open = level < max_depth or child_rel in expanded
+            lines.append(f"{indent}{'📂' if child_open else '📁'} {html.escape(name)}/")
+            shown += 1
+            if child_open:
+                walk(os.path.join(path, name), child_rel, level + 1)
+            else:
+                collapsed.append(child_rel)
+        for name in files:
+            if shown >= max_entries:
+                break
+            lines.append(f"{indent}📄 {html.escape(name)}")
+            shown += 1
+        hidden = len(dirs) + len(files) - shown
+        if hidden > 0:
+            lines.append(f"{indent}… 还有 {hidden} 项")
+
+    lines.append(f"📁 {html.escape(os.path.basename(os.path.normpath(root)))}/")
+    walk(root, "", 1)
+    return "<br>".join(lines), collapsed
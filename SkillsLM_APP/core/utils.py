@@ -1,8 +1,24 @@
 import subprocess
 import re
 import os
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import shutil
 import platform
+import threading
+from SkillsLM_APP.core.cache import TTLCache
+from SkillsLM_APP.core import scanner
+from SkillsLM_APP.core import runner
+from SkillsLM_APP.core.catalog import Catalog
+
+# Installed skills listing is cached per scope; entries are keyed by the
+# skills root mtime so external installs are picked up on the next call.
+SKILLS_CACHE_TTL = 300
+_skills_cache = TTLCache("list_skills", ttl=SKILLS_CACHE_TTL)
+
+# Marketplace listings (`add <repo> --list`) persist across sessions here
+repo_catalog = Catalog()
 
 def strip_ansi(text):
     """Strip ANSI escape codes from text."""
@@ -25,8 +41,71 @@ def run_command(args):
     except Exception as e:
         return None, str(e)
 
-def list_skills(global_scope=True):
-    """List installed skills."""
+def get_skills_roots(global_scope=True):
+    """Return the skills directories (canonical + agent dirs) for a scope."""
+    return [root for _, root in scanner.skill_roots(global_scope)]
+
+def _skills_cache_key(global_scope):
+    return "global" if global_scope else f"project:{os.getcwd()}"
+
+def _skills_fingerprint(global_scope):
+    """mtime of each skills root; changes whenever a skill dir is added or removed."""
+    fingerprint = []
+    for root in get_skills_roots(global_scope):
+        try:
+            fingerprint.append([root, os.stat(root).st_mtime_ns])
+        except OSError:
+            fingerprint.append([root, None])
+    return fingerprint
+
+def list_skills(global_scope=True, use_cache=True):
+    """List installed skills (cached, see invalidate_skills_cache)."""
+    key = _skills_cache_key(global_scope)
+    fingerprint = _skills_fingerprint(global_scope)
+
+    if use_cache:
+        cached, is_stale = _skills_cache.get(key, fingerprint)
+        if cached is not None:
+            if is_stale:
+                refresh_skills_cache(global_scope)
+            return cached, None
+
+    skills, error = _list_skills_uncached(global_scope)
+    if not error:
+        _skills_cache.set(key, fingerprint, skills)
+    return skills, error
+
+def refresh_skills_cache(global_scope=True):
+    """Re-list skills in the background and store the result."""
+    def loader():
+        fingerprint = _skills_fingerprint(global_scope)
+        skills, error = _list_skills_uncached(global_scope)
+        if error:
+            return None
+        return fingerprint, skills
+
+    return _skills_cache.refresh_async(_skills_cache_key(global_scope), loader)
+
+def invalidate_skills_cache(global_scope=None, refresh=True):
+    """Drop cached listings (both scopes when global_scope is None)."""
+    scopes = [True, False] if global_scope is None else [global_scope]
+    for scope in scopes:
+        _skills_cache.invalidate(_skills_cache_key(scope))
+        if refresh:
+            refresh_skills_cache(scope)
+
+def _list_skills_uncached(global_scope=True):
+    """List installed skills, scanning the filesystem and falling back to the CLI."""
+    try:
+        skills = scanner.scan_skills(global_scope)
+    except Exception:
+        skills = None
+    if skills is not None:
+        return skills, None
+    return _list_skills_npx(global_scope)
+
+def _list_skills_npx(global_scope=True):
+    """List installed skills via `npx skills list`."""
     args = ["list"]
     if global_scope:
         args.append("-g")
@@ -93,12 +172,56 @@ def list_skills(global_scope=True):
     
     return skills, None
 
-def get_repo_skills(repo):
-    """List skills in a repository."""
+def get_repo_skills(repo, use_cache=True):
+    """List skills in a repository (served from the catalog while valid)."""
+    etag = None
+    if use_cache:
+        cached, etag = repo_catalog.lookup(repo)
+        if cached is not None:
+            return cached, None
+
     stdout, stderr = run_command(["add", repo, "--list"])
-    if not stdout:
-        return [], stderr
-        
+    return _store_repo_listing(repo, stdout, stderr, etag)
+
+def get_repos_skills(repos, concurrency=runner.DEFAULT_CONCURRENCY, use_cache=True):
+    """List skills of several repositories concurrently.
+
+    Returns {repo: (skills, error)}; total time is roughly that of the slowest repo.
+    """
+    results = {}
+    etags = {}
+    if use_cache and repos:
+        # Stale rows revalidate over the network (up to REVALIDATE_TIMEOUT each),
+        # so look the repos up concurrently too
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(repos))) as pool:
+            lookups = list(pool.map(repo_catalog.lookup, repos))
+        for repo, (cached, etag) in zip(repos, lookups):
+            etags[repo] = etag
+            if cached is not None:
+                results[repo] = (cached, None)
+
+    pending = [repo for repo in repos if repo not in results]
+    outputs = runner.run_commands([["add", repo, "--list"] for repo in pending], concurrency=concurrency)
+    for repo, (stdout, stderr, _) in zip(pending, outputs):
+        results[repo] = _store_repo_listing(repo, stdout, stderr, etags.get(repo))
+    return {repo: results[repo] for repo in repos}
+
+def _store_repo_listing(repo, stdout, stderr, etag=None):
+    """Parse a `--list` run and save it to the catalog; on failure serve any stale copy."""
+    skills = parse_repo_skills(stdout, repo) if stdout else []
+    if skills:
+        if etag is None and repo_catalog.revalidate:
+            etag = repo_catalog.revalidate(repo)
+        repo_catalog.put(repo, skills, etag)
+        return skills, None
+
+    stale = repo_catalog.get(repo)
+    if stale:
+        return stale["skills"], None
+    return [], stderr
+
+def parse_repo_skills(stdout, repo):
+    """Parse the output of `npx skills add <repo> --list`."""
     stdout = strip_ansi(stdout)
     skills = []
     lines = stdout.splitlines()
@@ -141,28 +264,89 @@ def get_repo_skills(repo):
         elif leading_spaces >= 6 and current_skill_name: # Heuristic for description
              skills[-1]["description"] += content + " "
                 
-    return skills, None
+    return skills
 
-def install_skill(repo, skill_name=None, global_install=True):
+def _install_args(repo, skill_names=None, global_install=True):
+    """Build `add` args; several --skill flags share one clone of the repo."""
     args = ["add", repo]
-    if skill_name:
+    for skill_name in skill_names or []:
         args.extend(["--skill", skill_name])
     if global_install:
         args.append("-g")
     args.append("-y")
-    
-    return run_command(args)
+    return args
+
+def install_skill(repo, skill_name=None, global_install=True):
+    result = run_command(_install_args(repo, [skill_name] if skill_name else None, global_install))
+    invalidate_skills_cache(global_install)
+    return result
+
+def install_skills_concurrently(items, global_install=True, concurrency=runner.DEFAULT_CONCURRENCY):
+    """Install several (repo, skill_name) pairs in parallel. Returns [(stdout, stderr)] in order."""
+    commands = [
+        _install_args(repo, [skill_name] if skill_name else None, global_install)
+        for repo, skill_name in items
+    ]
+    results = runner.run_commands(commands, concurrency=concurrency)
+    invalidate_skills_cache(global_install)
+    return [(stdout, stderr) for stdout, stderr, _ in results]
+
+def install_skills_batch(items, global_install=True, concurrency=runner.DEFAULT_CONCURRENCY):
+    """Install many (repo, skill_name) pairs with one `npx skills add` per repo.
+
+    Skills from the same repo go into a single invocation (one clone), and
+    different repos run concurrently. Returns one report per requested skill:
+    {"repo", "name", "ok", "message"}, in the order of `items` (duplicates dropped).
+    """
+    items = list(dict.fromkeys(items))
+    by_repo = {}
+    for repo, skill_name in items:
+        names = by_repo.setdefault(repo, [])
+        if skill_name not in names:
+            names.append(skill_name)
+
+    repos = list(by_repo)
+    outputs = runner.run_commands(
+        [_install_args(repo, by_repo[repo], global_install) for repo in repos],
+        concurrency=concurrency
+    )
+    invalidate_skills_cache(global_install, refresh=False)
+    repo_output = dict(zip(repos, outputs))
+
+    # The CLI prints one summary per run, so also check what actually landed on
+    # disk; a skill that was already installed must not hide a failed command
+    installed, list_err = list_skills(global_install, use_cache=False)
+    installed_names = {s["name"] for s in installed} if not list_err else None
+
+    reports = []
+    for repo, skill_name in items:
+        _, stderr, returncode = repo_output[repo]
+        stderr = strip_ansi(stderr or "").strip()
+        command_ok = returncode == 0
+        ok = command_ok and (installed_names is None or skill_name in installed_names)
+        if ok:
+            message = "已安装"
+        elif not command_ok:
+            message = stderr.splitlines()[-1] if stderr else "安装命令失败"
+        else:
+            message = "安装后未找到该技能"
+        reports.append({"repo": repo, "name": skill_name, "ok": ok, "message": message})
+    return reports
 
 def remove_skill(skill_name, global_scope=True):
     args = ["remove", skill_name]
     if global_scope:
         args.append("-g")
     args.append("-y")
-    return run_command(args)
+    result = run_command(args)
+    invalidate_skills_cache(global_scope)
+    return result
 
 def update_skills():
     """Update all skills."""
-    return run_command(["update"])
+    result = run_command(["update"])
+    invalidate_skills_cache()
+    return result
 
 def check_updates():
     """Check for updates."""
@@ -197,57 +381,118 @@ def save_file(path, content):
     except Exception as e:
         return False, str(e)
 
-def extract_flowchart_from_markdown(content):
-    """Extract workflow steps from markdown content and generate Mermaid flowchart."""
-    # Heuristic: Look for numbered lists or sections that imply steps
-    steps = []
-    
-    # Strategy 1: Look for "Steps" or "Instructions" section
-    lines = content.split('\n')
+# Flowchart extraction: patterns compiled once, results memoized by content hash
+_STEPS_HEADING = re.compile(r'^#+\s*(Steps|Instructions|How to Use|Usage)', re.IGNORECASE)
+_NUMBERED_STEP = re.compile(r'^\d+\.\s+(.+)')
+FLOWCHART_CACHE_SIZE = 256
+# Shared by every Streamlit session thread; guard all access with the lock
+_flowchart_lock = threading.Lock()
+_flowchart_cache = OrderedDict()   # sha1(content) -> mermaid or None
+_flowchart_files = OrderedDict()   # doc path -> ((mtime_ns, size), mermaid or None)
+_MISSING = object()
+
+def parse_markdown_steps(content):
+    """Collect workflow steps in one pass over the lines.
+
+    Steps come from the first "Steps/Instructions/How to Use/Usage" section
+    (numbered or bulleted items until the next heading); if it yields
+    nothing, every numbered line in the document is used instead.
+    """
+    section_steps = []
+    numbered_steps = []
     in_steps = False
-    
-    for line in lines:
+    section_done = False
+
+    for line in content.split('\n'):
         stripped = line.strip()
-        if re.match(r'^#+\s*(Steps|Instructions|How to Use|Usage)', stripped, re.IGNORECASE):
+        numbered = _NUMBERED_STEP.match(stripped)
+        if numbered:
+            numbered_steps.append(numbered.group(1))
+        if section_done:
+            continue
+        if _STEPS_HEADING.match(stripped):
             in_steps = True
             continue
-        
         if in_steps:
             if stripped.startswith('#'): # New section
-                break
-            # Match numbered list: 1. Step description
-            match = re.match(r'^\d+\.\s+(.+)', stripped)
-            if match:
-                steps.append(match.group(1))
-            # Match bullet list: - Step description (only if we found no numbered steps yet or mixed)
+                in_steps = False
+                section_done = True
+            elif numbered:
+                section_steps.append(numbered.group(1))
             elif stripped.startswith('- ') or stripped.startswith('* '):
-                 steps.append(stripped[2:])
-
-    if not steps:
-        # Fallback: Just try to find any numbered list in the whole doc
-        for line in lines:
-            match = re.match(r'^\d+\.\s+(.+)', line.strip())
-            if match:
-                steps.append(match.group(1))
-                
-    if not steps:
-        return None
+                section_steps.append(stripped[2:])
 
-    # Generate Mermaid syntax
-    mermaid = "graph TD;\n"
+    return section_steps or numbered_steps
+
+def steps_to_mermaid(steps):
+    """Render steps as a top-down Mermaid chain."""
+    parts = ["graph TD;\n"]
     for i, step in enumerate(steps):
         # Sanitize step text for mermaid
         safe_step = step.replace('"', "'").replace(';', '').replace('(', '').replace(')', '')[:50]
         if len(step) > 50: safe_step += "..."
-        
-        node_id = f"step{i}"
-        mermaid += f'    {node_id}["{i+1}. {safe_step}"]\n'
-        
+        parts.append(f'    step{i}["{i+1}. {safe_step}"]\n')
         if i > 0:
-            mermaid += f"    step{i-1} --> {node_id}\n"
-            
+            parts.append(f"    step{i-1} --> step{i}\n")
+    return "".join(parts)
+
+def _remember_flowchart(cache, key, value):
+    with _flowchart_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > FLOWCHART_CACHE_SIZE:
+            cache.popitem(last=False)
+
+def extract_flowchart_from_markdown(content):
+    """Extract workflow steps from markdown content and generate Mermaid flowchart."""
+    key = hashlib.sha1(content.encode('utf-8', errors='surrogatepass')).hexdigest()
+    with _flowchart_lock:
+        cached = _flowchart_cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            _flowchart_cache.move_to_end(key)
+    if cached is not _MISSING:
+        return cached
+
+    steps = parse_markdown_steps(content)
+    mermaid = steps_to_mermaid(steps) if steps else None
+    _remember_flowchart(_flowchart_cache, key, mermaid)
     return mermaid
 
+def get_skill_doc_path(skill_path):
+    """SKILL.md if present, else README.md (may not exist)."""
+    doc_path = os.path.join(skill_path, "SKILL.md")
+    if not os.path.exists(doc_path):
+        doc_path = os.path.join(skill_path, "README.md")
+    return doc_path
+
+def extract_flowcharts_for_skills(skills):
+    """Flowcharts for many skills: [(skill, mermaid or None)] in input order.
+
+    Docs are only re-read and re-parsed when their (mtime, size) changes.
+    """
+    results = []
+    for skill in skills:
+        doc_path = get_skill_doc_path(skill['path'])
+        try:
+            st = os.stat(doc_path)
+        except OSError:
+            results.append((skill, None))
+            continue
+        stamp = (st.st_mtime_ns, st.st_size)
+        with _flowchart_lock:
+            cached = _flowchart_files.get(doc_path)
+        if cached and cached[0] == stamp:
+            mermaid = cached[1]
+        else:
+            try:
+                with open(doc_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    mermaid = extract_flowchart_from_markdown(f.read())
+            except OSError:
+                mermaid = None
+            _remember_flowchart(_flowchart_files, doc_path, (stamp, mermaid))
+        results.append((skill, mermaid))
+    return results
+
 def create_skill_from_prompt(name, prompt, description, target_dir):
     """Create a new skill from a generated prompt."""
     try:
@@ -34,3 +34,11 @@ def render_view():
         else:
             for skill in skills:
                 render_skill_card(skill, utils, is_global=True)
+
+            # Parsed docs are cached by mtime, so toggling this on is cheap after the first time
+            if st.toggle("🔄 全部工作流概览", key="home_all_workflows"):
+                flowcharts = [(s, m) for s, m in utils.extract_flowcharts_for_skills(skills) if m]
+                st.caption(f"{len(flowcharts)} / {len(skills)} 个技能包含可识别的步骤")
+                for skill, mermaid_code in flowcharts:
+                    with st.expander(f"📘 {skill['name']}"):
+                        st.markdown(f"```mermaid\n{mermaid_code}\n```")
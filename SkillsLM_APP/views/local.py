@@ -17,6 +17,7 @@ def render_view():
             
     with col_h2:
         if st.button("🔄 刷新", use_container_width=True):
+            utils.invalidate_skills_cache(global_scope=False, refresh=False)
             st.rerun()
 
     search_query = st.text_input("🔍 搜索本地技能...", placeholder="Type to search...", label_visibility="collapsed")
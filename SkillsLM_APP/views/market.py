@@ -1,6 +1,150 @@
 
 import streamlit as st
 import SkillsLM_APP.core.utils as utils
+from SkillsLM_APP.core import prefetch
+
+MARKET_PAGE_SIZES = [12, 24, 48, 96]
+
+# Run the grid as a fragment where supported, so paging and selecting only
+# rerun the grid instead of the whole page.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+def _search_market(query, current_repo, market_skills, cross_repo=False):
+    """Ranked search through the catalog index; linear scan if the repo isn't cataloged."""
+    hits = utils.repo_catalog.search(query, repo=None if cross_repo else current_repo)
+    if hits is None:
+        return market_skills
+    if hits or cross_repo or utils.repo_catalog.get(current_repo) is not None:
+        return hits
+    query = query.lower()
+    return [s for s in market_skills if query in s['name'].lower() or query in s['description'].lower()]
+
+def _fragment_or_plain(func):
+    return _fragment(func) if _fragment else func
+
+def _select_key(repo, name):
+    return f"mkt_sel_{repo}_{name}"
+
+def _toggle_selection(repo, name):
+    # Multi-select survives filtering/paging/repo switches: {(repo, name): True}
+    selection = st.session_state.setdefault('market_selection', {})
+    if st.session_state.get(_select_key(repo, name)):
+        selection[(repo, name)] = True
+    else:
+        selection.pop((repo, name), None)
+
+def _unique_skills(market_skills, current_repo):
+    """Drop repeated (repo, name) entries, keeping the first (best ranked) one.
+
+    Widget keys and the selection are per (repo, name), so a listing or catalog
+    that repeats a skill would otherwise create duplicate widget keys.
+    """
+    seen = set()
+    unique = []
+    for skill in market_skills:
+        key = (skill.get('repo', current_repo), skill['name'])
+        if key not in seen:
+            seen.add(key)
+            unique.append(skill)
+    return unique
+
+def _set_page(page):
+    st.session_state['market_page'] = page
+
+def _clear_selection():
+    selection = st.session_state.setdefault('market_selection', {})
+    for repo, name in selection:
+        st.session_state.pop(_select_key(repo, name), None)
+    selection.clear()
+
+@_fragment_or_plain
+def _render_market_grid(market_skills, current_repo, signature):
+    """Selection toolbar + one page of market cards (only the visible page creates widgets)."""
+    selection = st.session_state.setdefault('market_selection', {})
+
+    if selection:
+        col_sel, col_batch, col_clear = st.columns([2, 1, 1])
+        with col_sel:
+            repo_count = len({repo for repo, _ in selection})
+            st.markdown(f"已选择 **{len(selection)}** 个技能（{repo_count} 个仓库）")
+        with col_batch:
+            if st.button("📥 安装所选", type="primary", use_container_width=True):
+                with st.spinner(f"正在安装 {len(selection)} 个技能..."):
+                    st.session_state['market_install_report'] = utils.install_skills_batch(list(selection))
+                _clear_selection()
+                st.rerun()
+        with col_clear:
+            if st.button("清空选择", use_container_width=True):
+                _clear_selection()
+                st.rerun()
+
+    if 'market_install_report' in st.session_state:
+        _render_install_report(st.session_state.pop('market_install_report'))
+
+    market_skills = _unique_skills(market_skills, current_repo)
+    if not market_skills:
+        st.info("No skills found.")
+        return
+
+    # Back to the first page whenever the repo, query or scope changes
+    if st.session_state.get('market_page_sig') != signature:
+        st.session_state['market_page_sig'] = signature
+        st.session_state['market_page'] = 0
+
+    page_size = st.session_state.get('market_page_size', MARKET_PAGE_SIZES[0])
+    page_count = max(1, -(-len(market_skills) // page_size))
+    page = min(st.session_state.get('market_page', 0), page_count - 1)
+    page_skills = market_skills[page * page_size:(page + 1) * page_size]
+
+    cols = st.columns(3)
+    for i, skill in enumerate(page_skills):
+        repo = skill.get('repo', current_repo)
+        with cols[i % 3]:
+            with st.container():
+                st.markdown(f"""
+                <div class='market-card'>
+                    <div>
+                        <h4>{skill['name']}</h4>
+                        <div class='repo-link'>{repo}</div>
+                        <div style='font-size:0.9em; color:#c9d1d9; line-height:1.4;'>{skill.get('description', '')[:100]}...</div>
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
+
+                c_sel, c_inst = st.columns([1, 1])
+                with c_sel:
+                    st.checkbox("选择", value=(repo, skill['name']) in selection,
+                                key=_select_key(repo, skill['name']),
+                                on_change=_toggle_selection, args=(repo, skill['name']))
+                with c_inst:
+                    if st.button("📥 安装", key=f"mkt_inst_{repo}_{skill['name']}", use_container_width=True):
+                         with st.spinner(f"Installing {skill['name']}..."):
+                             utils.install_skill(repo, skill['name'])
+                             st.success("Installed!")
+
+    col_prev, col_info, col_size, col_next = st.columns([1, 2, 1, 1])
+    with col_prev:
+        st.button("⬅️ 上一页", key="mkt_prev", disabled=page == 0, use_container_width=True,
+                  on_click=_set_page, args=(page - 1,))
+    with col_info:
+        st.caption(f"第 {page + 1} / {page_count} 页 · 共 {len(market_skills)} 个技能")
+    with col_size:
+        st.selectbox("每页", MARKET_PAGE_SIZES, key='market_page_size', label_visibility="collapsed")
+    with col_next:
+        st.button("下一页 ➡️", key="mkt_next", disabled=page >= page_count - 1, use_container_width=True,
+                  on_click=_set_page, args=(page + 1,))
+
+def _render_install_report(report):
+    """Show per-skill results of a batched install."""
+    ok_count = sum(1 for r in report if r['ok'])
+    if ok_count == len(report):
+        st.success(f"✅ 成功安装 {ok_count} 个技能")
+    else:
+        st.warning(f"安装完成: {ok_count} 成功, {len(report) - ok_count} 失败")
+    with st.expander("安装详情", expanded=ok_count < len(report)):
+        for r in report:
+            icon = "✅" if r['ok'] else "❌"
+            st.markdown(f"{icon} **{r['name']}** `{r['repo']}` — {r['message']}")
 
 def render_view():
     """Render Market / Install Skills View."""
@@ -114,33 +258,13 @@ def render_view():
         
         # Featured Repos
         st.markdown("**推荐仓库**")
-        col_f1, col_f2, col_f3, col_f4 = st.columns(4)
-        if col_f1.button("Vercel Labs", use_container_width=True):
-            st.session_state['current_market_repo'] = "vercel-labs/agent-skills"
-            if 'market_data' in st.session_state: del st.session_state['market_data']
-            st.rerun()
-            
-        if col_f2.button("ComposioHQ", use_container_width=True):
-             st.session_state['current_market_repo'] = "ComposioHQ/awesome-claude-skills"
-             if 'market_data' in st.session_state: del st.session_state['market_data']
-             st.rerun()
-             
-        if col_f3.button("Anthropic Skills", use_container_width=True, help="Official Anthropic Skills"):
-             st.session_state['current_market_repo'] = "anthropics/skills"
-             if 'market_data' in st.session_state: del st.session_state['market_data']
-             st.rerun()
-        
-        if col_f4.button("OpenAI Skills", use_container_width=True, help="Official OpenAI Codex Skills"): 
-             st.session_state['current_market_repo'] = "openai/skills"
-             if 'market_data' in st.session_state: del st.session_state['market_data']
-             st.rerun()
-
-        # Row 2
-        col_f5, col_f6, _, _ = st.columns(4)
-        if col_f5.button("Claude Plugins", use_container_width=True, help="Official Claude Code Plugins"):
-             st.session_state['current_market_repo'] = "anthropics/claude-plugins-official"
-             if 'market_data' in st.session_state: del st.session_state['market_data']
-             st.rerun()
+        for row_start in range(0, len(prefetch.CURATED_REPOS), 4):
+            row_cols = st.columns(4)
+            for col, (label, repo, help_text) in zip(row_cols, prefetch.CURATED_REPOS[row_start:row_start + 4]):
+                if col.button(label, use_container_width=True, help=help_text):
+                    st.session_state['current_market_repo'] = repo
+                    if 'market_data' in st.session_state: del st.session_state['market_data']
+                    st.rerun()
 
         st.markdown("**更多资源**")
         col_ext1, col_ext2 = st.columns([1, 3])
@@ -159,49 +283,50 @@ def render_view():
         st.caption(f"当前仓库: `{current_repo}`")
 
         # Load Market Data
+        market_loading = False
         if 'market_data' not in st.session_state:
-            with st.spinner(f"正在从 {current_repo} 加载技能列表..."):
-                official_skills, err = utils.get_repo_skills(current_repo)
-                if official_skills:
-                    st.session_state['market_data'] = official_skills
-                else:
-                    st.error(f"Failed to load market data: {err}")
-                    st.session_state['market_data'] = []
+            cached = utils.repo_catalog.get(current_repo)
+            if cached:
+                # Serve the catalog copy right away, even if stale; refresh it in the background
+                st.session_state['market_data'] = cached['skills']
+                if cached['stale']:
+                    prefetch.prefetch([current_repo])
+            elif prefetch.is_loading(current_repo):
+                # Prefetch already fetching this repo: don't start a second clone
+                market_loading = True
+                st.info(f"⏳ {current_repo} 正在后台加载，请稍候...")
+                if st.button("🔄 检查加载进度", key="mkt_poll"):
+                    st.rerun()
+            else:
+                with st.spinner(f"正在从 {current_repo} 加载技能列表..."):
+                    official_skills, err = utils.get_repo_skills(current_repo)
+                    if official_skills:
+                        st.session_state['market_data'] = official_skills
+                    else:
+                        st.error(f"Failed to load market data: {err}")
+                        st.session_state['market_data'] = []
 
         # Filter
-        col_search, col_sort = st.columns([3, 1])
+        col_search, col_scope, col_sort, col_refresh = st.columns([3, 1, 1, 1])
         with col_search:
             market_search = st.text_input("🔍 搜索市场...", value=default_search, label_visibility="collapsed")
+        with col_scope:
+            cross_repo = st.toggle("跨仓库", key="mkt_cross_repo", help="搜索所有已缓存仓库中的技能")
         with col_sort:
-            st.caption(f"共 {len(st.session_state['market_data'])} 个技能")
+            st.caption(f"共 {len(st.session_state.get('market_data', []))} 个技能")
+        with col_refresh:
+            if st.button("🔄 刷新", key="mkt_refresh", use_container_width=True, help="忽略缓存，重新获取该仓库的技能列表"):
+                utils.repo_catalog.invalidate(current_repo)
+                st.session_state.pop('market_data', None)
+                st.rerun()
 
         # Display Grid
-        market_skills = st.session_state['market_data']
+        market_skills = st.session_state.get('market_data', [])
         if market_search:
-            market_skills = [s for s in market_skills if market_search.lower() in s['name'].lower() or market_search.lower() in s['description'].lower()]
+            market_skills = _search_market(market_search, current_repo, market_skills, cross_repo)
         
-        if not market_skills:
-            st.info("No skills found.")
-        else:
-            cols = st.columns(3)
-            for i, skill in enumerate(market_skills):
-                with cols[i % 3]:
-                    with st.container():
-                        st.markdown(f"""
-                        <div class='market-card'>
-                            <div>
-                                <h4>{skill['name']}</h4>
-                                <div class='repo-link'>{skill.get('repo', current_repo)}</div>
-                                <div style='font-size:0.9em; color:#c9d1d9; line-height:1.4;'>{skill.get('description', '')[:100]}...</div>
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        if st.button("📥 安装", key=f"mkt_inst_{i}", use_container_width=True):
-                             repo = skill.get('repo', current_repo)
-                             with st.spinner(f"Installing {skill['name']}..."):
-                                 utils.install_skill(repo, skill['name'])
-                                 st.success("Installed!")
+        if not market_loading:
+            _render_market_grid(market_skills, current_repo, (current_repo, market_search, cross_repo))
 
     with tab_local:
         st.info("输入本地 Skill 路径进行安装")
@@ -232,7 +357,17 @@ def render_view():
         
         if 'custom_repo_skills' in st.session_state:
             st.divider()
-            st.subheader(f"📦 {st.session_state['custom_repo_name']}")
+            col_title, col_all = st.columns([3, 1])
+            with col_title:
+                st.subheader(f"📦 {st.session_state['custom_repo_name']}")
+            with col_all:
+                if st.button("📥 全部安装", key="cust_inst_all", use_container_width=True):
+                    repo_name = st.session_state['custom_repo_name']
+                    items = [(repo_name, s['name']) for s in st.session_state['custom_repo_skills']]
+                    with st.spinner(f"正在安装 {len(items)} 个技能..."):
+                        st.session_state['custom_install_report'] = utils.install_skills_batch(items)
+            if 'custom_install_report' in st.session_state:
+                _render_install_report(st.session_state.pop('custom_install_report'))
             for skill in st.session_state['custom_repo_skills']:
                 c1, c2 = st.columns([4, 1])
                 with c1:
@@ -4,6 +4,66 @@ import os
 import sys
 import SkillsLM_APP.core.utils as utils
 
+@st.cache_resource
+def _shared_connection_provider(db_path):
+    """One read-only connection provider shared by every session.
+
+    Each rerun runs on a new script thread; the provider closes the connections
+    of finished threads when it opens a new one.
+    """
+    from connection_provider import ConnectionProvider
+    return ConnectionProvider(db_path, read_only=True)
+
+@st.cache_resource
+def _shared_element_catalog(db_path):
+    """In-memory element indexes, loaded once per process."""
+    from element_catalog import ElementCatalog
+    return ElementCatalog(_shared_connection_provider(db_path).connection())
+
+@st.cache_resource
+def _shared_result_cache():
+    """Results of deterministic generations (portrait/software), reused across sessions."""
+    from core.result_cache import ResultCache
+    return ResultCache()
+
+@st.cache_resource
+def _configure_generator_logging():
+    """Keep the generator's per-step progress lines out of the server log (warnings still show)."""
+    import gen_logging
+    gen_logging.configure(level=os.environ.get('PROMPT_GEN_LOG_LEVEL', 'WARNING'))
+    return True
+
+def _render_performance_panel():
+    """Per-stage latency (p50/p95/p99) collected by gen_metrics; process-wide, shared by all sessions."""
+    import gen_metrics
+
+    with st.expander("📈 性能", expanded=False):
+        rows = gen_metrics.stats()
+        if not rows:
+            st.caption("暂无数据，生成一次提示词后显示各阶段耗时")
+            return
+
+        types = sorted({r['type'] for r in rows})
+        col_type, col_reset = st.columns([3, 1])
+        with col_type:
+            selected = st.selectbox("生成类型", ["全部"] + types, index=0, key="perf_type")
+        with col_reset:
+            if st.button("🔄 清空统计", use_container_width=True):
+                gen_metrics.reset()
+                st.rerun()
+
+        cache = _shared_result_cache().stats()
+        st.caption(f"结果缓存: {cache['entries']} 条，命中 {cache['hits']} 次 / 未命中 {cache['misses']} 次")
+
+        if selected != "全部":
+            rows = [r for r in rows if r['type'] == selected]
+        st.dataframe(
+            [{"类型": r['type'], "阶段": r['stage'], "次数": r['count'],
+              "平均(ms)": r['mean_ms'], "p50(ms)": r['p50_ms'], "p95(ms)": r['p95_ms'],
+              "p99(ms)": r['p99_ms'], "最大(ms)": r['max_ms']} for r in rows],
+            use_container_width=True, hide_index=True
+        )
+
 def render_view():
     """Render Prompt Generator View."""
     st.title("✨ 智能提示词生成器")
@@ -22,6 +82,7 @@ def render_view():
     
     try:
         from core.cross_domain_generator import CrossDomainGenerator
+        _configure_generator_logging()
         
         # Initialize generator (cache it)
         if 'prompt_generator' not in st.session_state:
@@ -29,7 +90,12 @@ def render_view():
                 # Construct paths relative to the generator directory
                 db_path = os.path.join(generator_path, "extracted_results", "elements.db")
                 yaml_dir = os.path.join(generator_path, "variables")
-                st.session_state['prompt_generator'] = CrossDomainGenerator(db_path=db_path, yaml_dir=yaml_dir)
+                st.session_state['prompt_generator'] = CrossDomainGenerator(
+                    db_path=db_path, yaml_dir=yaml_dir,
+                    provider=_shared_connection_provider(db_path),
+                    catalog=_shared_element_catalog(db_path),
+                    result_cache=_shared_result_cache()
+                )
         
         generator = st.session_state['prompt_generator']
         
@@ -126,6 +192,8 @@ def render_view():
                         else:
                             st.error(f"保存失败: {err}")
 
+        _render_performance_panel()
+
     except ImportError as e:
         st.error(f"无法加载生成器模块: {e}")
         st.info(f"搜索路径: {generator_path}")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接提供者 - 在整个生成器栈中共享SQLite连接
+每个线程一个连接，支持只读URI模式、WAL和性能PRAGMA
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+# 默认PRAGMA：元素库只有几MB，整库映射进内存、页缓存放得下全部热数据
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024   # 256MB
+DEFAULT_CACHE_SIZE = -16000             # 负数表示KB，约16MB
+DEFAULT_TEMP_STORE = 'MEMORY'
+
+
+class ConnectionProvider:
+    """线程安全的SQLite连接提供者
+
+    - 每个线程首次访问时创建自己的连接（sqlite3连接不能跨线程共享游标）
+    - 创建新连接时关闭已结束线程的连接（如Streamlit每次rerun换一个线程），连接数不随线程数增长
+    - read_only=True 时使用 `file:...?mode=ro` URI 打开，并开启 query_only
+    - wal=True 且可写时切换到WAL日志模式（会修改数据库文件头，只读模式下忽略）
+    """
+
+    def __init__(self, db_path: str = "extracted_results/elements.db",
+                 read_only: bool = False,
+                 wal: bool = False,
+                 mmap_size: int = DEFAULT_MMAP_SIZE,
+                 cache_size: int = DEFAULT_CACHE_SIZE,
+                 temp_store: str = DEFAULT_TEMP_STORE,
+                 timeout: float = 10.0):
+        """
+        初始化连接提供者
+
+        Args:
+            db_path: 数据库路径
+            read_only: 是否以只读模式打开
+            wal: 可写时是否启用WAL
+            mmap_size: PRAGMA mmap_size（字节）
+            cache_size: PRAGMA cache_size（负数为KB）
+            temp_store: PRAGMA temp_store
+            timeout: 等待数据库锁的秒数
+        """
+        self.db_path = str(db_path)
+        self.read_only = read_only
+        self.wal = wal and not read_only
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.temp_store = temp_store
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        """创建并配置一个新连接"""
+        if self.read_only:
+            uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False)
+            conn.execute('PRAGMA query_only = ON')
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+            if self.wal:
+                conn.execute('PRAGMA journal_mode = WAL')
+                conn.execute('PRAGMA synchronous = NORMAL')
+
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        conn.execute(f'PRAGMA cache_size = {int(self.cache_size)}')
+        conn.execute(f'PRAGMA temp_store = {self.temp_store}')
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """返回当前线程的连接（首次调用时创建）"""
+        conn: Optional[sqlite3.Connection] = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("ConnectionProvider已关闭")
+            self._prune()
+            conn = self._open()
+            self._connections.append((threading.current_thread(), conn))
+        self._local.conn = conn
+        return conn
+
+    def _prune(self):
+        """关闭已结束线程的连接（持有self._lock时调用）"""
+        alive = []
+        for thread, conn in self._connections:
+            if thread.is_alive():
+                alive.append((thread, conn))
+            else:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+        self._connections = alive
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """在当前线程的连接上执行SQL"""
+        return self.connection().execute(sql, params)
+
+    def close(self):
+        """关闭所有线程创建的连接"""
+        with self._lock:
+            self._closed = True
+            connections, self._connections = self._connections, []
+        for _, conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+def test_connection_provider():
+    """测试连接提供者"""
+    print("=" * 80)
+    print("测试ConnectionProvider")
+    print("=" * 80)
+
+    provider = ConnectionProvider(read_only=True)
+
+    # 测试1：同一线程复用连接
+    print("\n【测试1】同一线程复用连接")
+    assert provider.connection() is provider.connection()
+    count = provider.execute("SELECT COUNT(*) FROM elements").fetchone()[0]
+    print(f"  元素数量: {count}")
+
+    # 测试2：不同线程各自的连接
+    print("\n【测试2】多线程各自持有连接")
+    seen = []
+
+    def worker():
+        seen.append(provider.connection())
+        provider.execute("SELECT COUNT(*) FROM elements").fetchone()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(map(id, seen))) == 4 and provider.connection() not in seen
+    print(f"  线程连接数: {len(seen)}")
+
+    # 测试3：已结束线程的连接被回收
+    print("\n【测试3】短命线程的连接回收")
+    for _ in range(50):
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+    assert len(provider._connections) <= 2, len(provider._connections)
+    print(f"  50个线程结束后保留的连接数: {len(provider._connections)}")
+
+    # 测试4：只读模式拒绝写入
+    print("\n【测试4】只读模式拒绝写入")
+    try:
+        provider.execute("DELETE FROM elements WHERE 0")
+        print("  ❌ 写入未被拒绝")
+    except sqlite3.OperationalError as e:
+        print(f"  ✅ {e}")
+
+    provider.close()
+    print("\n✅ 测试完成")
+
+
+if __name__ == '__main__':
+    test_connection_provider()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量生成 - 多进程运行CrossDomainGenerator，流式输出JSONL
+每个工作进程持有自己的生成器实例；每条输入使用固定种子并清空采样历史，结果与分配到哪个进程无关
+重复的输入命中结果缓存（进程内LRU，--cache 指定文件时各进程共用磁盘缓存）
+
+用法:
+    python3 core/bulk_generate.py inputs.jsonl -o results.jsonl --workers 8
+    python3 core/bulk_generate.py inputs.csv --type design --seed 42
+    python3 core/bulk_generate.py inputs.jsonl --cache results_cache.db
+
+输入格式:
+    JSONL: 每行一个字符串，或 {"input": "...", "type": "design", "seed": 7}
+    CSV:   表头包含 input 列（可选 type、seed 列）
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Union
+
+# 添加上级目录到路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import gen_logging
+from core.cross_domain_generator import CrossDomainGenerator
+from core.result_cache import ResultCache
+
+
+DEFAULT_DB_PATH = os.path.join(ROOT_DIR, "extracted_results", "elements.db")
+DEFAULT_YAML_DIR = os.path.join(ROOT_DIR, "variables")
+
+# 工作进程内的生成器（由 _init_worker 创建）
+_worker_generator: Optional[CrossDomainGenerator] = None
+
+
+def normalize_inputs(inputs: Iterable[Union[str, Dict]], generation_type: str = 'auto',
+                     seed: int = 0) -> Iterator[Dict]:
+    """把输入统一为 {'index', 'input', 'type', 'seed'} 任务；第i条默认种子为 seed + i"""
+    for index, item in enumerate(inputs):
+        if isinstance(item, str):
+            item = {'input': item}
+        text = item.get('input', item.get('user_input'))
+        if text is None:
+            raise ValueError(f"第 {index + 1} 条输入缺少 input 字段")
+        item_seed = item.get('seed')
+        yield {
+            'index': index,
+            'input': text,
+            'type': item.get('type') or generation_type,
+            'seed': int(item_seed) if item_seed not in (None, '') else seed + index,
+        }
+
+
+def run_task(generator: CrossDomainGenerator, task: Dict) -> Dict:
+    """生成一条；异常记录到结果中（配置了JSON事件输出时记录耗时）"""
+    record = dict(task)
+    generator.reset_history()
+    try:
+        with gen_logging.stage('generate', index=task['index'], type=task['type']):
+            record['result'] = generator.generate(task['input'], task['type'], seed=task['seed'])
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def _new_generator(db_path: str, yaml_dir: str, use_catalog: bool,
+                   cache: bool, cache_path: Optional[str]) -> CrossDomainGenerator:
+    result_cache = ResultCache(path=cache_path) if cache or cache_path else None
+    return CrossDomainGenerator(db_path=db_path, yaml_dir=yaml_dir, use_catalog=use_catalog,
+                                result_cache=result_cache)
+
+
+def _init_worker(db_path: str, yaml_dir: str, use_catalog: bool,
+                 cache: bool, cache_path: Optional[str],
+                 log_level: str, events_path: Optional[str]):
+    global _worker_generator
+    # 日志走stderr，标准输出留给结果
+    gen_logging.configure(level=log_level, json_sink=events_path, console='stderr')
+    _worker_generator = _new_generator(db_path, yaml_dir, use_catalog, cache, cache_path)
+
+
+def _run_in_worker(task: Dict) -> Dict:
+    return run_task(_worker_generator, task)
+
+
+def iter_generate_batch(inputs: Iterable[Union[str, Dict]],
+                        generation_type: str = 'auto',
+                        workers: int = 1,
+                        seed: int = 0,
+                        db_path: str = DEFAULT_DB_PATH,
+                        yaml_dir: str = DEFAULT_YAML_DIR,
+                        use_catalog: bool = True,
+                        cache: bool = True,
+                        cache_path: Optional[str] = None,
+                        chunksize: int = 8,
+                        log_level: str = 'QUIET',
+                        events_path: Optional[str] = None,
+                        generator: Optional[CrossDomainGenerator] = None) -> Iterator[Dict]:
+    """
+    批量生成，按输入顺序逐条产出结果
+
+    Args:
+        inputs: 输入字符串或任务字典
+        generation_type: 默认生成类型
+        workers: 进程数；<=1 时在当前进程内顺序生成
+        seed: 基础种子
+        db_path / yaml_dir / use_catalog: 新建生成器的参数（传入generator时取其配置）
+        cache: 新建的生成器是否使用进程内结果缓存
+        cache_path: 磁盘结果缓存文件（隐含cache=True）
+        chunksize: 每次派给工作进程的任务数
+        log_level: 生成期间的控制台日志级别，默认静默（进程内模式下生成结束后恢复）
+        events_path: 工作进程写JSON事件的文件（进程内模式沿用当前的事件配置）
+        generator: 已有的生成器；workers<=1 时直接使用
+    """
+    tasks = normalize_inputs(inputs, generation_type, seed)
+
+    if generator is not None:
+        db_path, yaml_dir, use_catalog = generator.db_path, generator.yaml_dir, generator.use_catalog
+
+    if workers <= 1:
+        own = generator is None
+        if own:
+            generator = _new_generator(db_path, yaml_dir, use_catalog, cache, cache_path)
+        try:
+            with gen_logging.level_override(log_level):
+                for task in tasks:
+                    yield run_task(generator, task)
+        finally:
+            if own:
+                generator.close()
+                if generator.result_cache is not None:
+                    generator.result_cache.close()
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(db_path, yaml_dir, use_catalog, cache, cache_path,
+                                       log_level, events_path)) as pool:
+        yield from pool.map(_run_in_worker, tasks, chunksize=chunksize)
+
+
+def generate_batch(inputs: Iterable[Union[str, Dict]], **kwargs) -> List[Dict]:
+    """批量生成并返回全部结果（参数同 iter_generate_batch）"""
+    return list(iter_generate_batch(inputs, **kwargs))
+
+
+def read_inputs(stream: TextIO, fmt: str) -> Iterator[Union[str, Dict]]:
+    """读取JSONL或CSV输入（空行跳过）"""
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+        return
+
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"第 {line_no} 行不是合法的JSON: {e}") from e
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量生成提示词（输入JSONL/CSV，输出JSONL）")
+    parser.add_argument('input', help="输入文件（.jsonl/.csv），'-' 表示标准输入")
+    parser.add_argument('-o', '--output', default='-', help="输出JSONL文件，默认标准输出")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="输入格式，默认按扩展名判断")
+    parser.add_argument('--type', default='auto', help="默认生成类型（auto/portrait/design/cross_domain/software）")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="进程数")
+    parser.add_argument('--seed', type=int, default=0, help="基础种子，第i条输入使用 seed+i")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="元素数据库路径")
+    parser.add_argument('--yaml-dir', default=DEFAULT_YAML_DIR, help="YAML变量目录")
+    parser.add_argument('--no-catalog', action='store_true', help="不把元素表载入内存（逐次SQL查询）")
+    parser.add_argument('--no-cache', action='store_true', help="不缓存重复输入的结果")
+    parser.add_argument('--cache', metavar='PATH', help="磁盘结果缓存文件（SQLite），可跨次运行复用")
+    parser.add_argument('--log-level', default='QUIET', help="生成过程日志级别（DEBUG/INFO/WARNING/ERROR/QUIET）")
+    parser.add_argument('--events', help="把每条生成的耗时等事件以JSON行追加到该文件")
+    args = parser.parse_args(argv)
+
+    gen_logging.configure(json_sink=args.events, console='stderr')
+
+    fmt = args.format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+    src = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8', newline='')
+    dst = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    failed = total = 0
+    try:
+        results = iter_generate_batch(read_inputs(src, fmt), generation_type=args.type,
+                                      workers=args.workers, seed=args.seed, db_path=args.db,
+                                      yaml_dir=args.yaml_dir, use_catalog=not args.no_catalog,
+                                      cache=not args.no_cache, cache_path=args.cache,
+                                      log_level=args.log_level, events_path=args.events)
+        for record in results:
+            total += 1
+            failed += 'error' in record
+            dst.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            dst.flush()
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    print(f"完成 {total} 条，失败 {failed} 条", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
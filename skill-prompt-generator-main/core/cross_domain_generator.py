@@ -7,36 +7,176 @@
 
 import sys
 import os
+import random
 import re
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Union
 
 # 添加上级目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from connection_provider import ConnectionProvider
 from core.cross_domain_query import CrossDomainQueryEngine
 from core.design_bridge import DesignVariableBridge
+from core.keyword_matcher import ALL, FIRST, LAST, LOWER, RAW, Refine, RuleGroup, RuleSet
+from core.result_cache import ResultCache, is_cacheable
 from core.software_generator import SoftwareGenerator
+import gen_metrics
+from gen_logging import get_logger
 from intelligent_generator import IntelligentGenerator
 
+logger = get_logger('cross_domain_generator')
+
+
+# 用户输入 → Intent 的识别规则（LOWER 在小写文本上匹配，RAW 区分大小写）
+# 每组的取值是要写入intent的字段；'subject.gender' 这样的字段写入子字典 intent['subject']
+INTENT_RULES = RuleSet([
+    # 识别软件工程关键词
+    RuleGroup(LOWER, FIRST, [
+        (['test', '测试', 'bug', 'qa'],
+         Refine(['unit', '单元'], {'software_task': 'unit_test'}, {'software_task': 'api_test'})),
+        (['deploy', '部署', 'docker', 'pipeline', 'ci/cd'],
+         Refine(['docker'], {'software_task': 'docker_file'}, {'software_task': 'ci_pipeline'})),
+        (['architect', '架构', 'c4', 'system design', '系统设计'], {'software_task': 'architecture_design'}),
+        (['database', 'db', 'schema', 'sql', '数据库', '表结构'], {'software_task': 'db_schema_design'}),
+        (['readme', 'doc', '文档', 'documentation'], {'software_task': 'readme_generation'}),
+        (['security', 'audit', 'vuln', '安全', '漏洞'], {'software_task': 'security_audit'}),
+        (['code', '代码', 'script', '脚本', 'implement', '实现'], {'software_task': 'code_generation'}),
+    ]),
+    # 识别语言/框架（后面的覆盖前面的）
+    RuleGroup(LOWER, LAST, [
+        (['python'], {'language': 'Python'}),
+        (['javascript', 'js'], {'language': 'JavaScript'}),
+        (['java'], {'language': 'Java'}),
+        (['go', 'golang'], {'language': 'Go'}),
+    ]),
+    RuleGroup(LOWER, LAST, [
+        (['react'], {'framework': 'React'}),
+        (['vue'], {'framework': 'Vue'}),
+        (['pytest'], {'framework': 'pytest'}),
+        (['jest'], {'framework': 'Jest'}),
+    ]),
+    # 识别人物
+    RuleGroup(LOWER, FIRST, [
+        (['女', 'woman', 'female', '女性', '少女'], {'subject.gender': 'female'}),
+        (['男', 'man', 'male', '男性', '悟空', 'goku'], {'subject.gender': 'male'}),
+    ]),
+    # 识别人种
+    RuleGroup(RAW, FIRST, [
+        (['东亚', 'East_Asian', '中国', '日本', '韩国'], {'subject.ethnicity': 'East_Asian'}),
+    ]),
+    # 识别年龄
+    RuleGroup(RAW, FIRST, [
+        (['年轻', 'young', '少女'], {'subject.age_range': 'young_adult'}),
+        (['儿童', 'child', '孩子'], {'subject.age_range': 'child'}),
+    ]),
+    # 识别动作（特殊识别龟派气功）
+    RuleGroup(RAW, FIRST, [
+        (['龟派气功', 'kamehameha', '能量波'], {'action': 'kamehameha', 'energy': 'blue_energy_blast'}),
+    ]),
+    # 识别艺术风格
+    RuleGroup(RAW, FIRST, [
+        (['3d', '3D', '蜡像', 'wax'], {'visual_style.art_style': 'wax_figure_3d'}),
+        (['动漫', 'anime'], {'visual_style.art_style': 'anime'}),
+    ]),
+    # 识别设计风格
+    RuleGroup(RAW, FIRST, [
+        (['温馨可爱', '可爱', 'cute', 'warm'], {'design_style': '温馨可爱'}),
+        (['现代简约', '简约', 'minimal', 'modern'], {'design_style': '现代简约'}),
+    ]),
+    # 识别设计需求
+    RuleGroup(RAW, FIRST, [
+        (['海报', 'poster', '卡片', 'card'], {'design_requirement': True}),
+    ]),
+    # 识别光影
+    RuleGroup(RAW, FIRST, [
+        (['电影', 'cinematic', '电影级'], {'lighting': 'cinematic'}),
+        (['自然', 'natural'], {'lighting': 'natural'}),
+    ]),
+])
+
+# cross_domain 场景描述增强：用户原始描述中的关键信息 → 英文描述（命中的全部采用，按表中顺序）
+SCENE_RULES = RuleSet([
+    # 场景类型识别
+    RuleGroup(RAW, ALL, [
+        # 古代/历史场景
+        (['秦', '宫殿', '大殿'], 'ancient Chinese Qin Dynasty palace hall, grand imperial architecture'),
+        (['战国', '秦国'], 'Warring States period, ancient Chinese military setting'),
+        (['古代', '古装'], 'ancient Chinese historical setting'),
+        (['宫廷', '皇宫'], 'Chinese imperial palace, ornate traditional architecture'),
+        (['战场', '战争'], 'epic battlefield, war scene'),
+
+        # 动作场景
+        (['比武', '对决', '决斗'], 'intense combat duel, martial arts battle'),
+        (['剑术', '剑', '刀'], 'sword fighting, blade combat, weapon clash'),
+        (['武术', '功夫'], 'martial arts, kung fu action'),
+        (['打斗', '格斗'], 'fighting scene, combat action'),
+
+        # 人物类型
+        (['武将', '将军', '将领'], 'powerful military general, armored warrior'),
+        (['武士', '剑客'], 'skilled swordsman, warrior'),
+        (['王', '皇帝', '君主'], 'noble king, imperial ruler'),
+
+        # 氛围
+        (['史诗', '壮观'], 'epic cinematic scene, grand scale'),
+        (['电影级', '大片'], 'blockbuster movie quality, cinematic composition'),
+        (['激烈', '紧张'], 'intense dramatic action, high tension'),
+    ]),
+    # 特定人物识别
+    RuleGroup(RAW, ALL, [
+        (['赢稷'], 'King Yingji of Qin'),
+        (['秦王'], 'King of Qin'),
+        (['白起'], 'General Baiqi, legendary military commander'),
+        (['项羽'], 'Xiang Yu, mighty warrior king'),
+        (['刘邦'], 'Liu Bang, founder of Han Dynasty'),
+        (['韩信'], 'Han Xin, brilliant military strategist'),
+        (['悟空'], 'Son Goku, powerful martial artist'),
+    ]),
+    # 视觉风格增强
+    RuleGroup(LOWER, ALL, [
+        (['电影', 'cinematic', '史诗'], 'dramatic lighting, dust particles in the air'),
+        (['古代', '战国', '秦'], 'elaborate period costume with intricate bronze patterns'),
+    ]),
+])
+
 
 class CrossDomainGenerator:
     """统一的跨Domain生成器"""
 
     def __init__(self, db_path: str = "extracted_results/elements.db",
-                 yaml_dir: str = "variables"):
+                 yaml_dir: str = "variables",
+                 provider: Optional[ConnectionProvider] = None,
+                 use_catalog: bool = False,
+                 catalog=None,
+                 result_cache: Optional[ResultCache] = None):
         """
         初始化跨domain生成器
 
         Args:
             db_path: SQLite数据库路径
             yaml_dir: YAML变量文件目录
+            provider: 共享的连接提供者（如多个会话共用）；为None时自建一个只读的
+            use_catalog: 元素查询走内存目录（ElementCatalog）而不是SQL
+            catalog: 共享的ElementCatalog（传入时隐含use_catalog）
+            result_cache: 结果缓存（可多个生成器共用）；为None时不缓存
         """
-        self.query_engine = CrossDomainQueryEngine(db_path)
-        self.design_bridge = DesignVariableBridge(db_path, yaml_dir)
+        # 整个生成器栈共用一个provider和一个IntelligentGenerator（无状态）；
+        # 各采样器仍各自独立，保留各自的去重历史
+        self.db_path = db_path
+        self.yaml_dir = yaml_dir
+        self.use_catalog = use_catalog or catalog is not None
+        self._owns_provider = provider is None
+        self.provider = provider or ConnectionProvider(db_path, read_only=True)
+        self.portrait_generator = IntelligentGenerator(db_path, provider=self.provider,
+                                                       use_catalog=use_catalog, catalog=catalog)
+        self.query_engine = CrossDomainQueryEngine(db_path, provider=self.provider,
+                                                   generator=self.portrait_generator)
+        self.design_bridge = DesignVariableBridge(db_path, yaml_dir, provider=self.provider,
+                                                  generator=self.portrait_generator)
         self.software_generator = SoftwareGenerator(yaml_dir)
-        self.portrait_generator = IntelligentGenerator(db_path)
+        self.result_cache = result_cache
 
-    def generate(self, user_input: str, generation_type: str = 'auto') -> Dict:
+    def generate(self, user_input: str, generation_type: str = 'auto',
+                 seed: Optional[int] = None) -> Dict:
         """
         统一生成入口
 
@@ -48,6 +188,9 @@ class CrossDomainGenerator:
                 - 'cross_domain': 跨domain（SQLite多domain）
                 - 'software': 软件工程（YAML）
                 - 'auto': 自动识别
+            seed: 随机种子（变量采样用独立的random.Random，不改动全局随机状态）；为None时沿用全局随机状态
+                配置了result_cache时，portrait/software 总是走缓存，design/cross_domain
+                只在给定种子且采样历史为空时走缓存（命中时不更新采样历史）
 
         Returns:
             生成结果字典
@@ -57,34 +200,56 @@ class CrossDomainGenerator:
                 'metadata': {...}
             }
         """
-        # 1. 解析用户输入为Intent
-        intent = self.parse_user_input(user_input)
-
-        # 2. 自动识别生成类型
-        if generation_type == 'auto':
-            generation_type = self.classify_generation_type(intent)
-
-        print(f"📌 生成类型: {generation_type}")
-
-        # 3. 路由到对应生成器
-        if generation_type == 'portrait':
-            # 纯人像 → 只用portrait domain（向后兼容）
-            return self.generate_portrait(intent)
-
-        elif generation_type == 'design':
-            # 设计海报/卡片 → SQLite基础 + YAML设计
-            return self.generate_design(intent)
+        rng = random.Random(seed) if seed is not None else None
+
+        # 解析和识别发生在确定类型之前，耗时记在请求的类型（通常是auto）下
+        with gen_metrics.generation(generation_type):
+            # 1. 解析用户输入为Intent
+            with gen_metrics.span('parse_intent'):
+                intent = self.parse_user_input(user_input)
+
+            # 2. 自动识别生成类型
+            if generation_type == 'auto':
+                with gen_metrics.span('classify'):
+                    generation_type = self.classify_generation_type(intent)
+
+        logger.info("📌 生成类型: %s", generation_type)
+
+        # 3. 结果可复现时先查缓存
+        cache_key = None
+        if self.result_cache is not None and is_cacheable(generation_type, seed, self._history_empty()):
+            cache_key = self.result_cache.make_key(user_input, generation_type, seed,
+                                                   self.db_path, self.yaml_dir)
+            with gen_metrics.generation(generation_type), gen_metrics.span('cache_lookup'):
+                cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                logger.info("  → 命中结果缓存")
+                return cached
+
+        # 4. 路由到对应生成器
+        with gen_metrics.generation(generation_type), gen_metrics.span('total'):
+            if generation_type == 'portrait':
+                # 纯人像 → 只用portrait domain（向后兼容）
+                result = self.generate_portrait(intent)
+
+            elif generation_type == 'design':
+                # 设计海报/卡片 → SQLite基础 + YAML设计
+                result = self.generate_design(intent, rng)
+
+            elif generation_type == 'cross_domain':
+                # 复杂场景 → SQLite跨domain
+                result = self.generate_cross_domain(intent, rng)
+
+            elif generation_type == 'software':
+                # 软件工程 → YAML模板
+                result = self.generate_software(intent)
 
-        elif generation_type == 'cross_domain':
-            # 复杂场景 → SQLite跨domain
-            return self.generate_cross_domain(intent)
-            
-        elif generation_type == 'software':
-            # 软件工程 → YAML模板
-            return self.generate_software(intent)
+            else:
+                raise ValueError(f"Unknown generation type: {generation_type}")
 
-        else:
-            raise ValueError(f"Unknown generation type: {generation_type}")
+        if cache_key is not None:
+            self.result_cache.put(cache_key, result)
+        return result
 
     def parse_user_input(self, user_input: str) -> Dict:
         """
@@ -107,80 +272,13 @@ class CrossDomainGenerator:
             'software_task': None
         }
 
-        user_lower = user_input.lower()
-
-        # 识别软件工程关键词
-        if any(kw in user_lower for kw in ['test', '测试', 'bug', 'qa']):
-            intent['software_task'] = 'unit_test' if 'unit' in user_lower or '单元' in user_lower else 'api_test'
-        elif any(kw in user_lower for kw in ['deploy', '部署', 'docker', 'pipeline', 'ci/cd']):
-            if 'docker' in user_lower:
-                intent['software_task'] = 'docker_file'
-            else:
-                intent['software_task'] = 'ci_pipeline'
-        elif any(kw in user_lower for kw in ['architect', '架构', 'c4', 'system design', '系统设计']):
-            intent['software_task'] = 'architecture_design'
-        elif any(kw in user_lower for kw in ['database', 'db', 'schema', 'sql', '数据库', '表结构']):
-            intent['software_task'] = 'db_schema_design'
-        elif any(kw in user_lower for kw in ['readme', 'doc', '文档', 'documentation']):
-            intent['software_task'] = 'readme_generation'
-        elif any(kw in user_lower for kw in ['security', 'audit', 'vuln', '安全', '漏洞']):
-            intent['software_task'] = 'security_audit'
-        elif any(kw in user_lower for kw in ['code', '代码', 'script', '脚本', 'implement', '实现']):
-            intent['software_task'] = 'code_generation'
-            
-        # 识别语言/框架
-        if 'python' in user_lower: intent['language'] = 'Python'
-        if 'javascript' in user_lower or 'js' in user_lower: intent['language'] = 'JavaScript'
-        if 'java' in user_lower: intent['language'] = 'Java'
-        if 'go' in user_lower or 'golang' in user_lower: intent['language'] = 'Go'
-        
-        if 'react' in user_lower: intent['framework'] = 'React'
-        if 'vue' in user_lower: intent['framework'] = 'Vue'
-        if 'pytest' in user_lower: intent['framework'] = 'pytest'
-        if 'jest' in user_lower: intent['framework'] = 'Jest'
-
-        # 识别人物
-        if any(kw in user_lower for kw in ['女', 'woman', 'female', '女性', '少女']):
-            intent['subject']['gender'] = 'female'
-        elif any(kw in user_lower for kw in ['男', 'man', 'male', '男性', '悟空', 'goku']):
-            intent['subject']['gender'] = 'male'
-
-        # 识别人种
-        if any(kw in user_input for kw in ['东亚', 'East_Asian', '中国', '日本', '韩国']):
-            intent['subject']['ethnicity'] = 'East_Asian'
-
-        # 识别年龄
-        if any(kw in user_input for kw in ['年轻', 'young', '少女']):
-            intent['subject']['age_range'] = 'young_adult'
-        elif any(kw in user_input for kw in ['儿童', 'child', '孩子']):
-            intent['subject']['age_range'] = 'child'
-
-        # 识别动作（特殊识别龟派气功）
-        if any(kw in user_input for kw in ['龟派气功', 'kamehameha', '能量波']):
-            intent['action'] = 'kamehameha'
-            intent['energy'] = 'blue_energy_blast'
-
-        # 识别艺术风格
-        if any(kw in user_input for kw in ['3d', '3D', '蜡像', 'wax']):
-            intent['visual_style']['art_style'] = 'wax_figure_3d'
-        elif any(kw in user_input for kw in ['动漫', 'anime']):
-            intent['visual_style']['art_style'] = 'anime'
-
-        # 识别设计风格
-        if any(kw in user_input for kw in ['温馨可爱', '可爱', 'cute', 'warm']):
-            intent['design_style'] = '温馨可爱'
-        elif any(kw in user_input for kw in ['现代简约', '简约', 'minimal', 'modern']):
-            intent['design_style'] = '现代简约'
-
-        # 识别设计需求
-        if any(kw in user_input for kw in ['海报', 'poster', '卡片', 'card']):
-            intent['design_requirement'] = True
-
-        # 识别光影
-        if any(kw in user_input for kw in ['电影', 'cinematic', '电影级']):
-            intent['lighting'] = 'cinematic'
-        elif any(kw in user_input for kw in ['自然', 'natural']):
-            intent['lighting'] = 'natural'
+        # 所有规则在一次扫描中匹配，各组按表中顺序写入
+        for assignments in INTENT_RULES.match(user_input):
+            if not assignments:
+                continue
+            for field, value in assignments.items():
+                parent, _, key = field.rpartition('.')
+                (intent[parent] if parent else intent)[key] = value
 
         return intent
 
@@ -235,18 +333,22 @@ class CrossDomainGenerator:
         Returns:
             生成结果
         """
-        print("  → 使用 portrait 生成器（向后兼容）")
+        logger.info("  → 使用 portrait 生成器（向后兼容）")
 
         # 使用原有的intelligent_generator
-        elements = self.portrait_generator.select_elements_by_intent(intent)
+        with gen_metrics.span('select_elements'):
+            elements = self.portrait_generator.select_elements_by_intent(intent)
 
         # 检查一致性
-        issues = self.portrait_generator.check_consistency(elements)
+        with gen_metrics.span('check_consistency'):
+            issues = self.portrait_generator.check_consistency(elements)
         if issues:
-            elements, fixes = self.portrait_generator.resolve_conflicts(elements, issues)
+            with gen_metrics.span('resolve_conflicts'):
+                elements, fixes = self.portrait_generator.resolve_conflicts(elements, issues)
 
         # 生成提示词
-        prompt = self.portrait_generator.compose_prompt(elements, mode='auto')
+        with gen_metrics.span('compose_prompt'):
+            prompt = self.portrait_generator.compose_prompt(elements, mode='auto')
 
         return {
             'prompt': prompt,
@@ -257,19 +359,20 @@ class CrossDomainGenerator:
             }
         }
 
-    def generate_design(self, intent: Dict) -> Dict:
+    def generate_design(self, intent: Dict, rng: Optional[random.Random] = None) -> Dict:
         """
         生成设计提示词（SQLite + YAML）
 
         Args:
             intent: 用户意图
+            rng: 变量采样用的随机数生成器；为None时使用全局随机状态
 
         Returns:
             生成结果
         """
-        print("  → 使用 design 生成器（SQLite + YAML）")
+        logger.info("  → 使用 design 生成器（SQLite + YAML）")
 
-        result = self.design_bridge.generate_design_prompt(intent)
+        result = self.design_bridge.generate_design_prompt(intent, rng)
 
         return {
             'prompt': result['prompt'],
@@ -288,11 +391,12 @@ class CrossDomainGenerator:
         Returns:
             生成结果
         """
-        print("  → 使用 software 生成器（YAML）")
-        
-        return self.software_generator.generate(intent)
+        logger.info("  → 使用 software 生成器（YAML）")
+
+        with gen_metrics.span('software_template'):
+            return self.software_generator.generate(intent)
 
-    def generate_cross_domain(self, intent: Dict) -> Dict:
+    def generate_cross_domain(self, intent: Dict, rng: Optional[random.Random] = None) -> Dict:
         """
         生成跨domain提示词（SQLite多domain + intelligent_generator完整流程）
 
@@ -303,14 +407,16 @@ class CrossDomainGenerator:
 
         Args:
             intent: 用户意图
+            rng: 变量采样用的随机数生成器；为None时使用全局随机状态
 
         Returns:
             生成结果
         """
-        print("  → 使用 cross_domain 生成器（SQLite多domain + 智能组装）")
+        logger.info("  → 使用 cross_domain 生成器（SQLite多domain + 智能组装）")
 
         # 1. 跨domain查询获取候选元素
-        elements_by_domain = self.query_engine.query_by_intent(intent)
+        with gen_metrics.span('query_by_intent'):
+            elements_by_domain = self.query_engine.query_by_intent(intent, rng)
 
         # 2. 合并所有domain的元素为统一列表
         all_elements = []
@@ -325,33 +431,37 @@ class CrossDomainGenerator:
                 elem['source_domain'] = domain
                 all_elements.append(elem)
 
-        print(f"  📊 合并了 {len(all_elements)} 个元素来自 {len(elements_by_domain)} 个domain")
+        logger.info("  📊 合并了 %s 个元素来自 %s 个domain", len(all_elements), len(elements_by_domain))
 
         # 3. 如果元素太少，补充基于intent的智能选择
         if len(all_elements) < 5:
-            print("  ⚠️  元素较少，使用intelligent_generator补充...")
-            extra_elements = self.portrait_generator.select_elements_by_intent(intent)
+            logger.warning("  ⚠️  元素较少，使用intelligent_generator补充...")
+            with gen_metrics.span('select_elements'):
+                extra_elements = self.portrait_generator.select_elements_by_intent(intent)
             # 合并，避免重复
             existing_ids = {e.get('element_id') for e in all_elements}
             for elem in extra_elements:
                 if elem.get('element_id') not in existing_ids:
                     elem['source_domain'] = 'portrait_supplement'
                     all_elements.append(elem)
-            print(f"  📊 补充后共 {len(all_elements)} 个元素")
+            logger.info("  📊 补充后共 %s 个元素", len(all_elements))
 
         # 4. 使用intelligent_generator检查一致性
-        issues = self.portrait_generator.check_consistency(all_elements)
+        with gen_metrics.span('check_consistency'):
+            issues = self.portrait_generator.check_consistency(all_elements)
         if issues:
-            print(f"  🔍 发现 {len(issues)} 个一致性问题，正在修复...")
-            all_elements, fixes = self.portrait_generator.resolve_conflicts(all_elements, issues)
+            logger.info("  🔍 发现 %s 个一致性问题，正在修复...", len(issues))
+            with gen_metrics.span('resolve_conflicts'):
+                all_elements, fixes = self.portrait_generator.resolve_conflicts(all_elements, issues)
             for fix in fixes:
-                print(f"     {fix}")
+                logger.info("     %s", fix)
 
         # 5. 基于raw_input增强prompt（提取用户原始描述中的关键信息）
         enhanced_parts = self._extract_scene_description(intent)
         
         # 6. 使用intelligent_generator的智能组装
-        base_prompt = self.portrait_generator.compose_prompt(all_elements, mode='auto')
+        with gen_metrics.span('compose_prompt'):
+            base_prompt = self.portrait_generator.compose_prompt(all_elements, mode='auto')
         
         # 7. 组合最终提示词：增强描述 + 数据库元素
         if enhanced_parts:
@@ -380,61 +490,9 @@ class CrossDomainGenerator:
         if not raw_input:
             return ''
         
-        parts = []
-        raw_lower = raw_input.lower()
-        
-        # 场景类型识别
-        scene_mappings = {
-            # 古代/历史场景
-            ('秦', '宫殿', '大殿'): 'ancient Chinese Qin Dynasty palace hall, grand imperial architecture',
-            ('战国', '秦国'): 'Warring States period, ancient Chinese military setting',
-            ('古代', '古装'): 'ancient Chinese historical setting',
-            ('宫廷', '皇宫'): 'Chinese imperial palace, ornate traditional architecture',
-            ('战场', '战争'): 'epic battlefield, war scene',
-            
-            # 动作场景
-            ('比武', '对决', '决斗'): 'intense combat duel, martial arts battle',
-            ('剑术', '剑', '刀'): 'sword fighting, blade combat, weapon clash',
-            ('武术', '功夫'): 'martial arts, kung fu action',
-            ('打斗', '格斗'): 'fighting scene, combat action',
-            
-            # 人物类型
-            ('武将', '将军', '将领'): 'powerful military general, armored warrior',
-            ('武士', '剑客'): 'skilled swordsman, warrior',
-            ('王', '皇帝', '君主'): 'noble king, imperial ruler',
-            
-            # 氛围
-            ('史诗', '壮观'): 'epic cinematic scene, grand scale',
-            ('电影级', '大片'): 'blockbuster movie quality, cinematic composition',
-            ('激烈', '紧张'): 'intense dramatic action, high tension',
-        }
-        
-        for keywords, english_desc in scene_mappings.items():
-            if any(kw in raw_input for kw in keywords):
-                parts.append(english_desc)
-        
-        # 特定人物识别
-        character_mappings = {
-            '赢稷': 'King Yingji of Qin',
-            '秦王': 'King of Qin',
-            '白起': 'General Baiqi, legendary military commander',
-            '项羽': 'Xiang Yu, mighty warrior king',
-            '刘邦': 'Liu Bang, founder of Han Dynasty',
-            '韩信': 'Han Xin, brilliant military strategist',
-            '悟空': 'Son Goku, powerful martial artist',
-        }
-        
-        for cn_name, en_name in character_mappings.items():
-            if cn_name in raw_input:
-                parts.append(en_name)
-        
-        # 视觉风格增强
-        if any(kw in raw_lower for kw in ['电影', 'cinematic', '史诗']):
-            parts.append('dramatic lighting, dust particles in the air')
-        
-        if any(kw in raw_lower for kw in ['古代', '战国', '秦']):
-            parts.append('elaborate period costume with intricate bronze patterns')
-        
+        # 场景类型、特定人物、视觉风格增强（规则见 SCENE_RULES）
+        parts = [desc for descs in SCENE_RULES.match(raw_input) for desc in descs]
+
         # 去重并返回
         seen = set()
         unique_parts = []
@@ -445,11 +503,45 @@ class CrossDomainGenerator:
         
         return ', '.join(unique_parts)
 
+    def generate_batch(self, inputs: Iterable[Union[str, Dict]],
+                       generation_type: str = 'auto',
+                       workers: int = 1,
+                       seed: int = 0) -> List[Dict]:
+        """
+        批量生成（多进程，结果顺序与输入一致）
+
+        Args:
+            inputs: 用户输入字符串，或 {'input': ..., 'type': ..., 'seed': ...} 字典
+            generation_type: 未单独指定类型时使用的生成类型
+            workers: 进程数；1表示在当前进程内顺序生成
+            seed: 基础种子，第i条输入默认使用 seed + i
+
+        Returns:
+            每条输入一个记录：{'index', 'input', 'type', 'seed', 'result'} 或带 'error'
+        """
+        from core.bulk_generate import generate_batch
+        return generate_batch(inputs, generation_type=generation_type, workers=workers,
+                              seed=seed, generator=self)
+
+    def _history_empty(self) -> bool:
+        """各采样器都没有去重历史（此时随机类型的结果只取决于输入和种子）"""
+        return not (self.query_engine.sampler.history
+                    or self.design_bridge.sqlite_engine.sampler.history
+                    or self.design_bridge.yaml_sampler.history)
+
+    def reset_history(self):
+        """清空各采样器的去重历史（批量生成时让每条结果只取决于输入和种子）"""
+        self.query_engine.sampler.history = []
+        self.design_bridge.sqlite_engine.sampler.history = []
+        self.design_bridge.yaml_sampler.history = []
+
     def close(self):
         """关闭资源"""
         self.query_engine.close()
         self.design_bridge.close()
         self.portrait_generator.close()
+        if self._owns_provider:
+            self.provider.close()
 
 
 def test_cross_domain_generator():
@@ -484,6 +576,17 @@ def test_cross_domain_generator():
         print(f"配色: {result3['yaml_variables'].get('colors', {}).get('scheme_name')}")
     print(f"\n提示词: {result3['prompt']}")
 
+    # 测试4：种子只影响本次生成，不改动全局随机状态
+    print("\n\n【测试4】种子\n")
+    state = random.getstate()
+    seeded = []
+    for _ in range(2):
+        generator.reset_history()
+        seeded.append(generator.generate("温馨可爱风格的儿童教育海报", seed=7)['prompt'])
+    assert seeded[0] == seeded[1]
+    assert random.getstate() == state
+    print("✅ 相同种子结果一致，全局随机状态未改变")
+
     generator.close()
     print("\n\n✅ 所有测试完成")
 
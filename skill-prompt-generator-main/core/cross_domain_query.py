@@ -5,8 +5,8 @@
 核心功能：根据用户意图自动识别需要的domains，智能查询和组合
 """
 
-import sqlite3
 import json
+import random
 import sys
 import os
 from typing import Dict, List, Optional, Set, Any
@@ -14,31 +14,63 @@ from typing import Dict, List, Optional, Set, Any
 # 添加上级目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from connection_provider import ConnectionProvider
+from core.keyword_matcher import KeywordMatcher
 from core.variable_sampler import SQLiteVariableSampler
+from gen_logging import get_logger
 from intelligent_generator import IntelligentGenerator
 
+logger = get_logger('cross_domain_query')
+
+
+# 特殊动作关键词（出现时需要video domain）
+ACTION_KEYWORDS = ['kamehameha', '龟派气功', '能量', 'energy', '气息']
+
+# 各category从用户原始描述中提取的关键词（按列表顺序返回命中的）
+CATEGORY_KEYWORDS = {
+    # 场景类型：能量、气息、氛围
+    'scene_types': ['energy', 'aura', 'atmosphere', 'power', '能量', '气息', '氛围'],
+    # 动态效果：动作、运动
+    'motion_effects': ['motion', 'movement', 'action', 'dynamic', '动作', '运动', '动态'],
+    # 艺术风格
+    'art_styles': ['3d', 'wax', '蜡像', 'holographic', 'realistic', 'rendering'],
+    # 特效
+    'special_effects': ['glow', 'particle', 'holographic', 'energy', '发光', '粒子', '全息'],
+}
+
+# 一次扫描小写后的原始描述，同一输入在各category间复用
+_raw_keyword_matcher = KeywordMatcher(
+    ACTION_KEYWORDS + [kw for kws in CATEGORY_KEYWORDS.values() for kw in kws]
+)
+
 
 class CrossDomainQueryEngine:
     """跨Domain智能查询引擎"""
 
-    def __init__(self, db_path: str = "extracted_results/elements.db"):
+    def __init__(self, db_path: str = "extracted_results/elements.db",
+                 provider: Optional[ConnectionProvider] = None,
+                 generator: Optional[IntelligentGenerator] = None):
         """
         初始化跨domain查询引擎
 
         Args:
             db_path: 数据库路径
+            provider: 共享的连接提供者；为None时自建一个只读的
+            generator: 共享的IntelligentGenerator；为None时基于provider新建
         """
-        self.db = sqlite3.connect(db_path)
-        self.cursor = self.db.cursor()
-        self.sampler = SQLiteVariableSampler(db_path)
-        self.generator = IntelligentGenerator(db_path)
+        self._owns_provider = provider is None
+        self.provider = provider or ConnectionProvider(db_path, read_only=True)
+        self._owns_generator = generator is None
+        self.sampler = SQLiteVariableSampler(db_path, provider=self.provider)
+        self.generator = generator or IntelligentGenerator(db_path, provider=self.provider)
 
-    def query_by_intent(self, intent: Dict) -> Dict[str, List[Dict]]:
+    def query_by_intent(self, intent: Dict, rng: Optional[random.Random] = None) -> Dict[str, List[Dict]]:
         """
         根据用户意图跨domain查询元素
 
         Args:
             intent: 用户意图字典
+            rng: 变量采样用的随机数生成器；为None时使用全局随机状态
 
         Returns:
             按domain分组的元素字典
@@ -51,7 +83,7 @@ class CrossDomainQueryEngine:
         """
         # 1. 分析需要哪些domains
         required_domains = self.analyze_required_domains(intent)
-        print(f"📊 分析结果：需要 {len(required_domains)} 个domain: {', '.join(required_domains)}")
+        logger.info("📊 分析结果：需要 %s 个domain: %s", len(required_domains), ', '.join(required_domains))
 
         # 2. 构建跨domain SQL查询计划
         query_plan = self.build_query_plan(intent, required_domains)
@@ -59,7 +91,7 @@ class CrossDomainQueryEngine:
         # 3. 执行查询，从多个domains获取元素
         elements = {}
         for domain, categories in query_plan.items():
-            print(f"  🔍 查询 {domain} domain: {', '.join(categories)}")
+            logger.info("  🔍 查询 %s domain: %s", domain, ', '.join(categories))
             elements[domain] = self.query_domain(domain, categories, intent)
 
         # 4. 应用变量采样（如果元素有变量）
@@ -71,7 +103,8 @@ class CrossDomainQueryEngine:
                 try:
                     result = self.sampler.sample_element_with_variables(
                         elem['element_id'],
-                        style_context=intent.get('visual_style')
+                        style_context=intent.get('visual_style'),
+                        rng=rng
                     )
                     # 如果有变量，使用采样后的结果
                     if result['variables']:
@@ -109,8 +142,8 @@ class CrossDomainQueryEngine:
             domains.add('video')
 
         # 检查特殊动作关键词
-        raw_input = intent.get('raw_input', '').lower()
-        if any(kw in raw_input for kw in ['kamehameha', '龟派气功', '能量', 'energy', '气息']):
+        raw_found = _raw_keyword_matcher.find(intent.get('raw_input', '').lower())
+        if any(kw in raw_found for kw in ACTION_KEYWORDS):
             domains.add('video')
 
         # 有艺术风格 → art
@@ -138,7 +171,8 @@ class CrossDomainQueryEngine:
         # 始终包含common（光影、技术参数）
         domains.add('common')
 
-        return list(domains)
+        # 排序，保证domain顺序不随字符串哈希随机化变化（批量生成需要可复现）
+        return sorted(domains)
 
     def build_query_plan(self, intent: Dict, domains: List[str]) -> Dict[str, List[str]]:
         """
@@ -250,34 +284,20 @@ class CrossDomainQueryEngine:
             关键词列表
         """
         keywords = []
-        raw_input = intent.get('raw_input', '')
 
         # 根据category提取不同的关键词
-        if category == 'scene_types':
-            # 场景类型：能量、气息、氛围
-            scene_keywords = ['energy', 'aura', 'atmosphere', 'power', '能量', '气息', '氛围']
-            keywords.extend([kw for kw in scene_keywords if kw in raw_input.lower()])
-
-        elif category == 'motion_effects':
-            # 动态效果：动作、运动
-            motion_keywords = ['motion', 'movement', 'action', 'dynamic', '动作', '运动', '动态']
-            keywords.extend([kw for kw in motion_keywords if kw in raw_input.lower()])
-
-        elif category == 'art_styles':
+        if category == 'art_styles':
             # 艺术风格
             visual_style = intent.get('visual_style', {})
             if isinstance(visual_style, dict):
                 art_style = visual_style.get('art_style', '')
                 if art_style:
                     keywords.append(art_style)
-            # 从raw_input提取
-            art_keywords = ['3d', 'wax', '蜡像', 'holographic', 'realistic', 'rendering']
-            keywords.extend([kw for kw in art_keywords if kw in raw_input.lower()])
 
-        elif category == 'special_effects':
-            # 特效
-            effect_keywords = ['glow', 'particle', 'holographic', 'energy', '发光', '粒子', '全息']
-            keywords.extend([kw for kw in effect_keywords if kw in raw_input.lower()])
+        if category in CATEGORY_KEYWORDS:
+            # 从raw_input提取
+            raw_found = _raw_keyword_matcher.find(intent.get('raw_input', '').lower())
+            keywords.extend([kw for kw in CATEGORY_KEYWORDS[category] if kw in raw_found])
 
         elif category == 'lighting_techniques':
             # 光影技术
@@ -304,8 +324,10 @@ class CrossDomainQueryEngine:
     def close(self):
         """关闭数据库连接"""
         self.sampler.close()
-        self.generator.close()
-        self.db.close()
+        if self._owns_generator:
+            self.generator.close()
+        if self._owns_provider:
+            self.provider.close()
 
 
 def test_cross_domain_query():
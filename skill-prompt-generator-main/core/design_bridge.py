@@ -7,36 +7,47 @@
 
 import sys
 import os
+import random
 from typing import Dict, List, Optional
 
 # 添加上级目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from connection_provider import ConnectionProvider
 from core.cross_domain_query import CrossDomainQueryEngine
 from core.yaml_sampler import YAMLVariableSampler
+import gen_metrics
+from gen_logging import get_logger
+
+logger = get_logger('design_bridge')
 
 
 class DesignVariableBridge:
     """连接 SQLite元素 和 YAML设计变量的桥接器"""
 
     def __init__(self, db_path: str = "extracted_results/elements.db",
-                 yaml_dir: str = "variables"):
+                 yaml_dir: str = "variables",
+                 provider: Optional[ConnectionProvider] = None,
+                 generator=None):
         """
         初始化设计变量桥接器
 
         Args:
             db_path: SQLite数据库路径
             yaml_dir: YAML变量文件目录
+            provider: 共享的连接提供者（传给内部的查询引擎）
+            generator: 共享的IntelligentGenerator（传给内部的查询引擎）
         """
-        self.sqlite_engine = CrossDomainQueryEngine(db_path)
+        self.sqlite_engine = CrossDomainQueryEngine(db_path, provider=provider, generator=generator)
         self.yaml_sampler = YAMLVariableSampler(yaml_dir)
 
-    def generate_design_prompt(self, intent: Dict) -> Dict:
+    def generate_design_prompt(self, intent: Dict, rng: Optional[random.Random] = None) -> Dict:
         """
         生成完整设计提示词（SQLite + YAML）
 
         Args:
             intent: 用户意图字典
+            rng: 变量采样用的随机数生成器；为None时使用全局随机状态
 
         Returns:
             包含完整提示词和元数据的字典
@@ -48,26 +59,30 @@ class DesignVariableBridge:
             }
         """
         # 1. 从SQLite获取基础元素（人物、场景、光影）
-        sqlite_elements = self.sqlite_engine.query_by_intent(intent)
-        print(f"📊 SQLite元素: {sum(len(elems) for elems in sqlite_elements.values())} 个")
+        with gen_metrics.span('query_by_intent'):
+            sqlite_elements = self.sqlite_engine.query_by_intent(intent, rng)
+        logger.info("📊 SQLite元素: %s 个", sum(len(elems) for elems in sqlite_elements.values()))
 
         # 2. 从YAML获取设计变量（配色、边框、装饰）
         design_style = intent.get('design_style', '温馨可爱')
-        yaml_variables = self.yaml_sampler.sample_variables(style=design_style)
-        print(f"🎨 YAML变量: 风格={design_style}")
+        with gen_metrics.span('yaml_sampling'):
+            yaml_variables = self.yaml_sampler.sample_variables(style=design_style, rng=rng)
+        logger.info("🎨 YAML变量: 风格=%s", design_style)
 
         # 3. 融合两者
-        merged = self.merge_elements_and_variables(
-            sqlite_elements,
-            yaml_variables,
-            intent
-        )
+        with gen_metrics.span('merge'):
+            merged = self.merge_elements_and_variables(
+                sqlite_elements,
+                yaml_variables,
+                intent
+            )
 
         # 4. 应用设计逻辑（可选）
         # design_logic = self.load_design_logic(design_style)
 
         # 5. 生成最终提示词
-        prompt = self.build_final_prompt(merged)
+        with gen_metrics.span('compose_prompt'):
+            prompt = self.build_final_prompt(merged)
 
         return {
             'prompt': prompt,
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询计划检查 - 对热点查询执行 EXPLAIN QUERY PLAN，确认走的是 schema_migration_v4_indexes.sql 的复合索引（或主键索引），
+没有退化成全表扫描或临时排序（USE TEMP B-TREE FOR ORDER BY）
+
+检查的SQL不是手抄的：调用真实的查询方法，用 set_trace_callback 记录它们实际执行的语句
+（参数已代入），再对记录下的 SELECT 逐条执行 EXPLAIN QUERY PLAN，调用处改了查询也会被检查到
+"""
+
+import os
+import sqlite3
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# 添加上级目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from element_db import ElementDB
+from intelligent_generator import IntelligentGenerator, save_generated_prompt
+
+MIGRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_migration_v4_indexes.sql')
+
+CATEGORY_INDEX = 'idx_elements_domain_category_score'
+DOMAIN_INDEX = 'idx_elements_domain_score'
+USAGE_STATS_INDEX = 'sqlite_autoindex_element_usage_stats_1'
+
+# (名称, 调用真实查询的函数(targets, params), 期望使用的索引)
+# targets: {'generator': IntelligentGenerator(不用内存目录), 'db': ElementDB, 'db_path': 数据库路径}
+PLAN_CALLS: List[Tuple[str, Callable[[Dict, Dict], object], str]] = [
+    ("get_element_by_category",
+     lambda t, p: t['generator'].get_element_by_category(p['domain'], p['category']),
+     CATEGORY_INDEX),
+    # value_filter与选中元素的名称不一致时还会按名称精确查询，两条语句都要检查
+    ("get_element_by_category(value_filter)",
+     lambda t, p: t['generator'].get_element_by_category(p['domain'], p['category'], p['value_filter']),
+     CATEGORY_INDEX),
+    ("get_all_elements_by_category",
+     lambda t, p: t['generator'].get_all_elements_by_category(p['domain'], p['category']),
+     CATEGORY_INDEX),
+    ("get_all_elements_by_category(value_filter)",
+     lambda t, p: t['generator'].get_all_elements_by_category(p['domain'], p['category'], p['value_filter']),
+     CATEGORY_INDEX),
+    ("search_by_domain",
+     lambda t, p: t['db'].search_by_domain(p['domain'], limit=p['limit']),
+     DOMAIN_INDEX),
+    ("search_by_domain(min_reusability)",
+     lambda t, p: t['db'].search_by_domain(p['domain'], min_reusability=p['score']),
+     DOMAIN_INDEX),
+    ("search_by_domain(category)",
+     lambda t, p: t['db'].search_by_domain(p['domain'], category_id=p['category']),
+     CATEGORY_INDEX),
+    ("search_by_domain(category, min_reusability)",
+     lambda t, p: t['db'].search_by_domain(p['domain'], category_id=p['category'], min_reusability=p['score']),
+     CATEGORY_INDEX),
+    # 会写入数据库（生成记录和使用统计），只在副本上调用
+    ("save_generated_prompt(element_usage_stats)",
+     lambda t, p: save_generated_prompt("plan check", "plan check", [{'element_id': p['element_id']}],
+                                        db_path=t['db_path']),
+     USAGE_STATS_INDEX),
+]
+
+
+@contextmanager
+def capture_statements(*connections: sqlite3.Connection) -> Iterator[List[str]]:
+    """
+    记录执行的SQL语句（参数已代入）
+
+    给定的连接直接挂上跟踪回调；期间用 sqlite3.connect 新打开的连接（如save_generated_prompt自建的）同样记录
+    """
+    statements: List[str] = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    for conn in connections:
+        conn.set_trace_callback(statements.append)
+    sqlite3.connect = traced_connect
+    try:
+        yield statements
+    finally:
+        sqlite3.connect = connect
+        for conn in connections:
+            conn.set_trace_callback(None)
+
+
+def traced_selects(targets: Dict, call: Callable[[Dict, Dict], object], params: Dict) -> List[str]:
+    """调用一次真实查询，返回它执行的SELECT语句"""
+    with capture_statements(targets['generator'].conn, targets['db'].conn) as statements:
+        try:
+            call(targets, params)
+        except ValueError:
+            # 旧数据中非JSON的keywords会让search_by_domain解码失败，此时查询已经执行并记录
+            pass
+    return [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+
+
+def explain(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """EXPLAIN QUERY PLAN 的各行说明"""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+
+
+def plan_is_indexed(plan: List[str]) -> bool:
+    """没有全表扫描和临时排序"""
+    return not any(line.startswith("SCAN") or "TEMP B-TREE" in line for line in plan)
+
+
+def plan_uses_index(plan: List[str], index_name: str) -> bool:
+    """按指定索引查找"""
+    return any(line.startswith("SEARCH") and f"INDEX {index_name} " in line for line in plan)
+
+
+def check_query_plans(targets: Dict, params: Dict) -> List[Tuple[str, List[Tuple[str, List[str]]], bool]]:
+    """
+    逐个调用 PLAN_CALLS，检查记录下的每条SELECT
+
+    每条都不能全表扫描或临时排序，且至少一条按期望的索引查找
+    （search_by_domain 还会逐个元素查询标签，这些语句走 element_tags 的主键）
+
+    Args:
+        targets: 查询对象（数据库已执行v4迁移），见PLAN_CALLS
+        params: 调用参数（domain、category、value_filter、score、limit、element_id）
+
+    Returns:
+        [(名称, [(SQL, 查询计划), ...], 是否通过), ...]；没有记录到SELECT时不通过
+    """
+    conn = targets['db'].conn
+    results = []
+    for label, call, index_name in PLAN_CALLS:
+        plans = [(sql, explain(conn, sql)) for sql in traced_selects(targets, call, params)]
+        ok = (any(plan_uses_index(plan, index_name) for _, plan in plans)
+              and all(plan_is_indexed(plan) for _, plan in plans))
+        results.append((label, plans, ok))
+    return results
+
+
+def test_query_plans():
+    """在数据库副本上执行v4迁移，检查真实查询的计划，并确认迁移前后查询结果（含同分元素的顺序）不变"""
+    import shutil
+    import tempfile
+    import gen_logging
+
+    print("=" * 80)
+    print("测试查询计划")
+    print("=" * 80)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tmp = tempfile.mkdtemp()
+    try:
+        source = os.path.join(root, 'extracted_results', 'elements.db')
+        db_path = os.path.join(tmp, 'elements.db')
+        shutil.copy(source, db_path)
+        # save_generated_prompt等会打日志，测试期间静默
+        with gen_logging.level_override('QUIET'):
+            before = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+            db = ElementDB(db_path)
+            targets = {'generator': IntelligentGenerator(db_path), 'db': db, 'db_path': db_path}
+            params = dict(domain='portrait', category='lighting', value_filter='soft',
+                          score=7.0, limit=20, element_id='portrait_lighting_001')
+
+            # 测试1：迁移前，热点查询要临时排序
+            statements = [sql for _, call, _ in PLAN_CALLS for sql in traced_selects(targets, call, params)]
+            sorted_before = sum(any("TEMP B-TREE" in line for line in explain(before, sql)) for sql in statements)
+            print(f"\n【测试1】记录到 {len(statements)} 条查询，迁移前 {sorted_before} 条需要临时排序")
+
+            # 测试2：迁移后全部走复合/主键索引；可重复执行
+            with open(MIGRATION_PATH, encoding='utf-8') as f:
+                migration = f.read()
+            db.conn.executescript(migration)
+            db.conn.executescript(migration)
+            print("\n【测试2】迁移后的查询计划")
+            failed = []
+            for label, plans, ok in check_query_plans(targets, params):
+                print(f"  {'✅' if ok else '❌'} {label}")
+                counts = Counter(' | '.join(plan) for _, plan in plans)
+                for plan, count in counts.items():
+                    print(f"      {plan}" + (f"  (×{count})" if count > 1 else ""))
+                if not ok:
+                    failed.append(label)
+            assert not failed, failed
+
+            # 测试3：迁移前后结果逐行一致（覆盖各领域/类别、同分元素）
+            # 只比较带ORDER BY的elements查询（复合索引可能改变同分元素的顺序）；save_generated_prompt会写入副本的使用统计
+            pairs = before.execute("SELECT DISTINCT domain_id, category_id FROM elements").fetchall()
+            compared = 0
+            for domain, category in pairs:
+                for score in (0.0, 5.0, 8.0):
+                    p = dict(params, domain=domain, category=category, score=score)
+                    for _, call, index_name in PLAN_CALLS:
+                        if index_name == USAGE_STATS_INDEX:
+                            continue
+                        for sql in traced_selects(targets, call, p):
+                            if 'ORDER BY' not in sql:
+                                continue
+                            after = [tuple(row) for row in db.conn.execute(sql)]  # ElementDB的连接返回sqlite3.Row
+                            assert before.execute(sql).fetchall() == after, sql
+                            compared += 1
+            print(f"\n【测试3】{len(pairs)} 个领域/类别组合、{compared} 次查询，迁移前后结果一致")
+
+            before.close()
+            targets['generator'].close()
+            db.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n✅ 测试完成")
+
+
+if __name__ == '__main__':
+    test_query_plans()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成结果缓存 - 内存LRU + 可选的SQLite磁盘缓存
+键为（用户输入, 生成类型, 种子, 数据库版本, YAML版本）；数据库或YAML文件一改，旧结果自然失效
+
+只缓存结果由键唯一确定的生成：
+- portrait / software 不使用随机数，任何时候都可缓存（键中不含种子）
+- design / cross_domain 依赖随机采样和采样器的去重历史，只在给定种子且历史为空时缓存
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# 添加上级目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gen_logging import get_logger
+
+logger = get_logger('result_cache')
+
+
+# 结果只取决于输入的生成类型
+DETERMINISTIC_TYPES = frozenset({'portrait', 'software'})
+# 给定种子（且采样历史为空）时结果确定的生成类型
+SEEDED_TYPES = frozenset({'design', 'cross_domain'})
+
+DEFAULT_MAX_ENTRIES = 1024
+
+DISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generation_cache (
+    cache_key TEXT PRIMARY KEY,
+    generation_type TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+def file_version(path: str) -> Tuple[int, int]:
+    """文件的 (mtime_ns, size)；文件不存在时为 (0, 0)"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (0, 0)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def db_version(db_path: str) -> Tuple:
+    """数据库版本：主文件和WAL文件的 (mtime_ns, size)"""
+    return file_version(db_path) + file_version(db_path + '-wal')
+
+
+def yaml_version(yaml_dir: str) -> Tuple:
+    """YAML目录版本：目录内全部 .yaml 文件中最大的 mtime_ns 以及文件数"""
+    latest, count = 0, 0
+    try:
+        with os.scandir(yaml_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(('.yaml', '.yml')):
+                    count += 1
+                    latest = max(latest, entry.stat().st_mtime_ns)
+    except OSError:
+        pass
+    return (latest, count)
+
+
+def is_cacheable(generation_type: str, seed: Optional[int], history_empty: bool = True) -> bool:
+    """该次生成的结果是否由 (输入, 类型, 种子) 唯一确定"""
+    if generation_type in DETERMINISTIC_TYPES:
+        return True
+    return generation_type in SEEDED_TYPES and seed is not None and history_empty
+
+
+class ResultCache:
+    """线程安全的生成结果缓存
+
+    - 内存中保留最近 max_entries 条（LRU）
+    - 指定 path 时同时写入SQLite文件，跨进程、跨重启复用；内存未命中时再查磁盘
+    - get 返回深拷贝，调用方修改结果不会影响缓存
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, path: Optional[str] = None):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 内存LRU容量
+            path: 磁盘缓存的SQLite文件路径；为None时只用内存
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Tuple, Dict]' = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            self._conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(DISK_SCHEMA)
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(user_input: str, generation_type: str, seed: Optional[int],
+                 db_path: str, yaml_dir: str) -> Tuple:
+        """
+        构造缓存键
+
+        输入按原文参与（software提示词会原样包含输入，大小写和空白都会影响结果）；
+        确定性类型不带种子，同一输入不同种子共用一条缓存
+        """
+        if generation_type in DETERMINISTIC_TYPES:
+            seed = None
+        return (user_input, generation_type, seed,
+                db_version(os.path.abspath(db_path)), yaml_version(yaml_dir))
+
+    @staticmethod
+    def _disk_key(key: Tuple) -> str:
+        return json.dumps(key, ensure_ascii=False, separators=(',', ':'))
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        """取缓存结果（深拷贝）；未命中返回None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(result)
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT result FROM generation_cache WHERE cache_key = ?",
+                        (self._disk_key(key),)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning("⚠️  读取结果缓存失败: %s", e)
+                    row = None
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+                    self.hits += 1
+                    return copy.deepcopy(result)
+
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple, result: Dict):
+        """写入缓存（保存深拷贝）"""
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._remember(key, result)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO generation_cache VALUES (?, ?, ?, ?)",
+                    (self._disk_key(key), key[1],
+                     json.dumps(result, ensure_ascii=False, default=str), time.time())
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("⚠️  写入结果缓存失败: %s", e)
+
+    def _remember(self, key: Tuple, result: Dict):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """命中统计"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        """清空内存和磁盘缓存"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM generation_cache")
+                self._conn.commit()
+
+    def close(self):
+        """关闭磁盘缓存连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def test_result_cache():
+    """测试缓存命中、失效和与直接生成结果的一致性"""
+    import shutil
+    import tempfile
+    import gen_logging
+    from core.cross_domain_generator import CrossDomainGenerator
+
+    print("=" * 80)
+    print("测试生成结果缓存")
+    print("=" * 80)
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tmp = tempfile.mkdtemp()
+    gen_logging.configure(quiet=True)
+    try:
+        db_path = os.path.join(tmp, 'elements.db')
+        yaml_dir = os.path.join(tmp, 'variables')
+        shutil.copy(os.path.join(root, 'extracted_results', 'elements.db'), db_path)
+        shutil.copytree(os.path.join(root, 'variables'), yaml_dir)
+        disk_path = os.path.join(tmp, 'cache.db')
+
+        inputs = [("生成一个年轻女性肖像", 'auto', None),
+                  ("用Python写一个登录API测试脚本", 'auto', None),
+                  ("温馨可爱风格的儿童教育海报", 'design', 7),
+                  ("龙珠动漫的蜡像3D感悟空打出龟派气功", 'cross_domain', 7)]
+
+        plain = CrossDomainGenerator(db_path=db_path, yaml_dir=yaml_dir)
+        cache = ResultCache(path=disk_path)
+        cached = CrossDomainGenerator(db_path=db_path, yaml_dir=yaml_dir, result_cache=cache)
+
+        # 测试1：命中结果与直接生成一致
+        print("\n【测试1】命中结果与直接生成一致")
+        for text, kind, seed in inputs:
+            plain.reset_history()
+            expected = plain.generate(text, kind, seed=seed)
+            for _ in range(3):
+                cached.reset_history()
+                assert cached.generate(text, kind, seed=seed) == expected, text
+        assert cache.stats()['misses'] == len(inputs), cache.stats()
+        print(f"  ✅ {cache.stats()}")
+
+        # 测试2：返回的是副本
+        print("\n【测试2】修改返回结果不影响缓存")
+        result = cached.generate(inputs[0][0])
+        result['prompt'] = 'changed'
+        assert cached.generate(inputs[0][0])['prompt'] != 'changed'
+        print("  ✅ 深拷贝")
+
+        # 测试3：未给种子的随机类型、采样历史非空时不缓存
+        print("\n【测试3】随机类型")
+        key_count = len(cache._entries)
+        cached.generate(inputs[2][0], 'design')
+        cached.generate(inputs[2][0], 'design', seed=8)   # 上一次生成留下了采样历史
+        assert len(cache._entries) == key_count
+        print("  ✅ 不可复现的生成不进缓存")
+
+        # 测试4：YAML修改后失效
+        print("\n【测试4】YAML修改后失效")
+        hits = cache.hits
+        colors = os.path.join(yaml_dir, 'colors.yaml')
+        st = os.stat(colors)
+        os.utime(colors, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        cached.generate(inputs[1][0])
+        assert cache.hits == hits
+        print("  ✅ 版本变化后重新生成")
+
+        # 测试5：磁盘缓存跨实例复用
+        print("\n【测试5】磁盘缓存")
+        second = ResultCache(path=disk_path)
+        reader = CrossDomainGenerator(db_path=db_path, yaml_dir=yaml_dir, result_cache=second)
+        reader.generate(inputs[1][0])
+        assert second.stats()['hits'] == 1, second.stats()
+        print("  ✅ 新实例从磁盘命中")
+
+        # 测试6：命中耗时
+        text = inputs[0][0]
+        start = time.perf_counter()
+        for _ in range(1000):
+            cached.generate(text)
+        hit_us = (time.perf_counter() - start) / 1000 * 1e6
+        start = time.perf_counter()
+        for _ in range(20):
+            plain.generate(text)
+        miss_us = (time.perf_counter() - start) / 20 * 1e6
+        print(f"\n【测试6】portrait: 生成 {miss_us:.0f}µs → 命中 {hit_us:.0f}µs")
+
+        for gen in (plain, cached, reader):
+            gen.close()
+        cache.close()
+        second.close()
+    finally:
+        gen_logging.configure(quiet=False)
+        shutil.rmtree(tmp)
+
+    print("\n✅ 测试完成")
+
+
+if __name__ == '__main__':
+    test_result_cache()
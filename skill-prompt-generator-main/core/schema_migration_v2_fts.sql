@@ -0,0 +1,33 @@
+-- Schema Migration v2: Full-text Search
+-- 为 elements 表添加 FTS5 全文索引（风格关键词搜索使用）
+-- 需要编译了FTS5的SQLite（3.9+，主流发行版默认开启）
+-- 索引按elements的隐式rowid关联（element_id是TEXT主键），VACUUM可能重新编号rowid，
+-- VACUUM后必须执行第3步重建索引（element_fts.vacuum() 会自动完成）
+
+-- 1. 创建外部内容全文索引（不重复存储文本，只存倒排索引）
+CREATE VIRTUAL TABLE IF NOT EXISTS elements_fts USING fts5(
+    name, chinese_name, ai_prompt_template, keywords,
+    content='elements', content_rowid='rowid'
+);
+
+-- 2. 同步触发器
+CREATE TRIGGER IF NOT EXISTS elements_fts_ai AFTER INSERT ON elements BEGIN
+    INSERT INTO elements_fts(rowid, name, chinese_name, ai_prompt_template, keywords)
+    VALUES (new.rowid, new.name, new.chinese_name, new.ai_prompt_template, new.keywords);
+END;
+
+CREATE TRIGGER IF NOT EXISTS elements_fts_ad AFTER DELETE ON elements BEGIN
+    INSERT INTO elements_fts(elements_fts, rowid, name, chinese_name, ai_prompt_template, keywords)
+    VALUES ('delete', old.rowid, old.name, old.chinese_name, old.ai_prompt_template, old.keywords);
+END;
+
+CREATE TRIGGER IF NOT EXISTS elements_fts_au
+AFTER UPDATE OF name, chinese_name, ai_prompt_template, keywords ON elements BEGIN
+    INSERT INTO elements_fts(elements_fts, rowid, name, chinese_name, ai_prompt_template, keywords)
+    VALUES ('delete', old.rowid, old.name, old.chinese_name, old.ai_prompt_template, old.keywords);
+    INSERT INTO elements_fts(rowid, name, chinese_name, ai_prompt_template, keywords)
+    VALUES (new.rowid, new.name, new.chinese_name, new.ai_prompt_template, new.keywords);
+END;
+
+-- 3. 用现有数据建立索引
+INSERT INTO elements_fts(elements_fts) VALUES ('rebuild');
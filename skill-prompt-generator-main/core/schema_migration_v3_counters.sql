@@ -0,0 +1,61 @@
+-- Schema Migration v3: Incremental Counters
+-- categories.total_elements / domains.total_elements / tags.usage_count 改由触发器增量维护，
+-- 添加元素时不再重新 COUNT(*) 整个类别和领域
+-- 注意：INSERT OR REPLACE 替换旧行时，只有开启 PRAGMA recursive_triggers 才会触发删除触发器；
+-- 计数出现偏差时用 ElementDB.rebuild_counts() 修复
+
+-- 1. 元素计数（按 category_id / domain_id 各自计数，与原来的 _update_counts 一致）
+CREATE TRIGGER IF NOT EXISTS elements_count_ai AFTER INSERT ON elements BEGIN
+    UPDATE categories SET total_elements = total_elements + 1 WHERE category_id = new.category_id;
+    UPDATE domains SET total_elements = total_elements + 1 WHERE domain_id = new.domain_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS elements_count_ad AFTER DELETE ON elements BEGIN
+    UPDATE categories SET total_elements = total_elements - 1 WHERE category_id = old.category_id;
+    UPDATE domains SET total_elements = total_elements - 1 WHERE domain_id = old.domain_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS elements_count_au AFTER UPDATE OF category_id, domain_id ON elements BEGIN
+    UPDATE categories SET total_elements = total_elements - 1 WHERE category_id = old.category_id;
+    UPDATE categories SET total_elements = total_elements + 1 WHERE category_id = new.category_id;
+    UPDATE domains SET total_elements = total_elements - 1 WHERE domain_id = old.domain_id;
+    UPDATE domains SET total_elements = total_elements + 1 WHERE domain_id = new.domain_id;
+END;
+
+-- 新建的类别/领域从已有元素数开始计（元素可能先于类别写入）
+CREATE TRIGGER IF NOT EXISTS categories_count_ai AFTER INSERT ON categories BEGIN
+    UPDATE categories SET total_elements = (
+        SELECT COUNT(*) FROM elements WHERE category_id = new.category_id
+    ) WHERE category_id = new.category_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS domains_count_ai AFTER INSERT ON domains BEGIN
+    UPDATE domains SET total_elements = (
+        SELECT COUNT(*) FROM elements WHERE domain_id = new.domain_id
+    ) WHERE domain_id = new.domain_id;
+END;
+
+-- 2. 标签使用次数 = 关联的元素数
+CREATE TRIGGER IF NOT EXISTS element_tags_count_ai AFTER INSERT ON element_tags BEGIN
+    UPDATE tags SET usage_count = usage_count + 1 WHERE tag_id = new.tag_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS element_tags_count_ad AFTER DELETE ON element_tags BEGIN
+    UPDATE tags SET usage_count = usage_count - 1 WHERE tag_id = old.tag_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS element_tags_count_au AFTER UPDATE OF tag_id ON element_tags BEGIN
+    UPDATE tags SET usage_count = usage_count - 1 WHERE tag_id = old.tag_id;
+    UPDATE tags SET usage_count = usage_count + 1 WHERE tag_id = new.tag_id;
+END;
+
+-- 3. 按现有数据重算一次（与 ElementDB.rebuild_counts 相同）
+UPDATE categories SET total_elements = (
+    SELECT COUNT(*) FROM elements e WHERE e.category_id = categories.category_id
+);
+UPDATE domains SET total_elements = (
+    SELECT COUNT(*) FROM elements e WHERE e.domain_id = domains.domain_id
+);
+UPDATE tags SET usage_count = (
+    SELECT COUNT(*) FROM element_tags et WHERE et.tag_id = tags.tag_id
+);
@@ -0,0 +1,15 @@
+-- Schema Migration v4: Composite Indexes
+-- 热点查询按 (domain_id, category_id) 过滤、按 reusability_score DESC 排序，
+-- 单列索引只能先取出整个领域/类别再临时排序；这里补上复合索引，查询计划由 core/query_plan_check.py 检查
+
+-- 1. 按类别取元素（IntelligentGenerator.get_element_by_category / get_all_elements_by_category，
+--    以及 ElementDB.search_by_domain 指定类别时），已按评分排好序
+--    注意：不把查询的其他列加进索引做覆盖索引。同分元素在索引中按其后的列排序，会改变
+--    get_element_by_category 在同分时选中的元素；只到评分为止时同分按rowid排序，与原来的临时排序结果一致
+CREATE INDEX IF NOT EXISTS idx_elements_domain_category_score ON elements(domain_id, category_id, reusability_score DESC);
+
+-- 2. 按领域取元素（ElementDB.search_by_domain 未指定类别时；min_reusability 为索引上的范围条件）
+CREATE INDEX IF NOT EXISTS idx_elements_domain_score ON elements(domain_id, reusability_score DESC);
+
+-- 元素使用统计按主键 element_id 逐行查询（save_generated_prompt），主键索引已足够；
+-- 加覆盖索引规划器也会优先用唯一的主键索引，这里不再添加
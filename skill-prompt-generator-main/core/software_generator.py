@@ -6,9 +6,17 @@
 """
 
 import os
+import sys
 import yaml
 from typing import Dict, List, Optional
 
+# 添加上级目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gen_logging import get_logger
+
+logger = get_logger('software_generator')
+
 class SoftwareGenerator:
     """软件工程提示词生成器"""
 
@@ -19,7 +27,7 @@ class SoftwareGenerator:
     def _load_yaml(self) -> Dict:
         """加载YAML配置"""
         if not os.path.exists(self.yaml_path):
-            print(f"Warning: {self.yaml_path} not found.")
+            logger.warning("Warning: %s not found.", self.yaml_path)
             return {}
         
         with open(self.yaml_path, 'r', encoding='utf-8') as f:
@@ -5,25 +5,33 @@
 支持参数化元素，避免重复采样，上下文感知
 """
 
-import sqlite3
 import json
 import random
 import time
+import sys
+import os
 from typing import Dict, List, Optional, Any
 
+# 添加上级目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_provider import ConnectionProvider
+from element_rows import element_from_row
+
 
 class SQLiteVariableSampler:
     """SQLite元素变量采样器"""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, provider: Optional[ConnectionProvider] = None):
         """
         初始化变量采样器
 
         Args:
             db_path: 数据库路径
+            provider: 共享的连接提供者；为None时自建一个只读的
         """
-        self.db = sqlite3.connect(db_path)
-        self.cursor = self.db.cursor()
+        self._owns_provider = provider is None
+        self.provider = provider or ConnectionProvider(db_path, read_only=True)
         self.history = []  # 采样历史，避免重复
         self.max_history = 100  # 保留最近100次采样历史
 
@@ -35,29 +43,14 @@ class SQLiteVariableSampler:
             FROM elements
             WHERE element_id = ?
         """
-        self.cursor.execute(query, (element_id,))
-        row = self.cursor.fetchone()
+        row = self.provider.execute(query, (element_id,)).fetchone()
 
         if not row:
             return None
 
-        keywords = None
-        if row[4]:
-            try:
-                keywords = json.loads(row[4])
-            except:
-                pass
-
-        return {
-            'element_id': row[0],
-            'name': row[1],
-            'chinese_name': row[2],
-            'template': row[3],
-            'keywords': keywords,
-            'reusability': row[5],
-            'category': row[6],
-            'domain': row[7]
-        }
+        element = element_from_row(row)
+        element['domain'] = row[7]
+        return element
 
     def get_element_variables(self, element_id: str) -> List[Dict]:
         """获取元素的所有变量配置"""
@@ -67,8 +60,7 @@ class SQLiteVariableSampler:
             FROM element_variables
             WHERE element_id = ?
         """
-        self.cursor.execute(query, (element_id,))
-        rows = self.cursor.fetchall()
+        rows = self.provider.execute(query, (element_id,)).fetchall()
 
         variables = []
         for row in rows:
@@ -91,13 +83,15 @@ class SQLiteVariableSampler:
         return variables
 
     def sample_element_with_variables(self, element_id: str,
-                                     style_context: Optional[Dict] = None) -> Dict:
+                                     style_context: Optional[Dict] = None,
+                                     rng: Optional[random.Random] = None) -> Dict:
         """
         采样元素并应用变量
 
         Args:
             element_id: 元素ID
             style_context: 风格上下文（可选）
+            rng: 随机数生成器；为None时使用全局随机状态
 
         Returns:
             包含原始元素和变量值的字典
@@ -122,7 +116,7 @@ class SQLiteVariableSampler:
         sampled_vars = {}
         for var in variables:
             sampled_vars[var['parameter_name']] = self.sample_variable(
-                var, style_context, avoid_history=True
+                var, style_context, avoid_history=True, rng=rng
             )
 
         # 4. 应用变量到模板
@@ -146,7 +140,7 @@ class SQLiteVariableSampler:
         }
 
     def sample_variable(self, var_config: Dict, style_context: Optional[Dict],
-                       avoid_history: bool) -> Any:
+                       avoid_history: bool, rng: Optional[random.Random] = None) -> Any:
         """
         智能采样单个变量
 
@@ -154,10 +148,12 @@ class SQLiteVariableSampler:
             var_config: 变量配置
             style_context: 风格上下文
             avoid_history: 是否避免最近使用过的值
+            rng: 随机数生成器；为None时使用全局随机状态
 
         Returns:
             采样的变量值
         """
+        rng = rng or random
         param_type = var_config['parameter_type']
 
         if param_type == 'enum':
@@ -177,7 +173,7 @@ class SQLiteVariableSampler:
                 if filtered:
                     values = filtered
 
-            return random.choice(values) if values else var_config['default_value']
+            return rng.choice(values) if values else var_config['default_value']
 
         elif param_type == 'range':
             # 范围类型：在范围内随机
@@ -195,15 +191,15 @@ class SQLiteVariableSampler:
 
             # 判断是整数还是浮点数
             if isinstance(min_val, int) and isinstance(max_val, int):
-                return random.randint(min_val, max_val)
+                return rng.randint(min_val, max_val)
             else:
-                return round(random.uniform(min_val, max_val), 2)
+                return round(rng.uniform(min_val, max_val), 2)
 
         elif param_type == 'boolean':
             # 布尔类型
             if style_context and 'prefer_' + var_config['parameter_name'] in style_context:
                 return style_context['prefer_' + var_config['parameter_name']]
-            return random.choice([True, False])
+            return rng.choice([True, False])
 
         else:
             return var_config['default_value']
@@ -257,37 +253,42 @@ class SQLiteVariableSampler:
         return result
 
     def close(self):
-        """关闭数据库连接"""
-        self.db.close()
+        """关闭数据库连接（共享的provider由其创建者关闭）"""
+        if self._owns_provider:
+            self.provider.close()
 
 
 class DesignVariableSampler:
     """设计变量采样器（从design_variables表采样）"""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, provider: Optional[ConnectionProvider] = None):
         """
         初始化设计变量采样器
 
         Args:
             db_path: 数据库路径
+            provider: 共享的连接提供者；为None时自建一个只读的
         """
-        self.db = sqlite3.connect(db_path)
-        self.cursor = self.db.cursor()
+        self._owns_provider = provider is None
+        self.provider = provider or ConnectionProvider(db_path, read_only=True)
         self.history = []
         self.max_history = 100
 
     def sample_design_variables(self, style_name: str,
-                                variable_types: Optional[List[str]] = None) -> Dict:
+                                variable_types: Optional[List[str]] = None,
+                                rng: Optional[random.Random] = None) -> Dict:
         """
         采样设计变量
 
         Args:
             style_name: 风格名称（如：温馨可爱、现代简约）
             variable_types: 变量类型列表（如：['colors', 'borders']），None表示全部
+            rng: 随机数生成器；为None时使用全局随机状态
 
         Returns:
             采样的设计变量字典
         """
+        rng = rng or random
         query = """
             SELECT variable_id, variable_type, variable_name, variable_data
             FROM design_variables
@@ -302,8 +303,7 @@ class DesignVariableSampler:
 
         query += " ORDER BY priority DESC"
 
-        self.cursor.execute(query, params)
-        rows = self.cursor.fetchall()
+        rows = self.provider.execute(query, params).fetchall()
 
         if not rows:
             return {}
@@ -337,7 +337,7 @@ class DesignVariableSampler:
             if not filtered:
                 filtered = candidates
 
-            selected = random.choice(filtered)
+            selected = rng.choice(filtered)
             sampled[var_type] = selected
 
             # 记录历史
@@ -365,8 +365,9 @@ class DesignVariableSampler:
         return recent
 
     def close(self):
-        """关闭数据库连接"""
-        self.db.close()
+        """关闭数据库连接（共享的provider由其创建者关闭）"""
+        if self._owns_provider:
+            self.provider.close()
 
 
 def test_variable_sampler():
@@ -5,12 +5,21 @@ YAML变量采样器 - 从prompt-crafter的YAML配置中采样设计变量
 支持温馨可爱、现代简约等风格的配色、边框、装饰采样
 """
 
+import os
+import sys
 import yaml
 import random
 import time
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 
+# 添加上级目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gen_logging import get_logger
+
+logger = get_logger('yaml_sampler')
+
 
 class YAMLVariableSampler:
     """YAML变量采样器（读取prompt-crafter的YAML配置）"""
@@ -35,20 +44,22 @@ class YAMLVariableSampler:
         """加载YAML文件"""
         filepath = self.yaml_dir / filename
         if not filepath.exists():
-            print(f"⚠️ YAML文件不存在: {filepath}")
+            logger.warning("⚠️ YAML文件不存在: %s", filepath)
             return {}
 
         with open(filepath, 'r', encoding='utf-8') as f:
             return yaml.safe_load(f) or {}
 
     def sample_variables(self, style: str = '温馨可爱',
-                        variable_types: Optional[List[str]] = None) -> Dict:
+                        variable_types: Optional[List[str]] = None,
+                        rng: Optional[random.Random] = None) -> Dict:
         """
         采样设计变量
 
         Args:
             style: 风格名称（温馨可爱、现代简约）
             variable_types: 要采样的变量类型列表（如：['colors', 'borders']），None表示全部
+            rng: 随机数生成器；为None时使用全局随机状态
 
         Returns:
             采样的设计变量字典
@@ -61,16 +72,17 @@ class YAMLVariableSampler:
         if variable_types is None:
             variable_types = ['colors', 'borders', 'decorations']
 
+        rng = rng or random
         sampled = {}
 
         if 'colors' in variable_types and self.colors:
-            sampled['colors'] = self._sample_colors(style)
+            sampled['colors'] = self._sample_colors(style, rng)
 
         if 'borders' in variable_types and self.borders:
-            sampled['borders'] = self._sample_borders(style)
+            sampled['borders'] = self._sample_borders(style, rng)
 
         if 'decorations' in variable_types and self.decorations:
-            sampled['decorations'] = self._sample_decorations(style)
+            sampled['decorations'] = self._sample_decorations(style, rng)
 
         # 记录历史
         self.history.append({
@@ -85,7 +97,7 @@ class YAMLVariableSampler:
 
         return sampled
 
-    def _sample_colors(self, style: str) -> Dict:
+    def _sample_colors(self, style: str, rng: random.Random) -> Dict:
         """采样配色方案"""
         if style not in self.colors:
             # 风格不存在，使用第一个可用风格
@@ -112,12 +124,12 @@ class YAMLVariableSampler:
             available = list(main_schemes.keys())
 
         # 随机选择一个色系
-        scheme_name = random.choice(available)
+        scheme_name = rng.choice(available)
         scheme_data = main_schemes[scheme_name]
 
         # 从variants中随机选择一个颜色
         variants = scheme_data.get('variants', [])
-        selected_variant = random.choice(variants) if variants else None
+        selected_variant = rng.choice(variants) if variants else None
 
         return {
             'scheme_name': scheme_name,
@@ -126,7 +138,7 @@ class YAMLVariableSampler:
             'style': style
         }
 
-    def _sample_borders(self, style: str) -> Dict:
+    def _sample_borders(self, style: str, rng: random.Random) -> Dict:
         """采样边框样式"""
         if style not in self.borders:
             # 风格不存在，使用第一个可用风格
@@ -147,7 +159,7 @@ class YAMLVariableSampler:
             available = list(border_styles.keys())
 
         # 随机选择一个边框样式
-        border_name = random.choice(available)
+        border_name = rng.choice(available)
         border_config = border_styles[border_name]
 
         return {
@@ -156,7 +168,7 @@ class YAMLVariableSampler:
             'style': style
         }
 
-    def _sample_decorations(self, style: str) -> Dict:
+    def _sample_decorations(self, style: str, rng: random.Random) -> Dict:
         """采样装饰元素"""
         if style not in self.decorations:
             # 风格不存在，使用第一个可用风格
@@ -177,7 +189,7 @@ class YAMLVariableSampler:
             available = list(decoration_options.keys())
 
         # 随机选择一个装饰元素
-        decoration_name = random.choice(available)
+        decoration_name = rng.choice(available)
         decoration_config = decoration_options[decoration_name]
 
         return {
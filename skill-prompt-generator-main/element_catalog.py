@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存元素目录 - 一次加载elements表，用预计算索引代替逐字段SQL查询
+返回的行与IntelligentGenerator的SQL查询结果完全一致（同列、同顺序）
+"""
+
+import re
+import sqlite3
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# 与IntelligentGenerator查询的列一致
+ROW_COLUMNS = """element_id, name, chinese_name, ai_prompt_template,
+                 keywords, reusability_score, category_id"""
+
+# SQLite的LIKE只对ASCII字母不区分大小写
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+_GRAM = 3
+_MEMO_SIZE = 4096
+
+
+def ascii_lower(text: Optional[str]) -> Optional[str]:
+    return text.translate(_ASCII_LOWER) if text is not None else None
+
+
+class LikePattern:
+    """`%value%` 形式LIKE条件的Python等价实现（value中的 % 和 _ 仍是通配符）"""
+
+    def __init__(self, value: str):
+        value = ascii_lower(value)
+        if '%' in value or '_' in value:
+            self.literal = None
+            regex = ''.join('.*' if ch == '%' else '.' if ch == '_' else re.escape(ch) for ch in value)
+            self._regex = re.compile(regex, re.DOTALL)
+            # 用最长的字面量片段做索引预筛
+            pieces = [p for p in re.split('[%_]', value) if p]
+            self.probe = max(pieces, key=len) if pieces else ''
+        else:
+            self.literal = value
+            self._regex = None
+            self.probe = value
+
+    def matches(self, text_lower: Optional[str]) -> bool:
+        """text_lower须已经过ascii_lower；NULL永远不匹配"""
+        if text_lower is None:
+            return False
+        if self.literal is not None:
+            return self.literal in text_lower
+        return self._regex.search(text_lower) is not None
+
+
+class ElementCatalog:
+    """elements表的只读内存快照
+
+    - (domain, category) 桶，按 reusability_score DESC 预排序
+    - (domain, category, name) 名称索引
+    - 模板/关键词文本的三元组倒排索引（token → 元素），用于全表LIKE搜索预筛
+
+    排序规则与SQLite执行计划一致：分数降序、NULL最后、同分按rowid升序。
+    数据库被修改后需调用 reload()。
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.reload(conn)
+
+    def reload(self, conn: sqlite3.Connection):
+        """从数据库重新加载全部元素并重建索引"""
+        rows = conn.execute(
+            f"SELECT rowid, domain_id, {ROW_COLUMNS} FROM elements"
+        ).fetchall()
+
+        def order(i):
+            score = rows[i][7]
+            return (score is None, -(score or 0.0), rows[i][0])
+
+        self.rows: List[Tuple] = [tuple(r[2:]) for r in rows]
+        self._template_l = [ascii_lower(r[5]) for r in rows]
+        self._keywords_l = [ascii_lower(r[6]) for r in rows]
+        ranked = sorted(range(len(rows)), key=order)
+        self._ranked = ranked
+
+        self._buckets: Dict[Tuple[str, str], List[int]] = {}
+        self._names: Dict[Tuple[str, str, str], int] = {}
+        for i in ranked:
+            key = (rows[i][1], rows[i][8])
+            self._buckets.setdefault(key, []).append(i)
+            self._names.setdefault(key + (rows[i][3],), i)
+
+        # 三元组索引只有全表搜索用到，首次搜索时再建
+        self._grams: Optional[Dict[str, set]] = None
+
+        # 索引变了，清空记忆化结果
+        self._category_ids = lru_cache(maxsize=_MEMO_SIZE)(self._category_ids_uncached)
+        self._search_ids = lru_cache(maxsize=_MEMO_SIZE)(self._search_ids_uncached)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _build_grams(self) -> Dict[str, set]:
+        grams: Dict[str, set] = {}
+        for i in range(len(self.rows)):
+            text = (self._template_l[i] or '') + '\x00' + (self._keywords_l[i] or '')
+            for j in range(len(text) - _GRAM + 1):
+                grams.setdefault(text[j:j + _GRAM], set()).add(i)
+        return grams
+
+    def _candidates(self, pattern: LikePattern) -> Optional[set]:
+        """三元组预筛；返回None表示无法预筛（需要全量检查）"""
+        probe = pattern.probe
+        if len(probe) < _GRAM:
+            return None
+        if self._grams is None:
+            self._grams = self._build_grams()
+        result = None
+        for j in range(len(probe) - _GRAM + 1):
+            ids = self._grams.get(probe[j:j + _GRAM])
+            if not ids:
+                return set()
+            result = ids if result is None else result & ids
+        return result
+
+    def _category_ids_uncached(self, domain: str, category: str,
+                               value_filter: Optional[str]) -> Tuple[int, ...]:
+        bucket = self._buckets.get((domain, category), [])
+        if not value_filter:
+            return tuple(bucket)
+        pattern = LikePattern(value_filter)
+        return tuple(
+            i for i in bucket
+            if pattern.matches(self._template_l[i]) or pattern.matches(self._keywords_l[i])
+        )
+
+    def _search_ids_uncached(self, keywords: Tuple[str, ...], limit: int,
+                             excluded: frozenset) -> Tuple[int, ...]:
+        patterns = [LikePattern(kw) for kw in keywords]
+        candidates = set()
+        for pattern in patterns:
+            ids = self._candidates(pattern)
+            if ids is None:
+                candidates = None
+                break
+            candidates |= ids
+
+        found = []
+        for i in self._ranked:
+            if candidates is not None and i not in candidates:
+                continue
+            template = self._template_l[i]
+            if template == '' or self.rows[i][6] in excluded:
+                continue
+            if not any(p.matches(template) for p in patterns):
+                continue
+            found.append(i)
+            if len(found) >= limit:
+                break
+        return tuple(found)
+
+    def by_category(self, domain: str, category: str,
+                    value_filter: Optional[str] = None) -> List[Tuple]:
+        """等价于: WHERE domain_id=? AND category_id=?
+        [AND (ai_prompt_template LIKE %v% OR keywords LIKE %v%)] ORDER BY reusability_score DESC"""
+        return [self.rows[i] for i in self._category_ids(domain, category, value_filter or None)]
+
+    def first_by_category(self, domain: str, category: str,
+                          value_filter: Optional[str] = None) -> Optional[Tuple]:
+        """by_category(...) 的 LIMIT 1"""
+        ids = self._category_ids(domain, category, value_filter or None)
+        return self.rows[ids[0]] if ids else None
+
+    def by_name(self, domain: str, category: str, name: str) -> Optional[Tuple]:
+        """等价于: WHERE domain_id=? AND category_id=? AND name=? ORDER BY reusability_score DESC LIMIT 1"""
+        i = self._names.get((domain, category, name))
+        return self.rows[i] if i is not None else None
+
+    def search_templates(self, keywords: Sequence[str], limit: int = 30,
+                         exclude_categories: Iterable[str] = ()) -> List[Tuple]:
+        """等价于: WHERE (ai_prompt_template LIKE %k1% OR ...) AND ai_prompt_template != ''
+        [AND category_id NOT IN (...)] ORDER BY reusability_score DESC LIMIT ?"""
+        excluded = frozenset(exclude_categories)
+        return [self.rows[i] for i in self._search_ids(tuple(keywords), limit, excluded)]
+
+
+def test_element_catalog():
+    """对照SQL验证内存目录的结果与顺序"""
+    import time
+
+    print("=" * 80)
+    print("测试ElementCatalog（与SQL逐条对照）")
+    print("=" * 80)
+
+    conn = sqlite3.connect("extracted_results/elements.db")
+    start = time.perf_counter()
+    catalog = ElementCatalog(conn)
+    print(f"\n加载 {len(catalog)} 个元素，用时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    buckets = conn.execute("SELECT DISTINCT domain_id, category_id FROM elements").fetchall()
+    names = [r[0] for r in conn.execute("SELECT DISTINCT name FROM elements")]
+    filters = [None, '', 'a', 'male', 'East_Asian', 'soft%light', 'black', 'Girl', '光', 'xyz_not_there'] + names[::7]
+
+    base = f"SELECT {ROW_COLUMNS} FROM elements WHERE domain_id = ? AND category_id = ?"
+    checked = 0
+    for domain, category in buckets:
+        for value in filters:
+            sql, params = base, [domain, category]
+            if value:
+                sql += " AND (ai_prompt_template LIKE ? OR keywords LIKE ?)"
+                params += [f"%{value}%", f"%{value}%"]
+            expected = conn.execute(sql + " ORDER BY reusability_score DESC", params).fetchall()
+            assert catalog.by_category(domain, category, value) == expected, (domain, category, value)
+            first = conn.execute(sql + " ORDER BY reusability_score DESC LIMIT 1", params).fetchone()
+            assert catalog.first_by_category(domain, category, value) == first, (domain, category, value)
+            checked += 2
+        for name in names[::5]:
+            expected = conn.execute(base + " AND name = ? ORDER BY reusability_score DESC LIMIT 1",
+                                    [domain, category, name]).fetchone()
+            assert catalog.by_name(domain, category, name) == expected
+            checked += 1
+    print(f"\n【测试1】分类/名称查询: {checked} 条对照一致")
+
+    keyword_sets = [['cinematic'], ['wax', '3d'], ['cute', 'pastel', 'kawaii'], ['an'], ['soft_light'], ['龟派'], ['x%y']]
+    for kws in keyword_sets:
+        sql = (f"SELECT {ROW_COLUMNS} FROM elements WHERE ("
+               + " OR ".join("ai_prompt_template LIKE ?" for _ in kws)
+               + ") AND ai_prompt_template != '' ORDER BY reusability_score DESC LIMIT 30")
+        expected = conn.execute(sql, [f"%{k}%" for k in kws]).fetchall()
+        assert catalog.search_templates(kws) == expected, kws
+        excluded = ['lighting_techniques', 'visual_effects', 'gender']
+        sql = sql.replace("AND ai_prompt_template != ''",
+                          "AND ai_prompt_template != '' AND category_id NOT IN (?, ?, ?)")
+        expected = conn.execute(sql, [f"%{k}%" for k in kws] + excluded).fetchall()
+        assert catalog.search_templates(kws, exclude_categories=excluded) == expected, kws
+    print(f"【测试2】风格搜索: {len(keyword_sets)} 组关键词对照一致")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        catalog.first_by_category('portrait', 'eye_colors', 'brown')
+    print(f"【测试3】记忆化查询: {(time.perf_counter() - start) * 1000:.2f}ms / 1000次")
+
+    conn.close()
+    print("\n✅ 测试完成")
+
+
+if __name__ == '__main__':
+    test_element_catalog()
@@ -5,16 +5,117 @@ Universal Elements Library - Database Layer
 通用元素库 - 数据库层
 
 使用SQLite数据库存储所有领域的可复用元素
-支持导出/导入JSON用于版本控制
+支持导出/导入JSON用于版本控制，导出/导入JSONL（逐行流式）用于在机器间同步大型元素库
 """
 
+import gzip
 import sqlite3
+import sys
 import json
+from collections import Counter
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 import re
 
+from element_fts import deferred_insert_sync, ensure_fts_index, vacuum
+from element_rows import decode_keywords
+from element_tag_index import TagIndex
+from gen_logging import get_logger
+
+logger = get_logger('element_db')
+
+
+# 元素表插入语句（add_element 和 bulk_add_elements 共用）
+INSERT_ELEMENT_SQL = """
+    INSERT INTO elements (
+        element_id, domain_id, category_id, name, chinese_name,
+        ai_prompt_template, keywords, reusability_score,
+        source_prompts, learned_from, metadata,
+        confidence_score, created_at, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+              COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+"""
+
+# 元素所属类别不存在时自动创建（add_element 和 bulk_add_elements 共用）
+INSERT_CATEGORY_SQL = """
+    INSERT OR IGNORE INTO categories (category_id, domain_id, name)
+    VALUES (?, ?, ?)
+"""
+
+# 计数触发器：类别/领域的元素数、标签使用次数随增删改增量维护
+# 与 core/schema_migration_v3_counters.sql 保持一致
+COUNT_TRIGGERS_SQL = """
+CREATE TRIGGER IF NOT EXISTS elements_count_ai AFTER INSERT ON elements BEGIN
+    UPDATE categories SET total_elements = total_elements + 1 WHERE category_id = new.category_id;
+    UPDATE domains SET total_elements = total_elements + 1 WHERE domain_id = new.domain_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS elements_count_ad AFTER DELETE ON elements BEGIN
+    UPDATE categories SET total_elements = total_elements - 1 WHERE category_id = old.category_id;
+    UPDATE domains SET total_elements = total_elements - 1 WHERE domain_id = old.domain_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS elements_count_au AFTER UPDATE OF category_id, domain_id ON elements BEGIN
+    UPDATE categories SET total_elements = total_elements - 1 WHERE category_id = old.category_id;
+    UPDATE categories SET total_elements = total_elements + 1 WHERE category_id = new.category_id;
+    UPDATE domains SET total_elements = total_elements - 1 WHERE domain_id = old.domain_id;
+    UPDATE domains SET total_elements = total_elements + 1 WHERE domain_id = new.domain_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS categories_count_ai AFTER INSERT ON categories BEGIN
+    UPDATE categories SET total_elements = (
+        SELECT COUNT(*) FROM elements WHERE category_id = new.category_id
+    ) WHERE category_id = new.category_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS domains_count_ai AFTER INSERT ON domains BEGIN
+    UPDATE domains SET total_elements = (
+        SELECT COUNT(*) FROM elements WHERE domain_id = new.domain_id
+    ) WHERE domain_id = new.domain_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS element_tags_count_ai AFTER INSERT ON element_tags BEGIN
+    UPDATE tags SET usage_count = usage_count + 1 WHERE tag_id = new.tag_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS element_tags_count_ad AFTER DELETE ON element_tags BEGIN
+    UPDATE tags SET usage_count = usage_count - 1 WHERE tag_id = old.tag_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS element_tags_count_au AFTER UPDATE OF tag_id ON element_tags BEGIN
+    UPDATE tags SET usage_count = usage_count - 1 WHERE tag_id = old.tag_id;
+    UPDATE tags SET usage_count = usage_count + 1 WHERE tag_id = new.tag_id;
+END;
+"""
+
+# 批量导入时每批的元素数
+BULK_BATCH_SIZE = 1000
+
+# 元素JSON字段的编码器（json.dumps 带参数时每次都会新建编码器）
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+# 元素的全部标签（JSON数组），作为元素查询的附加列一并取出，不再逐个元素查询
+ELEMENT_TAGS_SQL = """
+    (SELECT json_group_array(t.tag_name) FROM element_tags et
+     JOIN tags t ON t.tag_id = et.tag_id
+     WHERE et.element_id = e.element_id) AS tags
+"""
+
+# JSONL导出格式版本（首行 library_metadata.format_version）
+# 1：元素的JSON字段为解码后的值，导入时重新编码（NULL写成 []/{}）
+# 2：元素的JSON字段为列的原文（含NULL），连同置信度和时间戳原样写回；领域、标签也带时间戳，导出/导入不改变数据
+JSONL_FORMAT_VERSION = 2
+ELEMENT_JSON_COLUMNS = ('keywords', 'source_prompts', 'metadata')
+# add_element参数之外、格式版本2导入时原样写回的元素列
+ELEMENT_RESTORED_COLUMNS = ('confidence_score', 'created_at', 'updated_at')
+
+# JSONL导入时写入的来源Prompt列（不信任文件中的其他键）
+SOURCE_PROMPT_COLUMNS = (
+    'prompt_id', 'original_prompt', 'prompt_length', 'theme', 'domain_classification',
+    'learned_at', 'quality_score', 'complexity', 'learning_status', 'extracted_elements_count'
+)
+
 
 class ElementDB:
     """通用元素库数据库管理类"""
@@ -32,6 +133,10 @@ class ElementDB:
         self.conn = sqlite3.connect(str(self.db_path))
         self.conn.row_factory = sqlite3.Row  # 返回字典形式的行
 
+        # 标签索引及其对应的数据版本（见 tag_index()）
+        self._tag_index: Optional[TagIndex] = None
+        self._tag_index_version: Optional[Tuple[int, int]] = None
+
         self._init_database()
 
     def _init_database(self):
@@ -144,9 +249,19 @@ class ElementDB:
 
         self.conn.commit()
 
+        # 全文索引（风格搜索用；SQLite未编译FTS5时跳过，搜索回退到LIKE）
+        ensure_fts_index(self.conn)
+
         # 初始化7个领域
         self._init_domains()
 
+        # 计数触发器（旧库首次打开时创建，并按现有数据重算一次计数）
+        if not self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'elements_count_ai'"
+        ).fetchone():
+            self.conn.executescript(COUNT_TRIGGERS_SQL)
+            self.rebuild_counts()
+
     def _init_domains(self):
         """初始化7个领域"""
         domains = [
@@ -207,48 +322,192 @@ class ElementDB:
 
         try:
             # 确保category存在
-            cursor.execute("""
-                INSERT OR IGNORE INTO categories (category_id, domain_id, name)
-                VALUES (?, ?, ?)
-            """, (category_id, domain_id, category_id.replace('_', ' ').title()))
+            cursor.execute(INSERT_CATEGORY_SQL, self._category_row(category_id, domain_id))
 
             # 插入元素
-            cursor.execute("""
-                INSERT INTO elements (
-                    element_id, domain_id, category_id, name, chinese_name,
-                    ai_prompt_template, keywords, reusability_score,
-                    source_prompts, learned_from, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                element_id,
-                domain_id,
-                category_id,
-                name,
-                chinese_name,
-                ai_prompt_template,
-                json.dumps(keywords or [], ensure_ascii=False),
-                reusability_score,
-                json.dumps(source_prompts or [], ensure_ascii=False),
-                learned_from,
-                json.dumps(metadata or {}, ensure_ascii=False)
+            cursor.execute(INSERT_ELEMENT_SQL, self._element_row(
+                element_id, domain_id, category_id, name, ai_prompt_template,
+                chinese_name, keywords, reusability_score, source_prompts, learned_from, metadata
             ))
 
-            # 添加标签
+            # 添加标签（类别/领域计数和标签使用次数由触发器维护）
             if tags:
                 for tag_name in tags:
                     self._add_tag_to_element(element_id, tag_name)
 
-            # 更新统计
-            self._update_counts(domain_id, category_id)
-
             self.conn.commit()
             return True
 
         except sqlite3.IntegrityError as e:
-            print(f"❌ 添加元素失败: {e}")
+            logger.error("❌ 添加元素失败: %s", e)
             self.conn.rollback()
             return False
 
+    @staticmethod
+    def _category_row(category_id: str, domain_id: str) -> Tuple:
+        """自动创建的类别行（名称由ID生成）"""
+        return (category_id, domain_id, category_id.replace('_', ' ').title())
+
+    @staticmethod
+    def _element_row(element_id: str, domain_id: str, category_id: str, name: str,
+                     ai_prompt_template: str, chinese_name: Optional[str] = None,
+                     keywords: Optional[List[str]] = None,
+                     reusability_score: Optional[float] = None,
+                     source_prompts: Optional[List[int]] = None,
+                     learned_from: str = "manual",
+                     metadata: Optional[Dict] = None,
+                     raw_json: bool = False,
+                     confidence_score: Optional[float] = None,
+                     created_at: Optional[str] = None,
+                     updated_at: Optional[str] = None) -> Tuple:
+        """
+        元素表的一行（列顺序同INSERT_ELEMENT_SQL）
+
+        JSON字段为字符串时视为已编码的原文，原样保存；为None时写成 []/{}，raw_json=True 时保留为NULL。
+        时间戳为None时取插入时间
+        """
+        def column(value, empty):
+            if isinstance(value, str) or (value is None and raw_json):
+                return value
+            return _encode_json(value or empty)
+
+        return (
+            element_id,
+            domain_id,
+            category_id,
+            name,
+            chinese_name,
+            ai_prompt_template,
+            column(keywords, []),
+            reusability_score,
+            column(source_prompts, []),
+            learned_from,
+            column(metadata, {}),
+            confidence_score,
+            created_at,
+            updated_at
+        )
+
+    def bulk_add_elements(self,
+                          elements: Iterable[Dict],
+                          batch_size: int = BULK_BATCH_SIZE,
+                          synchronous_off: bool = False,
+                          default_id: Optional[Callable[[Dict, int], str]] = None) -> int:
+        """
+        批量添加元素（大量导入用）
+
+        结果与逐个调用add_element相同：违反约束的元素跳过并记录错误，标签、类别、计数一致
+        （只有新标签的ID是连续分配的，逐个添加时 INSERT OR IGNORE 会空耗自增ID）。
+        区别在于整个导入在一个事务中完成：元素按批executemany插入，标签ID预先载入映射，
+        全文索引在最后统一更新（计数照常由触发器维护）；出现意外错误时整体回滚。
+
+        Args:
+            elements: 元素字典，键同add_element的参数
+            batch_size: 每批插入的元素数；某批有元素违反约束时该批改为逐个插入
+            synchronous_off: 导入期间设置 PRAGMA synchronous=OFF（断电可能损坏数据库，只用于可重建的库）
+            default_id: 元素缺少element_id时生成ID：default_id(元素, 已成功导入数)
+
+        Returns:
+            成功导入的元素数
+        """
+        cursor = self.conn.cursor()
+        self.conn.commit()
+
+        previous_synchronous = cursor.execute("PRAGMA synchronous").fetchone()[0]
+        if synchronous_off:
+            cursor.execute("PRAGMA synchronous=OFF")
+
+        state = {
+            'imported': 0,
+            'tag_ids': dict(cursor.execute("SELECT tag_name, tag_id FROM tags").fetchall()),
+        }
+
+        try:
+            cursor.execute("BEGIN")
+            with deferred_insert_sync(self.conn):
+                batch = []
+                for element in elements:
+                    batch.append(element)
+                    if len(batch) >= batch_size:
+                        self._bulk_insert_batch(cursor, batch, state, default_id)
+                        batch = []
+                if batch:
+                    self._bulk_insert_batch(cursor, batch, state, default_id)
+
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            if synchronous_off:
+                cursor.execute(f"PRAGMA synchronous={int(previous_synchronous)}")
+
+        return state['imported']
+
+    def _bulk_insert_batch(self, cursor: sqlite3.Cursor, batch: List[Dict], state: Dict,
+                           default_id: Optional[Callable[[Dict, int], str]]):
+        """插入一批元素及其类别、标签（在bulk_add_elements的事务内）"""
+
+        def prepare(element: Dict, imported: int) -> Tuple:
+            fields = {key: value for key, value in element.items() if key != 'tags'}
+            if 'element_id' not in fields and default_id is not None:
+                fields['element_id'] = default_id(element, imported)
+            return self._element_row(**fields)
+
+        # 先整批插入；类别先于元素写入，计数触发器才能计到（按出现顺序，首个元素的domain为准）
+        added = []
+        for element in batch:
+            added.append((element, prepare(element, state['imported'] + len(added))))
+        categories = {}
+        for _, row in added:
+            categories.setdefault(row[2], self._category_row(row[2], row[1]))
+
+        cursor.execute("SAVEPOINT bulk_batch")
+        try:
+            cursor.executemany(INSERT_CATEGORY_SQL, categories.values())
+            cursor.executemany(INSERT_ELEMENT_SQL, [row for _, row in added])
+        except sqlite3.IntegrityError:
+            # 有元素违反约束：逐个插入并跳过失败的（后续元素的默认ID随成功数变化）
+            cursor.execute("ROLLBACK TO bulk_batch")
+            added = []
+            for element in batch:
+                row = prepare(element, state['imported'] + len(added))
+                cursor.execute("SAVEPOINT bulk_row")
+                try:
+                    cursor.execute(INSERT_CATEGORY_SQL, self._category_row(row[2], row[1]))
+                    cursor.execute(INSERT_ELEMENT_SQL, row)
+                except sqlite3.IntegrityError as e:
+                    logger.error("❌ 添加元素失败: %s", e)
+                    cursor.execute("ROLLBACK TO bulk_row")
+                    cursor.execute("RELEASE bulk_row")
+                    continue
+                cursor.execute("RELEASE bulk_row")
+                added.append((element, row))
+        cursor.execute("RELEASE bulk_batch")
+
+        # 标签：新标签按首次出现顺序分配ID
+        tag_ids = state['tag_ids']
+        links = []
+        for element, row in added:
+            for tag_name in element.get('tags') or []:
+                tag_id = tag_ids.get(tag_name)
+                if tag_id is None:
+                    # 映射之外的标签可能是导入过程中写入的（如JSONL的tag记录）
+                    existing = cursor.execute("SELECT tag_id FROM tags WHERE tag_name = ?", (tag_name,)).fetchone()
+                    if existing is not None:
+                        tag_id = existing[0]
+                    else:
+                        cursor.execute("INSERT INTO tags (tag_name) VALUES (?)", (tag_name,))
+                        tag_id = cursor.lastrowid
+                    tag_ids[tag_name] = tag_id
+                links.append((row[0], tag_id))
+        cursor.executemany("""
+            INSERT OR IGNORE INTO element_tags (element_id, tag_id)
+            VALUES (?, ?)
+        """, links)
+
+        state['imported'] += len(added)
+
     def save_source_prompt(self,
                           prompt_id: int,
                           original_prompt: str,
@@ -307,7 +566,7 @@ class ElementDB:
                 self.conn.commit()
                 return True
             except Exception as update_error:
-                print(f"❌ 更新学习记录失败: {update_error}")
+                logger.error("❌ 更新学习记录失败: %s", update_error)
                 self.conn.rollback()
                 return False
 
@@ -325,79 +584,92 @@ class ElementDB:
         cursor.execute("SELECT tag_id FROM tags WHERE tag_name = ?", (tag_name,))
         tag_id = cursor.fetchone()[0]
 
-        # 关联元素和标签
+        # 关联元素和标签（使用次数由触发器维护，重复的标签只计一次）
         cursor.execute("""
             INSERT OR IGNORE INTO element_tags (element_id, tag_id)
             VALUES (?, ?)
         """, (element_id, tag_id))
 
-        # 更新标签使用计数
-        cursor.execute("""
-            UPDATE tags SET usage_count = usage_count + 1
-            WHERE tag_id = ?
-        """, (tag_id,))
+    def rebuild_counts(self) -> Dict[str, int]:
+        """
+        按现有数据重算类别/领域的元素数和标签使用次数（计数由触发器增量维护，此方法用于修复）
 
-    def _update_counts(self, domain_id: str, category_id: str):
-        """更新领域和类别的元素计数"""
+        Returns:
+            各表被修正的行数，如 {'categories': 0, 'domains': 2, 'tags': 0}
+        """
         cursor = self.conn.cursor()
+        fixed = {}
+        for table, column, key, source in (('categories', 'total_elements', 'category_id', 'elements'),
+                                           ('domains', 'total_elements', 'domain_id', 'elements'),
+                                           ('tags', 'usage_count', 'tag_id', 'element_tags')):
+            actual = f"(SELECT COUNT(*) FROM {source} s WHERE s.{key} = {table}.{key})"
+            cursor.execute(f"UPDATE {table} SET {column} = {actual} WHERE {column} IS NOT {actual}")
+            fixed[table] = cursor.rowcount
+        self.conn.commit()
 
-        # 更新category计数
-        cursor.execute("""
-            UPDATE categories
-            SET total_elements = (
-                SELECT COUNT(*) FROM elements WHERE category_id = ?
-            )
-            WHERE category_id = ?
-        """, (category_id, category_id))
-
-        # 更新domain计数
-        cursor.execute("""
-            UPDATE domains
-            SET total_elements = (
-                SELECT COUNT(*) FROM elements WHERE domain_id = ?
-            )
-            WHERE domain_id = ?
-        """, (domain_id, domain_id))
+        if any(fixed.values()):
+            logger.info("✅ 计数已重算: %s", fixed)
+        return fixed
+
+    def vacuum(self):
+        """整理数据库文件（VACUUM可能重新编号rowid，随后重建全文索引，并丢弃按rowid建立的标签索引）"""
+        vacuum(self.conn)
+        self._tag_index = None
 
     # ========== 查询方法 ==========
 
-    def search_by_tags(self, tags: List[str], require_all: bool = False) -> List[Dict]:
+    def tag_index(self) -> TagIndex:
+        """
+        标签倒排索引（首次使用时建立）
+
+        本连接写入过或其他连接提交过修改（total_changes / PRAGMA data_version 变化）时，下次使用前重建
+        """
+        version = (self.conn.execute("PRAGMA data_version").fetchone()[0], self.conn.total_changes)
+        if self._tag_index is None or version != self._tag_index_version:
+            self._tag_index = TagIndex(self.conn)
+            self._tag_index_version = version
+        return self._tag_index
+
+    def search_by_tags(self,
+                      tags: List[str],
+                      require_all: bool = False,
+                      exclude_tags: Optional[List[str]] = None,
+                      limit: Optional[int] = None) -> List[Dict]:
         """
-        按标签搜索元素
+        按标签搜索元素（在内存标签索引上求交/并/差，只为命中的元素查库）
 
         Args:
             tags: 标签列表
             require_all: 是否要求包含所有标签（AND逻辑），否则为OR逻辑
+            exclude_tags: 不能包含的标签（NOT逻辑）
+            limit: 只返回复用性评分最高的limit个
 
         Returns:
-            元素列表
+            元素列表，按复用性评分从高到低排序（无评分的在最后）
         """
-        cursor = self.conn.cursor()
+        if not tags:
+            return []
 
+        index = self.tag_index()
         if require_all:
-            # AND逻辑：必须包含所有标签
-            query = """
-                SELECT DISTINCT e.* FROM elements e
-                WHERE element_id IN (
-                    SELECT element_id FROM element_tags et
-                    JOIN tags t ON et.tag_id = t.tag_id
-                    WHERE t.tag_name IN ({})
-                    GROUP BY element_id
-                    HAVING COUNT(DISTINCT t.tag_name) = ?
-                )
-            """.format(','.join(['?' for _ in tags]))
-            cursor.execute(query, tags + [len(tags)])
+            rowids = index.query(all_of=tags, none_of=exclude_tags or (), limit=limit)
         else:
-            # OR逻辑：包含任意标签
-            query = """
-                SELECT DISTINCT e.* FROM elements e
-                JOIN element_tags et ON e.element_id = et.element_id
-                JOIN tags t ON et.tag_id = t.tag_id
-                WHERE t.tag_name IN ({})
-            """.format(','.join(['?' for _ in tags]))
-            cursor.execute(query, tags)
-
-        return [self._row_to_dict(row) for row in cursor.fetchall()]
+            rowids = index.query(any_of=tags, none_of=exclude_tags or (), limit=limit)
+        return self._elements_by_rowids(rowids)
+
+    def _elements_by_rowids(self, rowids: List[int], chunk_size: int = 500) -> List[Dict]:
+        """按rowid取元素（含标签），保持给定顺序"""
+        elements = {}
+        for start in range(0, len(rowids), chunk_size):
+            chunk = rowids[start:start + chunk_size]
+            cursor = self.conn.execute(f"""
+                SELECT e.rowid, e.*, {ELEMENT_TAGS_SQL} FROM elements e
+                WHERE e.rowid IN ({','.join('?' * len(chunk))})
+            """, chunk)
+            for row in cursor:
+                element = self._row_to_dict(row)
+                elements[element.pop('rowid')] = element
+        return [elements[rowid] for rowid in rowids]
 
     def search_by_domain(self,
                         domain_id: str,
@@ -462,16 +734,17 @@ class ElementDB:
 
         result = dict(row)
 
-        # 解析JSON字段
+        # 解析JSON字段（keywords按原始文本缓存解码结果）
         if result.get('keywords'):
-            result['keywords'] = json.loads(result['keywords'])
+            result['keywords'] = decode_keywords(result['keywords'], strict=True)
         if result.get('source_prompts'):
             result['source_prompts'] = json.loads(result['source_prompts'])
         if result.get('metadata'):
             result['metadata'] = json.loads(result['metadata'])
 
-        # 添加标签
-        result['tags'] = self.get_element_tags(result['element_id'])
+        # 添加标签（查询已用ELEMENT_TAGS_SQL带出时直接解码）
+        tags = result.pop('tags', None)
+        result['tags'] = json.loads(tags) if tags is not None else self.get_element_tags(result['element_id'])
 
         return result
 
@@ -570,9 +843,9 @@ class ElementDB:
                 for cat_row in cursor.fetchall():
                     category_id = cat_row['category_id']
 
-                    # 获取该类别的所有元素
-                    cursor.execute("""
-                        SELECT * FROM elements
+                    # 获取该类别的所有元素（连同标签）
+                    cursor.execute(f"""
+                        SELECT e.*, {ELEMENT_TAGS_SQL} FROM elements e
                         WHERE domain_id = ? AND category_id = ?
                     """, (domain_id, category_id))
 
@@ -585,17 +858,15 @@ class ElementDB:
                     if category_elements:
                         library["domains"][domain_id]["categories"][category_id] = category_elements
 
-            # 导出标签索引
-            cursor.execute("SELECT tag_name, tag_id FROM tags")
-            for tag_row in cursor.fetchall():
-                tag_name = tag_row['tag_name']
-                tag_id = tag_row['tag_id']
-
-                cursor.execute("""
-                    SELECT element_id FROM element_tags WHERE tag_id = ?
-                """, (tag_id,))
-
-                library["tag_index"][tag_name] = [row[0] for row in cursor.fetchall()]
+            # 导出标签索引（一次查询，每个标签的元素ID聚合成JSON数组）
+            cursor.execute("""
+                SELECT t.tag_name,
+                       (SELECT json_group_array(et.element_id) FROM element_tags et
+                        WHERE et.tag_id = t.tag_id)
+                FROM tags t
+            """)
+            for tag_name, element_ids in cursor.fetchall():
+                library["tag_index"][tag_name] = json.loads(element_ids)
 
             # 导出来源Prompts
             cursor.execute("SELECT * FROM source_prompts")
@@ -609,24 +880,116 @@ class ElementDB:
             with open(output_path, 'w', encoding='utf-8') as f:
                 json.dump(library, f, indent=2, ensure_ascii=False)
 
-            print(f"✅ 导出完成: {output_path}")
-            print(f"   - {library['library_metadata']['total_elements']} 个元素")
-            print(f"   - {library['library_metadata']['total_domains']} 个领域")
-            print(f"   - {len(library['tag_index'])} 个标签")
+            logger.info("✅ 导出完成: %s", output_path)
+            logger.info("   - %s 个元素", library['library_metadata']['total_elements'])
+            logger.info("   - %s 个领域", library['library_metadata']['total_domains'])
+            logger.info("   - %s 个标签", len(library['tag_index']))
 
             return True
 
         except Exception as e:
-            print(f"❌ 导出失败: {e}")
+            logger.error("❌ 导出失败: %s", e)
             return False
 
-    def import_from_json(self, json_path: str, clear_existing: bool = False) -> bool:
+    def iter_export_records(self) -> Iterator[Dict]:
+        """
+        逐条生成JSONL导出记录（游标逐行读取，内存占用与库大小无关）
+
+        记录依次为：
+            {"library_metadata": {...}}   首行，含格式版本和各项总数
+            {"domain": {...}}             领域
+            {"category": {...}}           类别
+            {"tag": {...}}                标签（按tag_id顺序）
+            {"element": {...}}            元素（按rowid顺序，含tags；JSON字段为列的原文，不解码）
+            {"source_prompt": {...}}      来源Prompt
+        """
+        cursor = self.conn.cursor()
+        counts = cursor.execute("""
+            SELECT (SELECT COUNT(*) FROM elements), (SELECT COUNT(*) FROM domains),
+                   (SELECT COUNT(*) FROM tags), (SELECT COUNT(*) FROM source_prompts)
+        """).fetchone()
+
+        yield {"library_metadata": {
+            "name": "Universal Elements Library",
+            "version": "1.0",
+            "architecture": "unified",
+            "format": "jsonl",
+            "format_version": JSONL_FORMAT_VERSION,
+            "exported_at": datetime.now().isoformat(),
+            "total_elements": counts[0],
+            "total_domains": counts[1],
+            "total_tags": counts[2],
+            "total_source_prompts": counts[3]
+        }}
+
+        for row in self.conn.execute(
+                "SELECT domain_id, name, description, created_at, updated_at FROM domains ORDER BY rowid"):
+            yield {"domain": dict(row)}
+
+        for row in self.conn.execute("SELECT category_id, domain_id, name, description FROM categories ORDER BY rowid"):
+            yield {"category": dict(row)}
+
+        for row in self.conn.execute("SELECT tag_name, tag_type, created_at FROM tags ORDER BY tag_id"):
+            yield {"tag": dict(row)}
+
+        for row in self.conn.execute(f"SELECT e.*, {ELEMENT_TAGS_SQL} FROM elements e ORDER BY e.rowid"):
+            element = dict(row)
+            element['tags'] = json.loads(element['tags'])
+            yield {"element": element}
+
+        for row in self.conn.execute("SELECT * FROM source_prompts ORDER BY prompt_id"):
+            yield {"source_prompt": dict(row)}
+
+    @staticmethod
+    def _open_library_file(path: Path, mode: str) -> IO[str]:
+        """打开JSONL文件（.gz 结尾时透明压缩/解压）"""
+        if path.suffix == '.gz':
+            return gzip.open(path, mode + 't', encoding='utf-8')
+        return open(path, mode, encoding='utf-8')
+
+    def export_to_jsonl(self, output_path: str) -> bool:
+        """
+        流式导出为JSONL（每行一条记录，见iter_export_records；路径以 .gz 结尾时gzip压缩）
+
+        Args:
+            output_path: 输出文件路径
+
+        Returns:
+            是否导出成功
+        """
+        try:
+            output_path = Path(output_path)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+
+            counts = Counter()
+            with self._open_library_file(output_path, 'w') as f:
+                for record in self.iter_export_records():
+                    f.write(json.dumps(record, ensure_ascii=False, default=str))
+                    f.write('\n')
+                    counts[next(iter(record))] += 1
+
+            logger.info("✅ 导出完成: %s", output_path)
+            logger.info("   - %s 个元素", counts['element'])
+            logger.info("   - %s 个领域", counts['domain'])
+            logger.info("   - %s 个标签", counts['tag'])
+            logger.info("   - %s 条来源Prompt", counts['source_prompt'])
+
+            return True
+
+        except Exception as e:
+            logger.error("❌ 导出失败: %s", e)
+            return False
+
+    def import_from_json(self, json_path: str, clear_existing: bool = False,
+                         bulk: bool = False, synchronous_off: bool = False) -> bool:
         """
         从JSON导入到数据库
 
         Args:
             json_path: JSON文件路径
             clear_existing: 是否清空现有数据
+            bulk: 使用bulk_add_elements在一个事务中批量导入（结果相同，大库快得多）
+            synchronous_off: 批量导入期间关闭同步写盘（见bulk_add_elements）
 
         Returns:
             是否导入成功
@@ -638,6 +1001,15 @@ class ElementDB:
             if clear_existing:
                 self._clear_all_data()
 
+            if bulk:
+                imported_count = self.bulk_add_elements(
+                    self._iter_library_elements(library),
+                    synchronous_off=synchronous_off,
+                    default_id=self._default_element_id
+                )
+                logger.info("✅ 导入完成: %s 个元素", imported_count)
+                return True
+
             imported_count = 0
 
             # 导入各领域的元素
@@ -660,13 +1032,150 @@ class ElementDB:
                         ):
                             imported_count += 1
 
-            print(f"✅ 导入完成: {imported_count} 个元素")
+            logger.info("✅ 导入完成: %s 个元素", imported_count)
             return True
 
         except Exception as e:
-            print(f"❌ 导入失败: {e}")
+            logger.error("❌ 导入失败: %s", e)
             return False
 
+    @staticmethod
+    def _default_element_id(element: Dict, imported: int) -> str:
+        """导入时元素缺少element_id的默认ID"""
+        return f"{element['domain_id']}_{element['category_id']}_{imported:03d}"
+
+    @staticmethod
+    def _library_element_fields(domain_id: str, category_id: str, element_name: str, element: Dict) -> Dict:
+        """导出的元素 → add_element参数字典（缺少element_id时不带该键）"""
+        fields = {
+            'domain_id': domain_id,
+            'category_id': category_id,
+            'name': element.get('name', element_name),
+            'chinese_name': element.get('chinese_name'),
+            'ai_prompt_template': element.get('ai_prompt_template', ''),
+            'keywords': element.get('keywords', []),
+            'tags': element.get('tags', []),
+            'reusability_score': element.get('reusability_score'),
+            'source_prompts': element.get('source_prompts', []),
+            'learned_from': element.get('learned_from', 'imported'),
+            'metadata': element.get('metadata'),
+        }
+        if 'element_id' in element:
+            fields['element_id'] = element['element_id']
+        return fields
+
+    @classmethod
+    def _iter_library_elements(cls, library: Dict) -> Iterable[Dict]:
+        """导出JSON中的元素 → add_element参数字典"""
+        for domain_id, domain_data in library.get("domains", {}).items():
+            for category_id, category_elements in domain_data.get("categories", {}).items():
+                for element_name, element in category_elements.items():
+                    yield cls._library_element_fields(domain_id, category_id, element_name, element)
+
+    def import_from_jsonl(self, jsonl_path: str, clear_existing: bool = False,
+                          synchronous_off: bool = False) -> bool:
+        """
+        从JSONL流式导入（export_to_jsonl的格式；逐行读取，经bulk_add_elements在一个事务中写入）
+
+        领域、类别、标签和来源Prompt已存在时保留原有记录；元素的处理与import_from_json相同
+
+        Args:
+            jsonl_path: JSONL文件路径（.gz 结尾时按gzip解压）
+            clear_existing: 是否清空现有数据
+            synchronous_off: 导入期间关闭同步写盘（见bulk_add_elements）
+
+        Returns:
+            是否导入成功
+        """
+        try:
+            if clear_existing:
+                self._clear_all_data()
+
+            with self._open_library_file(Path(jsonl_path), 'r') as f:
+                imported_count = self.bulk_add_elements(
+                    self._iter_jsonl_elements(f),
+                    synchronous_off=synchronous_off,
+                    default_id=self._default_element_id
+                )
+
+            logger.info("✅ 导入完成: %s 个元素", imported_count)
+            return True
+
+        except Exception as e:
+            logger.error("❌ 导入失败: %s", e)
+            return False
+
+    def _iter_jsonl_elements(self, lines: Iterable[str]) -> Iterator[Dict]:
+        """
+        JSONL记录 → add_element参数字典
+
+        其他记录在读到时直接写入（由bulk_add_elements在其事务内消费，随导入一起提交或回滚）。
+        格式版本2的元素JSON字段、置信度和时间戳原样写回（NULL仍为NULL）；
+        已存在但还没有元素的领域（初始化时预置的、或clear_existing清空后的）改用文件中的记录
+        """
+        cursor = self.conn.cursor()
+        lossless = False
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+
+            if 'element' in record:
+                element = record['element']
+                fields = self._library_element_fields(
+                    element.get('domain_id'), element.get('category_id'), element.get('name'), element
+                )
+                if lossless:
+                    fields.update({column: element.get(column)
+                                   for column in ELEMENT_JSON_COLUMNS + ELEMENT_RESTORED_COLUMNS},
+                                  raw_json=True)
+                yield fields
+            elif 'domain' in record:
+                domain = record['domain']
+                row = (domain['domain_id'], domain.get('name') or domain['domain_id'], domain.get('description'))
+                if lossless:
+                    cursor.execute("""
+                        INSERT INTO domains (domain_id, name, description, created_at, updated_at)
+                        VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+                        ON CONFLICT (domain_id) DO UPDATE SET
+                            name = excluded.name, description = excluded.description,
+                            created_at = excluded.created_at, updated_at = excluded.updated_at
+                        WHERE domains.total_elements = 0
+                    """, row + (domain.get('created_at'), domain.get('updated_at')))
+                else:
+                    cursor.execute("""
+                        INSERT OR IGNORE INTO domains (domain_id, name, description)
+                        VALUES (?, ?, ?)
+                    """, row)
+            elif 'category' in record:
+                category = record['category']
+                category_id = category['category_id']
+                cursor.execute("""
+                    INSERT OR IGNORE INTO categories (category_id, domain_id, name, description)
+                    VALUES (?, ?, ?, ?)
+                """, (category_id, category['domain_id'],
+                      category.get('name') or category_id.replace('_', ' ').title(), category.get('description')))
+            elif 'tag' in record:
+                tag = record['tag']
+                cursor.execute("""
+                    INSERT OR IGNORE INTO tags (tag_name, tag_type, created_at)
+                    VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                """, (tag['tag_name'], tag.get('tag_type'), tag.get('created_at')))
+            elif 'source_prompt' in record:
+                prompt = record['source_prompt']
+                columns = [column for column in SOURCE_PROMPT_COLUMNS if column in prompt]
+                cursor.execute(f"""
+                    INSERT OR IGNORE INTO source_prompts ({', '.join(columns)})
+                    VALUES ({', '.join('?' * len(columns))})
+                """, [prompt[column] for column in columns])
+            elif 'library_metadata' in record:
+                version = record['library_metadata'].get('format_version')
+                if version not in (1, JSONL_FORMAT_VERSION):
+                    raise ValueError(f"不支持的JSONL格式版本: {version}")
+                lossless = version >= 2
+            else:
+                logger.warning("⚠️  第%s行: 未知记录类型 %s", line_number, list(record)[:1])
+
     def _clear_all_data(self):
         """清空所有数据（保留表结构）"""
         cursor = self.conn.cursor()
@@ -683,8 +1192,65 @@ class ElementDB:
         self.conn.close()
 
 
+def test_jsonl_round_trip():
+    """在数据库副本上导出JSONL再导入新库，逐行比较（不修改原库）"""
+    import shutil
+    import tempfile
+
+    print("=" * 60)
+    print("测试JSONL导出/导入往返")
+    print("=" * 60)
+
+    tables = {
+        'elements': "SELECT * FROM elements ORDER BY rowid",
+        'domains': "SELECT * FROM domains ORDER BY domain_id",
+        'categories': "SELECT * FROM categories ORDER BY category_id",
+        'tags': "SELECT tag_name, tag_type, usage_count, created_at FROM tags ORDER BY tag_id",
+        'element_tags': """SELECT et.element_id, t.tag_name FROM element_tags et
+                           JOIN tags t ON t.tag_id = et.tag_id ORDER BY 1, 2""",
+        'source_prompts': "SELECT * FROM source_prompts ORDER BY prompt_id",
+    }
+
+    def dump(db):
+        return {name: [tuple(row) for row in db.conn.execute(sql)] for name, sql in tables.items()}
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        source = Path(tmp_dir) / 'source.db'
+        shutil.copy('extracted_results/elements.db', source)
+        db = ElementDB(str(source))
+        # 原库有元素引用了不存在的类别，导入时会自动创建；先在副本上补齐，再重算计数
+        rows = db.conn.execute("SELECT category_id, domain_id FROM elements ORDER BY rowid").fetchall()
+        db.conn.executemany(INSERT_CATEGORY_SQL, [db._category_row(*row) for row in rows])
+        db.conn.commit()
+        db.rebuild_counts()
+        expected = dump(db)
+
+        for suffix in ('.jsonl', '.jsonl.gz'):
+            path = Path(tmp_dir) / f'library{suffix}'
+            assert db.export_to_jsonl(str(path))
+            restored = ElementDB(str(Path(tmp_dir) / f'restored{suffix}.db'))
+            assert restored.import_from_jsonl(str(path))
+            actual = dump(restored)
+            for name in tables:
+                diff = [(a, b) for a, b in zip(expected[name], actual[name]) if a != b]
+                assert len(expected[name]) == len(actual[name]) and not diff, (name, diff[:2])
+            restored.close()
+            print(f"  ✅ {suffix}: {len(expected['elements'])} 个元素，各表逐行一致（含置信度、时间戳、NULL字段）")
+
+        db.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("\n✅ 测试完成")
+
+
 # ========== 使用示例 ==========
 if __name__ == "__main__":
+    if sys.argv[1:] == ['--test-jsonl']:
+        test_jsonl_round_trip()
+        sys.exit(0)
+
     # 创建数据库
     db = ElementDB('extracted_results/elements.db')
 
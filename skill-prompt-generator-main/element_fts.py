@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+元素全文索引 - elements表的FTS5外部内容索引
+风格搜索用 bm25 × 复用性评分 排序，类别排除在SQL内完成，不再全表 LIKE 扫描
+
+索引按elements的隐式rowid关联（element_id是TEXT主键，没有INTEGER PRIMARY KEY别名），
+VACUUM可能重新编号隐式rowid，之后索引指向错误的行。整理数据库请用 vacuum()，它会随即重建索引
+"""
+
+import re
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+
+FTS_TABLE = 'elements_fts'
+FTS_INSERT_TRIGGER = 'elements_fts_ai'
+
+# bm25列权重：name, chinese_name, ai_prompt_template, keywords
+BM25_WEIGHTS = (4.0, 2.0, 1.0, 2.0)
+
+# 与 core/schema_migration_v2_fts.sql 保持一致（rowid不稳定，VACUUM后需 rebuild_fts_index）
+FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    name, chinese_name, ai_prompt_template, keywords,
+    content='elements', content_rowid='rowid'
+);
+
+CREATE TRIGGER IF NOT EXISTS elements_fts_ai AFTER INSERT ON elements BEGIN
+    INSERT INTO {FTS_TABLE}(rowid, name, chinese_name, ai_prompt_template, keywords)
+    VALUES (new.rowid, new.name, new.chinese_name, new.ai_prompt_template, new.keywords);
+END;
+
+CREATE TRIGGER IF NOT EXISTS elements_fts_ad AFTER DELETE ON elements BEGIN
+    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, chinese_name, ai_prompt_template, keywords)
+    VALUES ('delete', old.rowid, old.name, old.chinese_name, old.ai_prompt_template, old.keywords);
+END;
+
+CREATE TRIGGER IF NOT EXISTS elements_fts_au
+AFTER UPDATE OF name, chinese_name, ai_prompt_template, keywords ON elements BEGIN
+    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, chinese_name, ai_prompt_template, keywords)
+    VALUES ('delete', old.rowid, old.name, old.chinese_name, old.ai_prompt_template, old.keywords);
+    INSERT INTO {FTS_TABLE}(rowid, name, chinese_name, ai_prompt_template, keywords)
+    VALUES (new.rowid, new.name, new.chinese_name, new.ai_prompt_template, new.keywords);
+END;
+"""
+
+# unicode61分词器把字母数字以外的字符（含下划线）都当作分隔符
+_TOKEN = re.compile(r'[^\W_]+')
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    """当前SQLite是否编译了FTS5"""
+    try:
+        return bool(conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0])
+    except sqlite3.Error:
+        return False
+
+
+def has_fts_index(conn: sqlite3.Connection) -> bool:
+    """数据库中是否已建立elements_fts"""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone()
+    return row is not None
+
+
+def ensure_fts_index(conn: sqlite3.Connection) -> bool:
+    """
+    创建全文索引和同步触发器（已存在时不做任何事）
+
+    Returns:
+        bool: 索引是否可用（SQLite不支持FTS5时为False）
+    """
+    if has_fts_index(conn):
+        return True
+    if not fts5_available(conn):
+        return False
+    conn.executescript(FTS_SCHEMA)
+    rebuild_fts_index(conn)
+    return True
+
+
+def rebuild_fts_index(conn: sqlite3.Connection):
+    """按elements表当前内容重建全文索引"""
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    conn.commit()
+
+
+def vacuum(conn: sqlite3.Connection):
+    """
+    VACUUM数据库并重建全文索引
+
+    VACUUM可能重新编号elements的隐式rowid，外部内容索引无法感知，必须按新rowid重建
+    """
+    conn.commit()
+    conn.execute("VACUUM")
+    if has_fts_index(conn):
+        rebuild_fts_index(conn)
+
+
+@contextmanager
+def deferred_insert_sync(conn: sqlite3.Connection):
+    """
+    批量插入elements期间暂停逐行同步，结束时一次性把新增的行写入全文索引
+
+    DROP TRIGGER 与插入同属一个事务（未在事务中时先开启），调用方出错回滚时触发器随之恢复
+    """
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (FTS_INSERT_TRIGGER,)
+    ).fetchone()
+    if row is None:
+        yield
+        return
+
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+    last_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM elements").fetchone()[0]
+    conn.execute(f"DROP TRIGGER {FTS_INSERT_TRIGGER}")
+    yield
+    conn.execute(f"""
+        INSERT INTO {FTS_TABLE}(rowid, name, chinese_name, ai_prompt_template, keywords)
+        SELECT rowid, name, chinese_name, ai_prompt_template, keywords
+        FROM elements WHERE rowid > ?
+    """, (last_rowid,))
+    conn.execute(row[0])
+
+
+def build_match_query(keywords: Iterable[str]) -> Optional[str]:
+    """
+    关键词列表 → FTS5 MATCH 表达式
+
+    每个关键词是一个短语，最后一个词做前缀匹配（'martial arts' → "martial arts"*），
+    关键词之间为 OR。没有可检索的词时返回None。
+    """
+    phrases = []
+    for kw in keywords:
+        tokens = _TOKEN.findall(kw or '')
+        if tokens:
+            phrase = '"' + ' '.join(tokens) + '"*'
+            if phrase not in phrases:
+                phrases.append(phrase)
+    return ' OR '.join(phrases) if phrases else None
+
+
+def search_elements(conn: sqlite3.Connection, keywords: Sequence[str],
+                    exclude_categories: Iterable[str] = (),
+                    limit: int = 30) -> List[Tuple]:
+    """
+    全文检索元素
+
+    排序：bm25（越小越相关，为负数）× (1 + reusability_score)，同分按rowid。
+    前缀匹配找不到词中间的子串（light 不匹配 highlight，CJK词中的片段也不匹配），
+    候选不足limit时用原来的模板 LIKE %关键词% 补足，排在全文检索结果之后。
+    返回列与IntelligentGenerator的元素查询一致。
+    """
+    excluded = sorted(set(exclude_categories))
+    rows: List[Tuple] = []
+    match = build_match_query(keywords)
+    if match is not None:
+        query = f"""
+            SELECT e.element_id, e.name, e.chinese_name, e.ai_prompt_template,
+                   e.keywords, e.reusability_score, e.category_id
+            FROM {FTS_TABLE} f
+            JOIN elements e ON e.rowid = f.rowid
+            WHERE {FTS_TABLE} MATCH ?
+              AND e.ai_prompt_template != ''
+        """
+        params: list = [match]
+        if excluded:
+            query += f" AND e.category_id NOT IN ({', '.join('?' for _ in excluded)})"
+            params.extend(excluded)
+        weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+        query += f"""
+            ORDER BY bm25({FTS_TABLE}, {weights}) * (1 + COALESCE(e.reusability_score, 0)), e.rowid
+            LIMIT ?
+        """
+        params.append(limit)
+        rows = conn.execute(query, params).fetchall()
+
+    if len(rows) < limit:
+        rows += _substring_matches(conn, keywords, excluded, [r[0] for r in rows], limit - len(rows))
+    return rows
+
+
+def _substring_matches(conn: sqlite3.Connection, keywords: Sequence[str], excluded: List[str],
+                       found: List[str], limit: int) -> List[Tuple]:
+    """模板 LIKE %关键词% 补充候选（跳过已找到的元素），按复用性评分排序"""
+    patterns = [f"%{kw}%" for kw in dict.fromkeys(kw for kw in keywords if kw)]
+    if not patterns:
+        return []
+    query = f"""
+        SELECT element_id, name, chinese_name, ai_prompt_template,
+               keywords, reusability_score, category_id
+        FROM elements
+        WHERE ({' OR '.join('ai_prompt_template LIKE ?' for _ in patterns)})
+          AND ai_prompt_template != ''
+    """
+    params: list = list(patterns)
+    for column, values in (('category_id', excluded), ('element_id', found)):
+        if values:
+            query += f" AND {column} NOT IN ({', '.join('?' for _ in values)})"
+            params.extend(values)
+    query += " ORDER BY reusability_score DESC, rowid LIMIT ?"
+    params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+def test_element_fts():
+    """在数据库副本上测试全文索引（不修改原库）"""
+    import os
+    import shutil
+    import tempfile
+    import time
+
+    print("=" * 80)
+    print("测试elements_fts全文索引")
+    print("=" * 80)
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'elements.db')
+    shutil.copy("extracted_results/elements.db", db_path)
+    conn = sqlite3.connect(db_path)
+
+    try:
+        # 测试1：建立索引
+        print("\n【测试1】建立索引")
+        start = time.perf_counter()
+        if not ensure_fts_index(conn):
+            print("  ⚠️ 当前SQLite不支持FTS5，跳过")
+            return
+        indexed = conn.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}").fetchone()[0]
+        print(f"  索引 {indexed} 个元素，用时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        # 测试2：检索与类别排除
+        print("\n【测试2】风格检索")
+        print(f"  MATCH: {build_match_query(['cinematic', 'martial arts', 'zhang_yimou'])}")
+        excluded = {'gender', 'age_range', 'ethnicity', 'skin_tones', 'eye_types',
+                    'hair_colors', 'hair_styles', 'face_shapes', 'nose_types', 'lip_types'}
+        for kws in (['cinematic'], ['dramatic', 'shadow', 'rim'], ['traditional', 'period drama']):
+            rows = search_elements(conn, kws, excluded, limit=5)
+            assert all(r[6] not in excluded for r in rows)
+            print(f"  {kws}: " + ', '.join(r[1] for r in rows))
+
+        # 前缀匹配不到的子串由 LIKE 补足，排在全文检索结果之后
+        light = search_elements(conn, ['light'], limit=1000)
+        prefix_hits = conn.execute(f"""
+            SELECT COUNT(*) FROM {FTS_TABLE} f JOIN elements e ON e.rowid = f.rowid
+            WHERE {FTS_TABLE} MATCH '"light"*' AND e.ai_prompt_template != ''
+        """).fetchone()[0]
+        like_hits = {r[0] for r in conn.execute(
+            "SELECT element_id FROM elements WHERE ai_prompt_template LIKE '%light%' AND ai_prompt_template != ''")}
+        assert len({r[0] for r in light}) == len(light) and like_hits <= {r[0] for r in light}
+        assert any('highlight' in r[3].lower() for r in light[prefix_hits:])
+        print(f"  ['light']: 全文 {prefix_hits} 个 + 子串补充 {len(light) - prefix_hits} 个（highlight等）")
+
+        # 测试3：触发器同步
+        print("\n【测试3】触发器同步")
+        conn.execute("""
+            INSERT INTO elements (element_id, domain_id, category_id, name, ai_prompt_template,
+                                  keywords, reusability_score)
+            VALUES ('fts_test_001', 'common', 'lighting', 'zzfts_glow', 'zzfts glow light', '["zzfts"]', 9.0)
+        """)
+        assert [r[0] for r in search_elements(conn, ['zzfts'])] == ['fts_test_001']
+        conn.execute("UPDATE elements SET ai_prompt_template = 'plain', name = 'plain', keywords = NULL "
+                     "WHERE element_id = 'fts_test_001'")
+        assert search_elements(conn, ['zzfts']) == []
+        conn.execute("DELETE FROM elements WHERE element_id = 'fts_test_001'")
+        assert all(r[0] != 'fts_test_001' for r in search_elements(conn, ['plain'], limit=1000))
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('integrity-check')")
+        print("  ✅ 插入/更新/删除后索引一致")
+
+        # 测试4：批量插入时延后同步
+        print("\n【测试4】延后同步")
+        conn.commit()
+        rows = [(f'fts_bulk_{i:03d}', 'common', 'lighting', f'zzbulk_{i}', 'zzbulk light', '[]', 5.0)
+                for i in range(200)]
+        insert = """
+            INSERT INTO elements (element_id, domain_id, category_id, name, ai_prompt_template,
+                                  keywords, reusability_score)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+        indexed = f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH 'zzbulk'"
+        with deferred_insert_sync(conn):
+            conn.executemany(insert, rows)
+            assert conn.execute(indexed).fetchone()[0] == 0
+        assert conn.execute(indexed).fetchone()[0] == len(rows)
+        conn.rollback()
+        assert conn.execute(indexed).fetchone()[0] == 0
+        triggers = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        assert FTS_INSERT_TRIGGER in triggers
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('integrity-check')")
+        print("  ✅ 结束时一次写入新行，回滚后触发器恢复")
+
+        # 测试5：VACUUM后重建索引
+        print("\n【测试5】VACUUM")
+        conn.execute("DELETE FROM elements WHERE rowid % 3 = 0")
+        expected = search_elements(conn, ['cinematic', 'dramatic'], limit=1000)
+        vacuum(conn)
+        assert search_elements(conn, ['cinematic', 'dramatic'], limit=1000) == expected
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('integrity-check', 1)")
+        print(f"  ✅ VACUUM后检索结果不变（{len(expected)} 个元素），索引与elements一致")
+    finally:
+        conn.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print("\n✅ 测试完成")
+
+
+if __name__ == '__main__':
+    test_element_fts()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+元素查询行 - 查询行到元素字典的转换，JSON列只解析一次
+keywords 等JSON文本按原始字符串缓存解码结果，同一元素被反复查询时不再重复 json.loads；
+元素仍是普通字典（各调用方按键读写），不另设记录类
+"""
+
+import json
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+
+_DECODE_CACHE_SIZE = 8192
+
+# 缓存中的特殊值：非法JSON
+_INVALID = object()
+
+
+@lru_cache(maxsize=_DECODE_CACHE_SIZE)
+def _keywords_tuple(raw: str):
+    """解码keywords JSON；字符串列表返回元组（可安全缓存），其他JSON返回None表示不缓存，
+    非法JSON返回_INVALID（同样被缓存，不会反复解析失败）"""
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        return _INVALID
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return tuple(value)
+    return None
+
+
+def decode_keywords(raw: Optional[str], strict: bool = False):
+    """
+    解码keywords列，每次返回新的列表（调用方可以放心修改）
+
+    Args:
+        raw: 数据库中的JSON文本
+        strict: 为True时非法JSON抛出异常，否则返回None
+
+    Returns:
+        关键词列表；raw为空或非法时为None
+    """
+    if not raw:
+        return None
+    cached = _keywords_tuple(raw)
+    if cached is _INVALID:
+        if strict:
+            json.loads(raw)  # 抛出原始的JSONDecodeError
+        return None
+    if cached is None:
+        return json.loads(raw)
+    return list(cached)
+
+
+@lru_cache(maxsize=_DECODE_CACHE_SIZE)
+def keywords_text(raw: str) -> str:
+    """keywords JSON文本 → 空格拼接的字符串；无法解析时原样返回（ElementSelector的匹配文本）"""
+    try:
+        return ' '.join(json.loads(raw))
+    except Exception:
+        return raw
+
+
+def element_from_row(row: Sequence) -> Dict:
+    """
+    查询行 → 元素字典（IntelligentGenerator 查询的7列）
+
+    Args:
+        row: (element_id, name, chinese_name, ai_prompt_template, keywords, reusability_score, category_id)
+
+    Returns:
+        元素字典；keywords 经缓存解码，每次都是新列表（调用方可以放心修改）
+    """
+    return {
+        'element_id': row[0],
+        'name': row[1],
+        'chinese_name': row[2],
+        'template': row[3],
+        'keywords': decode_keywords(row[4]),
+        'reusability': row[5],
+        'category': row[6]
+    }
+
+
+def rows_to_dicts(rows: Sequence[Sequence]) -> List[Dict]:
+    """批量把查询行转换为元素字典"""
+    return [element_from_row(row) for row in rows]
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量候选评分 - ElementSelector.calculate_match_score 的批量版本
+同一类别的候选只预处理一次（小写文本、质量分、"精致"标记），用户关键词的命中情况按关键词缓存，
+一次调用算出该字段全部候选的得分；安装了numpy时用向量运算合成得分
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from element_rows import keywords_text
+
+try:
+    import numpy as np
+except ImportError:  # numpy是可选依赖，缺失时用纯Python计算（结果相同）
+    np = None
+
+
+# 与 ElementSelector._check_semantic_consistency 中的规则一致
+BABY_FAT_KEYWORDS = ['plump', 'chubby', 'full', 'baby fat', 'rounded']
+REFINED_KEYWORDS = ['refined', 'delicate', 'classical', 'sculpted', 'elegant']
+
+MAX_CACHED_MATRICES = 64
+MAX_CACHED_KEYWORDS = 256
+
+_lock = threading.Lock()
+_matrix_cache: 'OrderedDict[Tuple, CandidateMatrix]' = OrderedDict()
+
+
+def _keywords_str(raw) -> str:
+    """元素keywords字段 → 匹配用文本（列表、JSON字符串或其他类型）"""
+    if isinstance(raw, list):
+        return ' '.join(raw)
+    if isinstance(raw, str):
+        return keywords_text(raw)
+    return str(raw)
+
+
+def _element_key(element: Dict) -> Tuple:
+    """评分只依赖这四个值，用作缓存键"""
+    return (
+        _keywords_str(element.get('keywords', '')),
+        element.get('ai_prompt_template', '') or '',
+        element.get('name', '') or '',
+        element.get('reusability_score', 0.0),
+    )
+
+
+class CandidateMatrix:
+    """一组候选元素的预处理结果
+
+    - kw_texts / tmpl_texts / name_texts: 小写后的匹配文本
+    - quality: 质量分（reusability>0 时为 reusability/10*30，否则为0）
+    - refined: 元素是否带"精致"类关键词（语义一致性规则1）
+    - 关键词命中表按小写关键词缓存：(关键词或模板命中的下标, 关键词/模板/名称任一命中的下标)
+    """
+
+    def __init__(self, keys: Sequence[Tuple]):
+        self.size = len(keys)
+        self.kw_texts = [k[0].lower() for k in keys]
+        self.tmpl_texts = [k[1].lower() for k in keys]
+        self.name_texts = [k[2].lower() for k in keys]
+
+        self.quality: List[float] = []
+        self.has_quality: List[bool] = []
+        for k in keys:
+            reusability = k[3]
+            positive = reusability > 0
+            self.has_quality.append(positive)
+            self.quality.append((reusability / 10.0) * 30 if positive else 0.0)
+
+        self.refined = [
+            any(kw in kwl or kw in tl for kw in REFINED_KEYWORDS)
+            for kwl, tl in zip(self.kw_texts, self.tmpl_texts)
+        ]
+
+        self._hits: 'OrderedDict[str, Tuple[Tuple[int, ...], Tuple[int, ...]]]' = OrderedDict()
+        self._hits_lock = threading.Lock()
+
+        if np is not None:
+            self.quality_vec = np.array(self.quality, dtype=np.float64)
+            self.has_quality_vec = np.array(self.has_quality, dtype=bool)
+            self.refined_vec = np.array(self.refined, dtype=bool)
+
+    def hits(self, kw_lower: str) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+        """关键词命中的候选下标：(关键词或模板命中, 关键词/模板/名称任一命中)"""
+        with self._hits_lock:
+            cached = self._hits.get(kw_lower)
+            if cached is not None:
+                self._hits.move_to_end(kw_lower)
+                return cached
+
+        kt, anywhere = [], []
+        for i in range(self.size):
+            if kw_lower in self.kw_texts[i] or kw_lower in self.tmpl_texts[i]:
+                kt.append(i)
+                anywhere.append(i)
+            elif kw_lower in self.name_texts[i]:
+                anywhere.append(i)
+        result = (tuple(kt), tuple(anywhere))
+
+        with self._hits_lock:
+            self._hits[kw_lower] = result
+            while len(self._hits) > MAX_CACHED_KEYWORDS:
+                self._hits.popitem(last=False)
+        return result
+
+
+def candidate_matrix(candidates: Sequence[Dict]) -> CandidateMatrix:
+    """取得（或构建并缓存）候选列表的预处理矩阵，按评分相关字段的值缓存"""
+    key = tuple(_element_key(e) for e in candidates)
+    with _lock:
+        matrix = _matrix_cache.get(key)
+        if matrix is not None:
+            _matrix_cache.move_to_end(key)
+            return matrix
+
+    matrix = CandidateMatrix(key)
+    with _lock:
+        _matrix_cache[key] = matrix
+        while len(_matrix_cache) > MAX_CACHED_MATRICES:
+            _matrix_cache.popitem(last=False)
+    return matrix
+
+
+def score_candidates(candidates: Sequence[Dict], user_keywords: List[str]) -> List[float]:
+    """
+    批量计算匹配度，结果与逐个调用 ElementSelector.calculate_match_score 完全相同
+
+    评分：关键词命中率×60 + reusability/10×30 + 语义一致性（婴儿肥vs精致 -20，完美匹配 +10），限制在0-100
+    """
+    if not candidates:
+        return []
+
+    matrix = candidate_matrix(candidates)
+    size = matrix.size
+    total = len(user_keywords)
+
+    wants_baby_fat = False
+    matched = [0] * size
+    kt_count = [0] * size
+    if user_keywords:
+        joined = ' '.join(user_keywords).lower()
+        wants_baby_fat = any(kw in joined for kw in BABY_FAT_KEYWORDS)
+
+        multiplicity: Dict[str, int] = {}
+        for kw in user_keywords:
+            kw_lower = kw.lower()
+            multiplicity[kw_lower] = multiplicity.get(kw_lower, 0) + 1
+        distinct = len(multiplicity)
+        for kw_lower, count in multiplicity.items():
+            kt, anywhere = matrix.hits(kw_lower)
+            for i in anywhere:
+                matched[i] += count
+            for i in kt:
+                kt_count[i] += 1
+
+    if np is not None:
+        score = np.zeros(size, dtype=np.float64)
+        if user_keywords:
+            score += (np.array(matched, dtype=np.int64) / total) * 60
+        score += np.where(matrix.has_quality_vec, matrix.quality_vec, 0.0)
+        penalty = np.zeros(size, dtype=np.float64)
+        if wants_baby_fat:
+            penalty -= np.where(matrix.refined_vec, 20.0, 0.0)
+        if user_keywords:
+            penalty += np.where(np.array(kt_count) == distinct, 10.0, 0.0)
+        score += penalty
+        return [max(0.0, min(100.0, s)) for s in score.tolist()]
+
+    scores = []
+    for i in range(size):
+        score = 0.0
+        if user_keywords:
+            score += (matched[i] / total) * 60
+        if matrix.has_quality[i]:
+            score += matrix.quality[i]
+        penalty = 0.0
+        if wants_baby_fat and matrix.refined[i]:
+            penalty -= 20
+        if user_keywords and kt_count[i] == distinct:
+            penalty += 10
+        score += penalty
+        scores.append(max(0.0, min(100.0, score)))
+    return scores
+
+
+def rank_candidates(candidates: Sequence[Dict], user_keywords: List[str],
+                    top_k: Optional[int] = None) -> List[Tuple[Dict, float]]:
+    """按得分降序返回 (元素, 得分)，同分保持候选原顺序"""
+    scores = score_candidates(candidates, user_keywords)
+    order = sorted(range(len(scores)), key=lambda i: -scores[i])
+    if top_k is not None:
+        order = order[:top_k]
+    return [(candidates[i], scores[i]) for i in order]
+
+
+def test_element_scorer():
+    """与逐个评分的结果逐条对照"""
+    import random
+    import time
+    from framework_loader import ElementSelector
+    from intelligent_generator import IntelligentGenerator
+
+    print("=" * 80)
+    print(f"测试批量评分（numpy: {'是' if np is not None else '否'}）")
+    print("=" * 80)
+
+    gen = IntelligentGenerator()
+    rows = gen.conn.execute(
+        "SELECT element_id, name, chinese_name, ai_prompt_template, keywords, reusability_score, "
+        "category_id FROM elements"
+    ).fetchall()
+    categories = sorted({r[6] for r in rows})
+
+    # 两种元素形态：生成器字典（template/reusability键）与原始行字典（ai_prompt_template/reusability_score键）
+    def raw_dict(r):
+        return {'element_id': r[0], 'name': r[1], 'chinese_name': r[2], 'ai_prompt_template': r[3],
+                'keywords': r[4], 'reusability_score': r[5] or 0.0, 'category': r[6]}
+
+    rng = random.Random(0)
+    vocab = ['round', 'plump', 'full', 'soft', 'light', 'black', 'eye', 'hair', 'refined', 'smile',
+             'Cinematic', 'warm', 'almond', 'long', 'Soft', 'baby fat', 'x', '']
+    checked = 0
+    for category in categories:
+        generated = gen.get_all_elements_by_category(
+            gen.conn.execute("SELECT domain_id FROM elements WHERE category_id = ?",
+                             (category,)).fetchone()[0], category)
+        raw = [raw_dict(r) for r in rows if r[6] == category]
+        for candidates in (generated, raw):
+            for _ in range(6):
+                kws = rng.sample(vocab, rng.randint(0, 4))
+                expected = [ElementSelector.calculate_match_score(e, kws, {}) for e in candidates]
+                assert score_candidates(candidates, kws) == expected, (category, kws)
+                checked += 1
+    print(f"\n【测试1】{checked} 组候选/关键词评分一致")
+
+    candidates = [raw_dict(r) for r in rows if r[6] == 'lighting_techniques']
+    kws = ['dramatic', 'soft', 'rim']
+    start = time.perf_counter()
+    for _ in range(200):
+        [ElementSelector.calculate_match_score(e, kws, {}) for e in candidates]
+    slow = (time.perf_counter() - start) / 200 * 1000
+    start = time.perf_counter()
+    for _ in range(200):
+        score_candidates(candidates, kws)
+    fast = (time.perf_counter() - start) / 200 * 1000
+    print(f"【测试2】{len(candidates)} 个候选: 逐个 {slow:.2f}ms → 批量 {fast:.2f}ms")
+
+    top = rank_candidates(candidates, kws, top_k=3)
+    print("【测试3】Top3: " + ', '.join(f"{e['name']}({s:.1f})" for e, s in top))
+
+    gen.close()
+    print("\n✅ 测试完成")
+
+
+if __name__ == '__main__':
+    test_element_scorer()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标签倒排索引 - 标签 → 元素集合，标签组合查询（AND/OR/NOT）在内存中完成
+元素按 reusability_score DESC（NULL最后、同分按rowid升序）编号，集合里的编号越小排名越靠前，
+取前k个只需取最小的k个编号
+
+每个标签的元素集合按密度选择表示：
+- 稀疏：升序编号数组（array），每个关联4字节
+- 稠密（至少 1/DENSE_RATIO 的元素带该标签）：Python int 位图，交并差由C实现的整数位运算完成
+"""
+
+import re
+import sqlite3
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# 元素数 ≤ 关联数 × DENSE_RATIO 时用位图（此时位图不比编号数组大）
+DENSE_RATIO = 32
+
+# 稀疏集合比另一方小这么多倍时逐个二分查找，否则用集合运算
+BISECT_RATIO = 16
+
+Posting = Union[array, int]
+
+# 位图解码：跳过全零字节，每个字节查表得到其中的位
+_NONZERO_BYTES = re.compile(rb'[^\x00]+')
+_BYTE_BITS = [tuple(i for i in range(8) if byte >> i & 1) for byte in range(256)]
+
+
+def _is_dense(posting) -> bool:
+    return isinstance(posting, int)
+
+
+class TagIndex:
+    """element_tags 的只读内存索引
+
+    数据库被修改后需调用 reload()（ElementDB.tag_index() 会自动检测并重建）
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.reload(conn)
+
+    def reload(self, conn: sqlite3.Connection):
+        """从数据库重新加载元素评分和标签关联"""
+        elements = conn.execute("SELECT rowid, reusability_score FROM elements").fetchall()
+        links = conn.execute("""
+            SELECT t.tag_name, e.rowid FROM element_tags et
+            JOIN tags t ON t.tag_id = et.tag_id
+            JOIN elements e ON e.element_id = et.element_id
+        """).fetchall()
+        self._build(elements, links)
+
+    @classmethod
+    def from_rows(cls, elements: Iterable[Tuple[int, Optional[float]]],
+                  links: Iterable[Tuple[str, int]]) -> 'TagIndex':
+        """由 (rowid, reusability_score) 和 (tag_name, rowid) 直接建立索引"""
+        index = cls.__new__(cls)
+        index._build(elements, links)
+        return index
+
+    def _build(self, elements: Iterable[Tuple[int, Optional[float]]], links: Iterable[Tuple[str, int]]):
+        ranked = sorted(elements, key=lambda r: (r[1] is None, -(r[1] or 0.0), r[0]))
+        self.rowids = array('q', [r[0] for r in ranked])       # 编号 → rowid
+        rank_of = {rowid: rank for rank, rowid in enumerate(self.rowids)}
+        self.size = len(self.rowids)
+        self._nbytes = (self.size + 7) // 8
+
+        grouped: Dict[str, List[int]] = {}
+        for tag_name, rowid in links:
+            rank = rank_of.get(rowid)
+            if rank is not None:
+                grouped.setdefault(tag_name, []).append(rank)
+
+        self.postings: Dict[str, Posting] = {}
+        self.counts: Dict[str, int] = {}
+        for tag_name, ranks in grouped.items():
+            ranks = sorted(set(ranks))
+            self.counts[tag_name] = len(ranks)
+            if len(ranks) * DENSE_RATIO >= self.size:
+                self.postings[tag_name] = self._to_bitmap(ranks)
+            else:
+                self.postings[tag_name] = array('i', ranks)
+
+    def __len__(self):
+        return self.size
+
+    # ========== 集合运算（稀疏为升序编号序列，稠密为int位图） ==========
+
+    def _to_bitmap(self, ranks: Iterable[int]) -> int:
+        bits = bytearray(self._nbytes)
+        for r in ranks:
+            bits[r >> 3] |= 1 << (r & 7)
+        return int.from_bytes(bits, 'little')
+
+    def _member_test(self, posting: Posting):
+        """posting的成员判断函数"""
+        if _is_dense(posting):
+            bits = posting.to_bytes(self._nbytes, 'little')
+            return lambda r: bits[r >> 3] >> (r & 7) & 1
+        size = len(posting)
+
+        def contains(r):
+            i = bisect_left(posting, r)
+            return i < size and posting[i] == r
+        return contains
+
+    def _intersect(self, a: Posting, b: Posting) -> Posting:
+        if _is_dense(a) and _is_dense(b):
+            return a & b
+        if _is_dense(a):
+            a, b = b, a
+        if not _is_dense(b) and len(b) < len(a) * BISECT_RATIO:
+            return array('i', sorted(set(a).intersection(b)))
+        contains = self._member_test(b)
+        return array('i', [r for r in a if contains(r)])
+
+    def _union(self, a: Posting, b: Posting) -> Posting:
+        if not _is_dense(a) and not _is_dense(b):
+            return array('i', sorted(set(a).union(b)))
+        if not _is_dense(a):
+            a = self._to_bitmap(a)
+        if not _is_dense(b):
+            b = self._to_bitmap(b)
+        return a | b
+
+    def _difference(self, a: Posting, b: Posting) -> Posting:
+        if _is_dense(a):
+            return a & ~(b if _is_dense(b) else self._to_bitmap(b))
+        if not _is_dense(b) and len(b) < len(a) * BISECT_RATIO:
+            return array('i', sorted(set(a).difference(b)))
+        contains = self._member_test(b)
+        return array('i', [r for r in a if not contains(r)])
+
+    @staticmethod
+    def _count(posting: Posting) -> int:
+        return bin(posting).count('1') if _is_dense(posting) else len(posting)
+
+    def _first_ranks(self, posting: Posting, limit: Optional[int]) -> List[int]:
+        """posting中最小的limit个编号（升序）"""
+        if not _is_dense(posting):
+            return list(posting[:limit] if limit is not None else posting)
+        ranks = []
+        bits = posting.to_bytes(self._nbytes, 'little')
+        for run in _NONZERO_BYTES.finditer(bits):
+            for i in range(run.start(), run.end()):
+                base = i << 3
+                ranks.extend([base + bit for bit in _BYTE_BITS[bits[i]]])
+            if limit is not None and len(ranks) >= limit:
+                return ranks[:limit]
+        return ranks
+
+    # ========== 查询 ==========
+
+    def _evaluate(self, all_of: Sequence[str], any_of: Sequence[str], none_of: Sequence[str]) -> Posting:
+        empty = array('i')
+        result: Optional[Posting] = None   # None 表示全部元素
+
+        # AND：从最小的集合开始逐个求交
+        if all_of:
+            tags = list(dict.fromkeys(all_of))
+            if any(tag not in self.postings for tag in tags):
+                return empty
+            postings = [self.postings[tag] for tag in sorted(tags, key=self.counts.__getitem__)]
+            result = postings[0]
+            for posting in postings[1:]:
+                if not result:
+                    return empty
+                result = self._intersect(result, posting)
+
+        # OR
+        if any_of:
+            union: Posting = empty
+            for tag in dict.fromkeys(any_of):
+                posting = self.postings.get(tag)
+                if posting is not None:
+                    union = self._union(union, posting)
+            result = union if result is None else self._intersect(result, union)
+
+        if result is None:
+            result = (1 << self.size) - 1
+
+        # NOT
+        for tag in dict.fromkeys(none_of):
+            posting = self.postings.get(tag)
+            if posting is not None and result:
+                result = self._difference(result, posting)
+        return result
+
+    def query(self, all_of: Sequence[str] = (), any_of: Sequence[str] = (),
+              none_of: Sequence[str] = (), limit: Optional[int] = None) -> List[int]:
+        """
+        标签组合查询
+
+        Args:
+            all_of: 必须全部带有的标签（AND）
+            any_of: 至少带有其一的标签（OR；为空时不限制）
+            none_of: 不能带有的标签（NOT）
+            limit: 只返回前limit个
+
+        Returns:
+            元素rowid列表，按 reusability_score DESC 排序（NULL最后、同分按rowid升序）
+        """
+        result = self._evaluate(all_of, any_of, none_of)
+        return [self.rowids[r] for r in self._first_ranks(result, limit)]
+
+    def count(self, all_of: Sequence[str] = (), any_of: Sequence[str] = (),
+              none_of: Sequence[str] = ()) -> int:
+        """query(...) 的结果数"""
+        return self._count(self._evaluate(all_of, any_of, none_of))
+
+
+def test_tag_index():
+    """对照SQL验证结果与顺序，并在合成的100万关联上测查询耗时"""
+    import random
+    import time
+    from itertools import accumulate
+
+    print("=" * 80)
+    print("测试TagIndex（与SQL对照）")
+    print("=" * 80)
+
+    conn = sqlite3.connect("file:extracted_results/elements.db?mode=ro", uri=True)
+    start = time.perf_counter()
+    index = TagIndex(conn)
+    dense = sum(_is_dense(p) for p in index.postings.values())
+    print(f"\n加载 {len(index)} 个元素、{len(index.postings)} 个标签（位图 {dense} 个），"
+          f"用时 {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    # 测试1：随机组合与SQL对照（含排序）
+    rng = random.Random(0)
+    tags = sorted(index.postings, key=lambda t: -index.counts[t])
+    popular, rest = tags[:30], tags[30:]
+
+    def sql_query(all_of, any_of, none_of, limit):
+        where, params = [], []
+        for tag in all_of:
+            where.append("EXISTS (SELECT 1 FROM element_tags et JOIN tags t ON t.tag_id = et.tag_id "
+                         "WHERE et.element_id = e.element_id AND t.tag_name = ?)")
+            params.append(tag)
+        if any_of:
+            where.append("EXISTS (SELECT 1 FROM element_tags et JOIN tags t ON t.tag_id = et.tag_id "
+                         f"WHERE et.element_id = e.element_id AND t.tag_name IN ({','.join('?' * len(any_of))}))")
+            params += list(any_of)
+        for tag in none_of:
+            where.append("NOT EXISTS (SELECT 1 FROM element_tags et JOIN tags t ON t.tag_id = et.tag_id "
+                         "WHERE et.element_id = e.element_id AND t.tag_name = ?)")
+            params.append(tag)
+        sql = ("SELECT e.rowid FROM elements e" + (" WHERE " + " AND ".join(where) if where else "")
+               + " ORDER BY e.reusability_score DESC, e.rowid")
+        if limit is not None:
+            sql += f" LIMIT {limit}"
+        return [r[0] for r in conn.execute(sql, params)]
+
+    checked = 0
+    for _ in range(400):
+        pick = lambda k: [rng.choice(popular if rng.random() < 0.7 else rest) for _ in range(k)]
+        all_of, any_of, none_of = pick(rng.randint(0, 2)), pick(rng.randint(0, 3)), pick(rng.randint(0, 2))
+        if rng.random() < 0.05:
+            all_of.append('no_such_tag')
+        limit = rng.choice([None, 1, 5, 20, 100])
+        expected = sql_query(all_of, any_of, none_of, limit)
+        assert index.query(all_of, any_of, none_of, limit) == expected, (all_of, any_of, none_of, limit)
+        if limit is None:
+            assert index.count(all_of, any_of, none_of) == len(expected)
+        checked += 1
+    print(f"\n【测试1】AND/OR/NOT 组合: {checked} 组对照一致")
+    conn.close()
+
+    # 测试2：合成的100万关联（20万元素、2万标签，标签频次呈长尾分布）
+    print("\n【测试2】100万关联")
+    n_elements, n_tags = 200_000, 20_000
+    elements = [(i + 1, rng.choice([None] + [x / 2 for x in range(21)])) for i in range(n_elements)]
+    cum_weights = list(accumulate(1.0 / (k + 1) for k in range(n_tags)))
+    tag_names = [f"t{k}" for k in range(n_tags)]
+    links = set()
+    for rowid, _ in elements:
+        for tag in rng.choices(tag_names, cum_weights=cum_weights, k=5):
+            links.add((tag, rowid))
+    start = time.perf_counter()
+    big = TagIndex.from_rows(elements, links)
+    dense = sum(_is_dense(p) for p in big.postings.values())
+    print(f"  {len(links)} 个关联，建索引 {(time.perf_counter() - start) * 1000:.0f}ms（位图 {dense} 个）")
+
+    queries = [
+        ("AND 热门×热门", dict(all_of=['t0', 't1'], limit=20)),
+        ("AND 热门×冷门", dict(all_of=['t0', 't500'], limit=20)),
+        ("AND 三个标签", dict(all_of=['t0', 't1', 't2'], limit=20)),
+        ("OR 热门", dict(any_of=['t0', 't3', 't7'], limit=20)),
+        ("OR 冷门", dict(any_of=['t900', 't1500', 't4000'], limit=20)),
+        ("AND+NOT", dict(all_of=['t1'], none_of=['t0', 't2'], limit=20)),
+        ("AND 冷门×冷门", dict(all_of=['t300', 't301'])),
+    ]
+    for label, kwargs in queries:
+        rounds = 200
+        start = time.perf_counter()
+        for _ in range(rounds):
+            found = big.query(**kwargs)
+        ms = (time.perf_counter() - start) / rounds * 1000
+        print(f"  {label:<14} {ms:.3f}ms  ({len(found)} 个)")
+
+    print("\n✅ 测试完成")
+
+
+if __name__ == '__main__':
+    test_tag_index()
@@ -9,6 +9,13 @@ import yaml
 import os
 from typing import Dict, List, Optional, Any
 
+from element_rows import keywords_text
+from element_scorer import rank_candidates, score_candidates
+import gen_metrics
+from gen_logging import get_logger
+
+logger = get_logger('framework_loader')
+
 
 class FrameworkLoader:
     """框架加载器"""
@@ -30,9 +37,9 @@ class FrameworkLoader:
         with open(framework_path, 'r', encoding='utf-8') as f:
             framework = yaml.safe_load(f)
 
-        print(f"✓ 加载框架: {framework['description']}")
-        print(f"  版本: {framework['framework_version']}")
-        print(f"  类别数: {len(framework['categories'])}")
+        logger.info("✓ 加载框架: %s", framework['description'])
+        logger.info("  版本: %s", framework['framework_version'])
+        logger.info("  类别数: %s", len(framework['categories']))
 
         return framework
 
@@ -105,7 +112,7 @@ class FrameworkLoader:
 
                 # 如果条件满足，应用then规则
                 if conditions_met and 'then' in rule:
-                    print(f"✓ 应用依赖规则: {rule.get('name', '未命名')}")
+                    logger.info("✓ 应用依赖规则: %s", rule.get('name', '未命名'))
 
                     for then_field, then_value in rule['then'].items():
                         category, field = then_field.split('.')
@@ -114,7 +121,7 @@ class FrameworkLoader:
                             updated_intent[category] = {}
 
                         updated_intent[category][field] = then_value
-                        print(f"  → 设置 {then_field} = {then_value}")
+                        logger.info("  → 设置 %s = %s", then_field, then_value)
 
         return updated_intent
 
@@ -175,20 +182,24 @@ class FrameworkDrivenGenerator:
     """框架驱动的生成器"""
 
     def __init__(self, db_path: str = "extracted_results/elements.db",
-                 framework_path: str = "prompt_framework.yaml"):
+                 framework_path: str = "prompt_framework.yaml",
+                 provider=None,
+                 use_catalog: bool = False):
         """
         初始化
 
         参数:
             db_path: 数据库路径
             framework_path: 框架配置文件路径
+            provider: 共享的ConnectionProvider（可选）
+            use_catalog: 元素查询走内存目录（每次生成有几十次查询时更快）
         """
         # 加载框架
         self.framework = FrameworkLoader.load(framework_path)
 
         # 加载IntelligentGenerator（用于数据库查询）
         from intelligent_generator import IntelligentGenerator
-        self.generator = IntelligentGenerator(db_path)
+        self.generator = IntelligentGenerator(db_path, provider=provider, use_catalog=use_catalog)
 
     def generate_by_framework(self, intent: Dict) -> Dict:
         """
@@ -206,70 +217,82 @@ class FrameworkDrivenGenerator:
                 'fixes': 修正说明
             }
         """
-        print("\n" + "="*80)
-        print("框架驱动生成")
-        print("="*80)
+        with gen_metrics.generation('framework'), gen_metrics.span('total'):
+            return self._generate_by_framework(intent)
+
+    def _generate_by_framework(self, intent: Dict) -> Dict:
+        """generate_by_framework 的各个步骤（每步单独计时）"""
+        logger.info("\n" + "="*80)
+        logger.info("框架驱动生成")
+        logger.info("="*80)
 
         # 步骤1：应用依赖规则，补全intent
-        print("\n📋 步骤1：应用框架依赖规则")
-        print("-"*80)
+        logger.info("\n📋 步骤1：应用框架依赖规则")
+        logger.info("-"*80)
 
-        complete_intent = FrameworkLoader.apply_dependencies(intent, self.framework)
+        with gen_metrics.span('apply_dependencies'):
+            complete_intent = FrameworkLoader.apply_dependencies(intent, self.framework)
 
         # 步骤2：验证intent
-        print("\n✓ 步骤2：验证Intent")
-        print("-"*80)
+        logger.info("\n✓ 步骤2：验证Intent")
+        logger.info("-"*80)
 
-        validation_issues = FrameworkLoader.validate_intent(complete_intent, self.framework)
+        with gen_metrics.span('validate_intent'):
+            validation_issues = FrameworkLoader.validate_intent(complete_intent, self.framework)
 
         if validation_issues:
-            print(f"⚠️ 发现 {len(validation_issues)} 个验证问题:")
+            logger.warning("⚠️ 发现 %s 个验证问题:", len(validation_issues))
             for issue in validation_issues:
-                print(f"  - [{issue['severity']}] {issue['message']}")
+                logger.info("  - [%s] %s", issue['severity'], issue['message'])
         else:
-            print("✓ Intent验证通过")
+            logger.info("✓ Intent验证通过")
 
         # 步骤3：根据框架查询数据库
-        print("\n🔍 步骤3：根据框架查询数据库")
-        print("-"*80)
+        logger.info("\n🔍 步骤3：根据框架查询数据库")
+        logger.info("-"*80)
 
-        elements = self.query_by_framework(complete_intent)
+        with gen_metrics.span('query_by_framework'):
+            elements = self.query_by_framework(complete_intent)
 
-        print(f"✓ 查询到 {len(elements)} 个元素")
+        logger.info("✓ 查询到 %s 个元素", len(elements))
 
         # 步骤4：一致性检查
-        print("\n✓ 步骤4：一致性检查")
-        print("-"*80)
+        logger.info("\n✓ 步骤4：一致性检查")
+        logger.info("-"*80)
 
-        consistency_issues = self.generator.check_consistency(elements)
+        with gen_metrics.span('check_consistency'):
+            consistency_issues = self.generator.check_consistency(elements)
 
         fixes_applied = []
         if consistency_issues:
-            print(f"⚠️ 发现 {len(consistency_issues)} 个一致性问题")
-            elements, fixes_applied = self.generator.resolve_conflicts(elements, consistency_issues)
+            logger.warning("⚠️ 发现 %s 个一致性问题", len(consistency_issues))
+            with gen_metrics.span('resolve_conflicts'):
+                elements, fixes_applied = self.generator.resolve_conflicts(elements, consistency_issues)
             for fix in fixes_applied:
-                print(f"  {fix}")
+                logger.info("  %s", fix)
         else:
-            print("✓ 没有发现一致性问题")
+            logger.info("✓ 没有发现一致性问题")
 
         # 步骤5：生成提示词
-        print("\n✨ 步骤5：生成最终提示词")
-        print("-"*80)
+        logger.info("\n✨ 步骤5：生成最终提示词")
+        logger.info("-"*80)
 
-        prompt = self.generator.compose_prompt(elements, mode='auto', keywords_limit=3)
+        with gen_metrics.span('compose_prompt'):
+            prompt = self.generator.compose_prompt(elements, mode='auto', keywords_limit=3)
 
         # 步骤6：完整性检查
-        print("\n🎯 步骤6：完整性检查")
-        print("-"*80)
+        logger.info("\n🎯 步骤6：完整性检查")
+        logger.info("-"*80)
 
-        completeness_issues = self.generator.check_completeness(complete_intent, prompt)
+        with gen_metrics.span('check_completeness'):
+            completeness_issues = self.generator.check_completeness(complete_intent, prompt)
 
         if completeness_issues:
-            print(f"⚠️ 发现 {len(completeness_issues)} 个缺失的需求:")
+            logger.warning("⚠️ 发现 %s 个缺失的需求:", len(completeness_issues))
             for item in completeness_issues:
-                print(f"  - {item['description']}")
+                logger.info("  - %s", item['description'])
         else:
-            print("✓ 提示词满足所有用户要求")
+            logger.info("✓ 提示词满足所有用户要求")
 
         return {
             'intent': complete_intent,
@@ -321,7 +344,7 @@ class FrameworkDrivenGenerator:
 
                     if all_elements:
                         candidates[field_key] = all_elements
-                        print(f"✓ {field_key}: 查询到 {len(all_elements)} 个候选元素")
+                        logger.info("✓ %s: 查询到 %s 个候选元素", field_key, len(all_elements))
 
         # 查询subject相关的候选
         subject = intent.get('subject', {})
@@ -331,13 +354,13 @@ class FrameworkDrivenGenerator:
             eye_candidates = self.generator.get_all_elements_by_category('portrait', 'eye_types')
             if eye_candidates:
                 candidates['facial.eyes'] = eye_candidates
-                print(f"✓ facial.eyes: 查询到 {len(eye_candidates)} 个候选元素")
+                logger.info("✓ facial.eyes: 查询到 %s 个候选元素", len(eye_candidates))
 
             # 发色候选
             hair_candidates = self.generator.get_all_elements_by_category('portrait', 'hair_colors')
             if hair_candidates:
                 candidates['styling.hair_color'] = hair_candidates
-                print(f"✓ styling.hair_color: 查询到 {len(hair_candidates)} 个候选元素")
+                logger.info("✓ styling.hair_color: 查询到 %s 个候选元素", len(hair_candidates))
 
         return candidates
 
@@ -417,12 +440,12 @@ class FrameworkDrivenGenerator:
                     for kw in keywords:
                         elem = self.generator.get_element_by_category('portrait', db_category, kw)
                         if elem:
-                            print(f"✓ {category_name}.{field_name} = '{field_value}' → 找到: '{elem['chinese_name']}'（关键词: {kw}）")
+                            logger.info("✓ %s.%s = '%s' → 找到: '%s'（关键词: %s）", category_name, field_name, field_value, elem['chinese_name'], kw)
                             elements.append(elem)
                             break
 
                     if not elem:
-                        print(f"⚠️ {category_name}.{field_name} = '{field_value}' → 未找到元素")
+                        logger.warning("⚠️ %s.%s = '%s' → 未找到元素", category_name, field_name, field_value)
 
         # 3. 处理其他固定类别
         for attr in ['skin_tones', 'skin_textures', 'face_shapes', 'expressions', 'poses']:
@@ -512,12 +535,7 @@ class ElementSelector:
         if isinstance(elem_keywords_raw, list):
             elem_keywords_str = ' '.join(elem_keywords_raw)
         elif isinstance(elem_keywords_raw, str):
-            try:
-                import json
-                keywords_list = json.loads(elem_keywords_raw)
-                elem_keywords_str = ' '.join(keywords_list)
-            except:
-                elem_keywords_str = elem_keywords_raw
+            elem_keywords_str = keywords_text(elem_keywords_raw)
         else:
             elem_keywords_str = str(elem_keywords_raw)
 
@@ -577,12 +595,7 @@ class ElementSelector:
         if isinstance(elem_keywords_raw, list):
             elem_keywords_str = ' '.join(elem_keywords_raw)
         elif isinstance(elem_keywords_raw, str):
-            try:
-                import json
-                keywords_list = json.loads(elem_keywords_raw)
-                elem_keywords_str = ' '.join(keywords_list)
-            except:
-                elem_keywords_str = elem_keywords_raw
+            elem_keywords_str = keywords_text(elem_keywords_raw)
         else:
             elem_keywords_str = str(elem_keywords_raw)
 
@@ -644,26 +657,21 @@ class ElementSelector:
         best_score = 0.0
 
         if debug:
-            print(f"\n{'='*80}")
-            print(f"🎯 全局最优选择：{field_name}")
-            print(f"{'='*80}")
-            print(f"候选数量：{len(candidates)}")
-            print(f"用户关键词：{user_keywords}")
-            print()
-
-        # 遍历所有候选，计算每个的匹配度
-        scores = []
-        for i, elem in enumerate(candidates):
-            score = ElementSelector.calculate_match_score(
-                elem, user_keywords, user_intent, field_name
-            )
-            scores.append((elem, score))
-
+            logger.info("\n" + "="*80)
+            logger.info("🎯 全局最优选择：%s", field_name)
+            logger.info("="*80)
+            logger.info("候选数量：%s", len(candidates))
+            logger.info("用户关键词：%s", user_keywords)
+            logger.info("")
+
+        # 一次算出所有候选的匹配度（与逐个calculate_match_score结果相同）
+        scores = ElementSelector.score_candidates(candidates, user_keywords)
+        for i, (elem, score) in enumerate(zip(candidates, scores)):
             if debug:
-                print(f"{i+1}. {elem.get('chinese_name', elem.get('name'))}")
-                print(f"   得分：{score:.1f}")
-                print(f"   关键词：{elem.get('keywords', 'N/A')[:60]}...")
-                print()
+                logger.info("%s. %s", i+1, elem.get('chinese_name', elem.get('name')))
+                logger.info("   得分：%.1f", score)
+                logger.info("   关键词：%s...", elem.get('keywords', 'N/A')[:60])
+                logger.info("")
 
             # 更新最佳
             if score > best_score:
@@ -671,12 +679,31 @@ class ElementSelector:
                 best_element = elem
 
         if debug and best_element:
-            print(f"✅ 最佳选择：{best_element.get('chinese_name', best_element.get('name'))}")
-            print(f"   得分：{best_score:.1f}")
-            print(f"{'='*80}\n")
+            logger.info("✅ 最佳选择：%s", best_element.get('chinese_name', best_element.get('name')))
+            logger.info("   得分：%.1f", best_score)
+            logger.info("="*80 + "\n")
 
         return best_element, best_score
 
+    @staticmethod
+    def score_candidates(candidates: List[Dict], user_keywords: List[str]) -> List[float]:
+        """批量计算候选的匹配度（同一类别的候选预处理结果会被缓存）"""
+        return score_candidates(candidates, user_keywords)
+
+    @staticmethod
+    def rank_candidates(
+        candidates: List[Dict],
+        user_keywords: List[str],
+        top_k: Optional[int] = None
+    ) -> List[tuple]:
+        """
+        按匹配度降序返回前top_k个候选
+
+        返回:
+            [(元素, 得分), ...]，同分保持候选原顺序
+        """
+        return rank_candidates(candidates, user_keywords, top_k)
+
     @staticmethod
     def select_from_candidates_dict(
         candidates_dict: Dict[str, List[Dict]],
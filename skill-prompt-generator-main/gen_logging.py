@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成流程日志 - 基于标准库logging，替代各模块中的print
+默认与原来一样把信息打印到标准输出；静默模式下日志调用直接返回（不格式化、不写出）；
+可选的JSON事件输出用于收集各阶段耗时等结构化数据
+
+环境变量:
+    PROMPT_GEN_LOG_LEVEL   控制台日志级别（DEBUG/INFO/WARNING/ERROR/QUIET），默认INFO
+    PROMPT_GEN_EVENTS      JSON事件输出文件路径（每行一个事件）
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Optional, Union
+
+
+LOGGER_NAME = 'prompt_generator'
+EVENTS_LOGGER_NAME = 'prompt_generator.events'
+
+# 比CRITICAL还高：任何日志都不输出
+QUIET = logging.CRITICAL + 10
+
+_configure_lock = threading.Lock()
+_configured = False
+
+
+class _ConsoleHandler(logging.StreamHandler):
+    """总是写到"当前"的sys.stdout/sys.stderr（contextlib.redirect_stdout 仍然能捕获输出）"""
+
+    target = 'stdout'
+
+    @property
+    def stream(self):
+        return getattr(sys, self.target)
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _JsonLinesHandler(logging.Handler):
+    """把事件记录写成JSON行"""
+
+    def __init__(self, stream: IO[str], owns_stream: bool = False):
+        super().__init__()
+        self.stream = stream
+        self.owns_stream = owns_stream
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            payload = {'ts': round(record.created, 6), 'event': record.getMessage()}
+            payload.update(getattr(record, 'fields', {}))
+            line = json.dumps(payload, ensure_ascii=False, default=str)
+            with self.lock:
+                self.stream.write(line + '\n')
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        if self.owns_stream:
+            try:
+                self.stream.close()
+            except OSError:
+                pass
+        super().close()
+
+
+def _parse_level(level: Union[int, str, None]) -> int:
+    if level is None:
+        return logging.INFO
+    if isinstance(level, int):
+        return level
+    level = level.strip().upper()
+    if level in ('QUIET', 'OFF', 'NONE'):
+        return QUIET
+    value = logging.getLevelName(level)
+    return value if isinstance(value, int) else logging.INFO
+
+
+def _ensure_configured():
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.propagate = False
+        logger.addHandler(_ConsoleHandler())
+        logger.setLevel(_parse_level(os.environ.get('PROMPT_GEN_LOG_LEVEL')))
+
+        events = logging.getLogger(EVENTS_LOGGER_NAME)
+        events.propagate = False
+        events.setLevel(logging.INFO)
+        sink = os.environ.get('PROMPT_GEN_EVENTS')
+        if sink:
+            events.addHandler(_JsonLinesHandler(open(sink, 'a', encoding='utf-8'), owns_stream=True))
+        _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    获取生成流程的日志器
+
+    Args:
+        name: 模块名（如 'framework_loader'），日志器名为 prompt_generator.<name>
+    """
+    _ensure_configured()
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def configure(level: Union[int, str, None] = None,
+              quiet: Optional[bool] = None,
+              json_sink: Union[str, IO[str], None] = None,
+              console: Optional[str] = None):
+    """
+    调整日志配置
+
+    Args:
+        level: 控制台日志级别（logging级别或名称，'QUIET'表示全部关闭）
+        quiet: True 等价于 level='QUIET'；False 恢复为INFO
+        json_sink: JSON事件输出（文件路径或文本流）；替换之前配置的输出
+        console: 控制台输出到 'stdout'（默认）或 'stderr'
+    """
+    _ensure_configured()
+    logger = logging.getLogger(LOGGER_NAME)
+    if console is not None:
+        if console not in ('stdout', 'stderr'):
+            raise ValueError(f"console只能是stdout或stderr: {console}")
+        for handler in logger.handlers:
+            if isinstance(handler, _ConsoleHandler):
+                handler.target = console
+    if quiet is not None:
+        logger.setLevel(QUIET if quiet else logging.INFO)
+    if level is not None:
+        logger.setLevel(_parse_level(level))
+
+    if json_sink is not None:
+        events = logging.getLogger(EVENTS_LOGGER_NAME)
+        for handler in list(events.handlers):
+            events.removeHandler(handler)
+            handler.close()
+        if isinstance(json_sink, str):
+            events.addHandler(_JsonLinesHandler(open(json_sink, 'a', encoding='utf-8'), owns_stream=True))
+        else:
+            events.addHandler(_JsonLinesHandler(json_sink))
+
+
+@contextmanager
+def level_override(level: Union[int, str, None]):
+    """临时修改控制台日志级别（None表示不修改），退出时恢复"""
+    if level is None:
+        yield
+        return
+    _ensure_configured()
+    logger = logging.getLogger(LOGGER_NAME)
+    previous = logger.level
+    logger.setLevel(_parse_level(level))
+    try:
+        yield
+    finally:
+        logger.setLevel(previous)
+
+
+def disable_events():
+    """关闭JSON事件输出"""
+    events = logging.getLogger(EVENTS_LOGGER_NAME)
+    for handler in list(events.handlers):
+        events.removeHandler(handler)
+        handler.close()
+
+
+def events_enabled() -> bool:
+    """是否配置了JSON事件输出"""
+    _ensure_configured()
+    return bool(logging.getLogger(EVENTS_LOGGER_NAME).handlers)
+
+
+def event(name: str, **fields):
+    """写出一个结构化事件；未配置JSON输出时直接返回"""
+    events = logging.getLogger(EVENTS_LOGGER_NAME)
+    if not events.handlers:
+        return
+    events.info(name, extra={'fields': fields})
+
+
+@contextmanager
+def stage(name: str, **fields):
+    """
+    记录一个阶段的耗时（毫秒），结束时写出 stage 事件；未配置JSON输出时不计时
+
+    用法:
+        with stage('query_domain', domain='portrait'):
+            ...
+    """
+    if not events_enabled():
+        yield
+        return
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        event('stage', stage=name, ms=round((time.perf_counter() - start) * 1000, 3),
+              status=status, **fields)
+
+
+def test_gen_logging():
+    """测试日志级别和JSON事件输出"""
+    import io
+
+    print("=" * 80)
+    print("测试生成流程日志")
+    print("=" * 80)
+
+    logger = get_logger('test')
+
+    # 测试1：默认INFO级别输出到stdout
+    print("\n【测试1】默认输出")
+    captured = io.StringIO()
+    sys.stdout, real_stdout = captured, sys.stdout
+    try:
+        logger.info("hello %s", "world")
+        logger.debug("hidden")
+    finally:
+        sys.stdout = real_stdout
+    assert captured.getvalue() == "hello world\n", captured.getvalue()
+    print("  ✅ INFO输出、DEBUG隐藏")
+
+    # 测试2：静默模式
+    print("\n【测试2】静默模式")
+    configure(quiet=True)
+    assert not logger.isEnabledFor(logging.ERROR)
+    configure(quiet=False)
+    assert logger.isEnabledFor(logging.INFO)
+    with level_override('WARNING'):
+        assert not logger.isEnabledFor(logging.INFO)
+    assert logger.isEnabledFor(logging.INFO)
+    print("  ✅ 静默/恢复")
+
+    # 测试3：JSON事件
+    print("\n【测试3】JSON事件")
+    sink = io.StringIO()
+    configure(json_sink=sink)
+    with stage('demo', domain='portrait'):
+        time.sleep(0.01)
+    event('custom', count=3)
+    disable_events()
+    lines = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert lines[0]['event'] == 'stage' and lines[0]['stage'] == 'demo' and lines[0]['ms'] >= 10
+    assert lines[1] == {'ts': lines[1]['ts'], 'event': 'custom', 'count': 3}
+    for line in lines:
+        print(f"  {line}")
+
+    print("\n✅ 测试完成")
+
+
+if __name__ == '__main__':
+    test_gen_logging()
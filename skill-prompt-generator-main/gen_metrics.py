@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成流程耗时统计 - 轻量的 span 计时器
+按（生成类型, 阶段）聚合耗时，提供 p50/p95/p99；配置了JSON事件输出时同时写出 stage 事件
+
+用法:
+    with gen_metrics.generation('portrait'):
+        with gen_metrics.span('compose_prompt'):
+            ...
+    gen_metrics.stats()
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import gen_logging
+
+
+# 每个（类型, 阶段）保留的最近样本数，分位数基于这些样本计算
+MAX_SAMPLES = 2048
+PERCENTILES = (50, 95, 99)
+
+# 未指定生成类型时的标签
+UNTYPED = '-'
+
+_current_type: ContextVar[str] = ContextVar('gen_metrics_type', default=UNTYPED)
+_enabled = True
+
+
+class StageHistogram:
+    """单个阶段的耗时统计（毫秒）"""
+
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+    def add(self, ms: float):
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        self.samples.append(ms)
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """最近秩法分位数（sorted_samples须已升序）"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, -(-len(sorted_samples) * q // 100))  # ceil(n*q/100)
+    return sorted_samples[int(rank) - 1]
+
+
+class MetricsRegistry:
+    """（生成类型, 阶段）→ StageHistogram，线程安全"""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._stages: Dict[tuple, StageHistogram] = {}
+
+    def record(self, gen_type: str, stage: str, ms: float):
+        key = (gen_type, stage)
+        with self._lock:
+            hist = self._stages.get(key)
+            if hist is None:
+                hist = self._stages[key] = StageHistogram(self.max_samples)
+            hist.add(ms)
+
+    def stats(self, gen_type: Optional[str] = None) -> List[Dict]:
+        """
+        汇总统计
+
+        Returns:
+            [{'type', 'stage', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}, ...]，
+            按类型、总耗时降序排列
+        """
+        with self._lock:
+            snapshot = [(key, hist.count, hist.total, hist.max, sorted(hist.samples))
+                        for key, hist in self._stages.items()
+                        if gen_type is None or key[0] == gen_type]
+
+        rows = []
+        for (kind, stage), count, total, max_ms, samples in snapshot:
+            row = {'type': kind, 'stage': stage, 'count': count,
+                   'mean_ms': round(total / count, 3) if count else 0.0}
+            for q in PERCENTILES:
+                row[f'p{q}_ms'] = round(percentile(samples, q), 3)
+            row['max_ms'] = round(max_ms, 3)
+            row['total_ms'] = round(total, 3)
+            rows.append(row)
+        rows.sort(key=lambda r: (r['type'], -r['total_ms']))
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def set_enabled(enabled: bool):
+    """开启/关闭统计（关闭后 span 在未配置JSON事件时不再计时）"""
+    global _enabled
+    _enabled = enabled
+
+
+@contextmanager
+def generation(gen_type: str):
+    """标记当前生成类型，内部的 span 默认归到该类型"""
+    token = _current_type.set(gen_type)
+    try:
+        yield
+    finally:
+        _current_type.reset(token)
+
+
+@contextmanager
+def span(stage: str, gen_type: Optional[str] = None):
+    """
+    记录一个阶段的耗时
+
+    Args:
+        stage: 阶段名（如 'compose_prompt'）
+        gen_type: 生成类型；默认取外层 generation() 设置的类型
+    """
+    emit = gen_logging.events_enabled()
+    if not _enabled and not emit:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        kind = gen_type or _current_type.get()
+        if _enabled:
+            REGISTRY.record(kind, stage, ms)
+        if emit:
+            gen_logging.event('stage', stage=stage, type=kind, ms=round(ms, 3))
+
+
+def stats(gen_type: Optional[str] = None) -> List[Dict]:
+    """各阶段的耗时统计（见 MetricsRegistry.stats）"""
+    return REGISTRY.stats(gen_type)
+
+
+def reset():
+    """清空统计"""
+    REGISTRY.reset()
+
+
+def format_stats(rows: Optional[List[Dict]] = None) -> str:
+    """统计结果的文本表格"""
+    rows = stats() if rows is None else rows
+    header = f"{'类型':<14}{'阶段':<22}{'次数':>8}{'平均':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'最大':>10}"
+    lines = [header, '-' * len(header)]
+    for r in rows:
+        lines.append(f"{r['type']:<14}{r['stage']:<22}{r['count']:>8}{r['mean_ms']:>10.2f}"
+                     f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}")
+    return '\n'.join(lines)
+
+
+def test_gen_metrics():
+    """测试分位数和实际生成的阶段统计"""
+    import os
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    print("=" * 80)
+    print("测试生成耗时统计")
+    print("=" * 80)
+
+    # 测试1：分位数
+    print("\n【测试1】分位数")
+    samples = sorted(float(i) for i in range(1, 101))
+    assert [percentile(samples, q) for q in PERCENTILES] == [50.0, 95.0, 99.0]
+    assert percentile([], 50) == 0.0 and percentile([3.0], 99) == 3.0
+    print("  ✅ p50/p95/p99 正确")
+
+    # 测试2：嵌套类型
+    print("\n【测试2】生成类型标签")
+    reset()
+    with generation('portrait'):
+        with span('demo'):
+            pass
+    with span('demo', gen_type='design'):
+        pass
+    assert {(r['type'], r['stage']) for r in stats()} == {('portrait', 'demo'), ('design', 'demo')}
+    print("  ✅ span归到外层generation的类型")
+
+    # 测试3：实际生成（作为脚本运行时本模块是__main__，生成器记录在 gen_metrics 模块里）
+    print("\n【测试3】CrossDomainGenerator各阶段耗时")
+    import gen_metrics
+    from core.cross_domain_generator import CrossDomainGenerator
+    gen_metrics.reset()
+    gen_logging.configure(quiet=True)
+    generator = CrossDomainGenerator()
+    for text in ["生成一个年轻女性肖像", "龙珠动漫的蜡像3D感悟空打出龟派气功",
+                 "温馨可爱风格的儿童教育海报", "用Python写一个登录API测试脚本"] * 5:
+        generator.generate(text)
+    generator.close()
+    gen_logging.configure(quiet=False)
+    rows = gen_metrics.stats()
+    assert {'total', 'compose_prompt'} <= {r['stage'] for r in rows if r['type'] == 'portrait'}
+    print(gen_metrics.format_stats(rows))
+
+    print("\n✅ 测试完成")
+
+
+if __name__ == '__main__':
+    test_gen_metrics()
@@ -6,20 +6,53 @@
 """
 
 import sqlite3
-import json
 from typing import Dict, List, Optional, Tuple
 
+from connection_provider import ConnectionProvider
+from element_catalog import ElementCatalog
+from element_fts import has_fts_index, search_elements
+from element_rows import element_from_row, rows_to_dicts
+from gen_logging import get_logger
+
+logger = get_logger('intelligent_generator')
+
 
 class IntelligentGenerator:
     """智能提示词生成器 - 理解意图，检查一致性"""
 
-    def __init__(self, db_path: str = "extracted_results/elements.db"):
-        self.conn = sqlite3.connect(db_path)
-        self.cursor = self.conn.cursor()
+    def __init__(self, db_path: str = "extracted_results/elements.db",
+                 provider: Optional[ConnectionProvider] = None,
+                 use_catalog: bool = False,
+                 catalog: Optional[ElementCatalog] = None):
+        """
+        Args:
+            db_path: 数据库路径（未传入provider时使用）
+            provider: 共享的连接提供者；为None时自建一个只读的
+            use_catalog: 为True时把elements表载入内存，查询不再走SQL
+            catalog: 共享的ElementCatalog（传入时隐含use_catalog）
+        """
+        self._owns_provider = provider is None
+        self.provider = provider or ConnectionProvider(db_path, read_only=True)
+        if catalog is None and use_catalog:
+            catalog = ElementCatalog(self.conn)
+        self.catalog = catalog
+        self._fts_ready: Optional[bool] = None
 
         # 加载常识知识库
         self.knowledge = self.load_knowledge()
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """当前线程的数据库连接"""
+        return self.provider.connection()
+
+    @property
+    def fts_ready(self) -> bool:
+        """数据库是否建有elements_fts全文索引（首次访问时检查）"""
+        if self._fts_ready is None:
+            self._fts_ready = has_fts_index(self.conn)
+        return self._fts_ready
+
     def load_knowledge(self) -> Dict:
         """加载元素关系和常识约束"""
         return {
@@ -90,22 +123,24 @@ class IntelligentGenerator:
     def get_element_by_category(self, domain: str, category: str,
                                 value_filter: Optional[str] = None) -> Optional[Dict]:
         """从数据库获取元素"""
-        query = """
-            SELECT element_id, name, chinese_name, ai_prompt_template,
-                   keywords, reusability_score, category_id
-            FROM elements
-            WHERE domain_id = ? AND category_id = ?
-        """
-        params = [domain, category]
+        if self.catalog is not None:
+            row = self.catalog.first_by_category(domain, category, value_filter)
+        else:
+            query = """
+                SELECT element_id, name, chinese_name, ai_prompt_template,
+                       keywords, reusability_score, category_id
+                FROM elements
+                WHERE domain_id = ? AND category_id = ?
+            """
+            params = [domain, category]
 
-        if value_filter:
-            query += " AND (ai_prompt_template LIKE ? OR keywords LIKE ?)"
-            params.extend([f"%{value_filter}%", f"%{value_filter}%"])
+            if value_filter:
+                query += " AND (ai_prompt_template LIKE ? OR keywords LIKE ?)"
+                params.extend([f"%{value_filter}%", f"%{value_filter}%"])
 
-        query += " ORDER BY reusability_score DESC LIMIT 1"
+            query += " ORDER BY reusability_score DESC LIMIT 1"
 
-        self.cursor.execute(query, params)
-        row = self.cursor.fetchone()
+            row = self.conn.execute(query, params).fetchone()
 
         if not row:
             return None
@@ -113,75 +148,45 @@ class IntelligentGenerator:
         # 验证name是否匹配value_filter（避免子串误匹配，如female被male匹配）
         if value_filter and row[1].lower() != value_filter.lower():
             # 如果不匹配，尝试直接用name精确匹配
-            query_exact = """
-                SELECT element_id, name, chinese_name, ai_prompt_template,
-                       keywords, reusability_score, category_id
-                FROM elements
-                WHERE domain_id = ? AND category_id = ? AND name = ?
-                ORDER BY reusability_score DESC LIMIT 1
-            """
-            self.cursor.execute(query_exact, [domain, category, value_filter])
-            row = self.cursor.fetchone()
+            if self.catalog is not None:
+                row = self.catalog.by_name(domain, category, value_filter)
+            else:
+                query_exact = """
+                    SELECT element_id, name, chinese_name, ai_prompt_template,
+                           keywords, reusability_score, category_id
+                    FROM elements
+                    WHERE domain_id = ? AND category_id = ? AND name = ?
+                    ORDER BY reusability_score DESC LIMIT 1
+                """
+                row = self.conn.execute(query_exact, [domain, category, value_filter]).fetchone()
             if not row:
                 return None
 
-        keywords = None
-        if row[4]:
-            try:
-                keywords = json.loads(row[4])
-            except:
-                pass
-
-        return {
-            'element_id': row[0],
-            'name': row[1],
-            'chinese_name': row[2],
-            'template': row[3],
-            'keywords': keywords,
-            'reusability': row[5],
-            'category': row[6]
-        }
+        return element_from_row(row)
 
     def get_all_elements_by_category(self, domain: str, category: str,
                                      value_filter: Optional[str] = None) -> List[Dict]:
         """从数据库获取该类别的所有元素（用于SKILL分析）"""
-        query = """
-            SELECT element_id, name, chinese_name, ai_prompt_template,
-                   keywords, reusability_score, category_id
-            FROM elements
-            WHERE domain_id = ? AND category_id = ?
-        """
-        params = [domain, category]
-
-        if value_filter:
-            query += " AND (ai_prompt_template LIKE ? OR keywords LIKE ?)"
-            params.extend([f"%{value_filter}%", f"%{value_filter}%"])
+        if self.catalog is not None:
+            rows = self.catalog.by_category(domain, category, value_filter)
+        else:
+            query = """
+                SELECT element_id, name, chinese_name, ai_prompt_template,
+                       keywords, reusability_score, category_id
+                FROM elements
+                WHERE domain_id = ? AND category_id = ?
+            """
+            params = [domain, category]
 
-        query += " ORDER BY reusability_score DESC"
+            if value_filter:
+                query += " AND (ai_prompt_template LIKE ? OR keywords LIKE ?)"
+                params.extend([f"%{value_filter}%", f"%{value_filter}%"])
 
-        self.cursor.execute(query, params)
-        rows = self.cursor.fetchall()
+            query += " ORDER BY reusability_score DESC"
 
-        elements = []
-        for row in rows:
-            keywords = None
-            if row[4]:
-                try:
-                    keywords = json.loads(row[4])
-                except:
-                    pass
-
-            elements.append({
-                'element_id': row[0],
-                'name': row[1],
-                'chinese_name': row[2],
-                'template': row[3],
-                'keywords': keywords,
-                'reusability': row[5],
-                'category': row[6]
-            })
+            rows = self.conn.execute(query, params).fetchall()
 
-        return elements
+        return rows_to_dicts(rows)
 
     def select_elements_by_intent(self, intent: Dict) -> List[Dict]:
         """
@@ -260,13 +265,13 @@ class IntelligentGenerator:
             for kw in search_keywords:
                 clothing_elem = self.get_element_by_category('portrait', 'clothing_styles', kw)
                 if clothing_elem:
-                    print(f"✓ 找到服装元素: '{clothing_elem['chinese_name']}'（搜索关键词: {kw}）")
+                    logger.info("✓ 找到服装元素: '%s'（搜索关键词: %s）", clothing_elem['chinese_name'], kw)
                     elements.append(clothing_elem)
                     break
 
             # 如果没找到，记录信息
             if not clothing_elem:
-                print(f"⚠️ 未找到'{clothing}'服装元素，将通过风格关键词搜索")
+                logger.warning("⚠️ 未找到'%s'服装元素，将通过风格关键词搜索", clothing)
         else:
             # 默认选择一个现代服装
             elem = self.get_element_by_category('portrait', 'clothing_styles')
@@ -287,13 +292,13 @@ class IntelligentGenerator:
             for kw in search_keywords:
                 hair_style_elem = self.get_element_by_category('portrait', 'hair_styles', kw)
                 if hair_style_elem:
-                    print(f"✓ 找到发型元素: '{hair_style_elem['chinese_name']}'（搜索关键词: {kw}）")
+                    logger.info("✓ 找到发型元素: '%s'（搜索关键词: %s）", hair_style_elem['chinese_name'], kw)
                     elements.append(hair_style_elem)
                     break
 
             # 如果没找到，记录信息
             if not hair_style_elem:
-                print(f"⚠️ 未找到'{hairstyle}'发型元素，将通过风格关键词搜索")
+                logger.warning("⚠️ 未找到'%s'发型元素，将通过风格关键词搜索", hairstyle)
         else:
             # 默认选择一个现代发型
             elem = self.get_element_by_category('portrait', 'hair_styles')
@@ -320,13 +325,13 @@ class IntelligentGenerator:
         if clothing != 'modern':
             clothing_search_kws = clothing_keywords_map.get(clothing, [])
             style_keywords.extend(clothing_search_kws)
-            print(f"✓ 添加服装搜索关键词: {', '.join(clothing_search_kws)}")
+            logger.info("✓ 添加服装搜索关键词: %s", ', '.join(clothing_search_kws))
 
         # 添加发型关键词（补充搜索）
         if hairstyle != 'modern':
             hairstyle_search_kws = hairstyle_keywords_map.get(hairstyle, [])
             style_keywords.extend(hairstyle_search_kws)
-            print(f"✓ 添加发型搜索关键词: {', '.join(hairstyle_search_kws)}")
+            logger.info("✓ 添加发型搜索关键词: %s", ', '.join(hairstyle_search_kws))
 
         # 添加艺术风格
         if 'art_style' in visual_style:
@@ -354,7 +359,7 @@ class IntelligentGenerator:
             if director_style in self.knowledge.get('director_lighting_styles', {}):
                 lighting_config = self.knowledge['director_lighting_styles'][director_style]
                 style_keywords.extend(lighting_config['lighting_keywords'])
-                print(f"✓ 识别到'{lighting_config['description']}'，自动添加光影关键词: {', '.join(lighting_config['lighting_keywords'])}")
+                logger.info("✓ 识别到'%s'，自动添加光影关键词: %s", lighting_config['description'], ', '.join(lighting_config['lighting_keywords']))
 
             # 添加导演风格的特定关键词
             director_keywords = {
@@ -364,7 +369,7 @@ class IntelligentGenerator:
             }
             if director_style in director_keywords:
                 style_keywords.extend(director_keywords[director_style])
-                print(f"✓ 识别到导演风格'{director_style}'，添加特征关键词: {', '.join(director_keywords[director_style])}")
+                logger.info("✓ 识别到导演风格'%s'，添加特征关键词: %s", director_style, ', '.join(director_keywords[director_style]))
 
         if style_keywords:
             style_elements = self.search_style_elements(style_keywords)
@@ -406,45 +411,38 @@ class IntelligentGenerator:
         return relevance
 
     def search_style_elements(self, keywords: List[str]) -> List[Dict]:
-        """搜索风格元素，排除人物属性类别，按相关性×质量排序"""
-        excluded_categories = self.knowledge['subject_attribute_categories']
-
-        keyword_conditions = " OR ".join(["ai_prompt_template LIKE ?" for _ in keywords])
-        query = f"""
-            SELECT element_id, name, chinese_name, ai_prompt_template,
-                   keywords, reusability_score, category_id
-            FROM elements
-            WHERE ({keyword_conditions})
-              AND ai_prompt_template != ''
-            ORDER BY reusability_score DESC
-            LIMIT 30
+        """搜索风格元素，排除人物属性类别，按相关性×质量排序
+
+        有elements_fts全文索引时用 bm25×复用性 取候选，否则回退到模板 LIKE 搜索；
+        两种方式都在SQL中排除人物属性类别，保证候选数量不被挤占
         """
+        excluded_categories = sorted(self.knowledge['subject_attribute_categories'])
+
+        if keywords and self.fts_ready:
+            rows = search_elements(self.conn, keywords, excluded_categories, limit=30)
+        elif self.catalog is not None and keywords:
+            rows = self.catalog.search_templates(keywords, limit=30,
+                                                 exclude_categories=excluded_categories)
+        else:
+            keyword_conditions = " OR ".join(["ai_prompt_template LIKE ?" for _ in keywords])
+            category_placeholders = ", ".join("?" for _ in excluded_categories)
+            query = f"""
+                SELECT element_id, name, chinese_name, ai_prompt_template,
+                       keywords, reusability_score, category_id
+                FROM elements
+                WHERE ({keyword_conditions})
+                  AND ai_prompt_template != ''
+                  AND category_id NOT IN ({category_placeholders})
+                ORDER BY reusability_score DESC
+                LIMIT 30
+            """
 
-        params = [f"%{kw}%" for kw in keywords]
-        self.cursor.execute(query, params)
+            params = [f"%{kw}%" for kw in keywords] + excluded_categories
+            rows = self.conn.execute(query, params).fetchall()
 
         elements = []
-        for row in self.cursor.fetchall():
-            # 过滤掉人物属性类别
-            if row[6] in excluded_categories:
-                continue
-
-            keywords_data = None
-            if row[4]:
-                try:
-                    keywords_data = json.loads(row[4])
-                except:
-                    pass
-
-            elem = {
-                'element_id': row[0],
-                'name': row[1],
-                'chinese_name': row[2],
-                'template': row[3],
-                'keywords': keywords_data,
-                'reusability': row[5],
-                'category': row[6]
-            }
+        for row in rows:
+            elem = element_from_row(row)
 
             # 计算相关性得分
             relevance = self.calculate_relevance(elem, keywords)
@@ -873,8 +871,9 @@ class IntelligentGenerator:
         return ', '.join(all_keywords)
 
     def close(self):
-        """关闭数据库连接"""
-        self.conn.close()
+        """关闭数据库连接（共享的provider由其创建者关闭）"""
+        if self._owns_provider:
+            self.provider.close()
 
 
 def test_intelligent_generator():
@@ -1059,12 +1058,12 @@ def save_generated_prompt(prompt_text: str, user_intent: str,
                     ''', (element_id, quality_score, datetime.now()))
 
         conn.commit()
-        print(f"✅ Prompt已保存到数据库，ID: #{prompt_id}")
+        logger.info("✅ Prompt已保存到数据库，ID: #%s", prompt_id)
         return prompt_id
 
     except Exception as e:
         conn.rollback()
-        print(f"❌ 保存Prompt失败: {e}")
+        logger.error("❌ 保存Prompt失败: %s", e)
         raise
     finally:
         conn.close()